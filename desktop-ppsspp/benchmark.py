@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+# benchmark.py — headless launcher benchmarks under Xvfb with a uinput gamepad
+#
+#   python3 benchmark.py [--target desktop|settings|keys|all] [--samples 20]
+#                        [--thresholds limits.json] [--threshold desktop.select_p95_ms=40]
+#                        [--output results.json]
+#
+# Needs Xvfb, python-xlib and python-evdev. The input metrics also need
+# write access to /dev/uinput and are skipped (reported as null) without it.
+# Results are printed as JSON; the exit status is 1 if any metric is over
+# its threshold, so this can gate a release. The keys target needs no
+# launcher: it times keyboarder's XTEST injection (and xdotool, if
+# installed, for comparison) against a focused window of its own.
+
+import os
+import sys
+import json
+import time
+import shutil
+import select
+import argparse
+import tempfile
+import threading
+import subprocess
+
+from boottrace import release
+from paths import HERE
+
+SCREEN = (1280, 720)
+SCRIPTS = {"desktop": "desktop.py", "settings": "settings.py"}
+# Upper limits; a metric over its limit is a regression
+DEFAULT_THRESHOLDS = {
+    "desktop.first_frame_ms": 1500,
+    "desktop.select_p95_ms": 50,
+    "desktop.spawn_p95_ms": 100,
+    "desktop.idle_wakeups_per_s": 5,
+    "desktop.idle_cpu_percent": 1.0,
+    "settings.first_frame_ms": 1500,
+    "settings.select_p95_ms": 50,
+    "settings.idle_wakeups_per_s": 5,
+    "settings.idle_cpu_percent": 1.0,
+    "keys.inject_p95_ms": 5,
+    "keys.type_errors": 0,
+}
+TYPE_SAMPLE = "Hello, World! 1+1=2 & (a|b) ~ user@example.org"
+TARGETS = list(SCRIPTS) + ["keys"]
+STARTUP_TIMEOUT = 30
+MOVE_DELAY = 0.35  # between samples, so each push is a fresh move and never a repeat
+
+
+# ---------- Helpers ----------
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return round(values[lo] + (values[hi] - values[lo]) * (k - lo), 2)
+
+
+def summarize(prefix, samples, missed):
+    return {
+        f"{prefix}_p50_ms": percentile(samples, 50),
+        f"{prefix}_p95_ms": percentile(samples, 95),
+        f"{prefix}_max_ms": round(max(samples), 2) if samples else None,
+        f"{prefix}_missed": missed,
+    }
+
+
+def wait_for(predicate, timeout, interval=0.05):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return False
+
+
+# ---------- X server ----------
+class Xvfb:
+    """A private Xvfb on the first free display number."""
+
+    def __init__(self, size=SCREEN):
+        self.size = size
+        self.proc = None
+        self.display = None
+
+    def __enter__(self):
+        n = 90
+        while os.path.exists(f"/tmp/.X11-unix/X{n}") or os.path.exists(f"/tmp/.X{n}-lock"):
+            n += 1
+        self.display = f":{n}"
+        w, h = self.size
+        self.proc = subprocess.Popen(
+            ["Xvfb", self.display, "-screen", "0", f"{w}x{h}x24", "-nolisten", "tcp"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if not wait_for(lambda: os.path.exists(f"/tmp/.X11-unix/X{n}"), 10):
+            self.proc.kill()
+            raise RuntimeError("Xvfb did not start")
+        return self
+
+    def __exit__(self, *exc):
+        self.proc.terminate()
+        self.proc.wait()
+
+
+class DamageWatch:
+    """Reports when the screen changes inside a horizontal band, via XDamage on the root window."""
+
+    def __init__(self, display_name, band):
+        from Xlib import display
+        from Xlib.ext import damage
+
+        self.d = display.Display(display_name)
+        if not self.d.has_extension("DAMAGE"):
+            raise RuntimeError("X server has no DAMAGE extension")
+        self.d.damage_query_version()
+        self.d.screen().root.damage_create(damage.DamageReportRawRectangles)
+        self.d.flush()
+        self.band = band
+
+    def drain(self):
+        while self.d.pending_events():
+            self.d.next_event()
+
+    def wait(self, timeout):
+        """Monotonic time of the next damage inside the band, or None."""
+        deadline = time.monotonic() + timeout
+        top, bottom = self.band
+        while True:
+            while self.d.pending_events():
+                e = self.d.next_event()
+                if e.type != self.d.extension_event.DamageNotify:
+                    continue
+                area = e.area
+                if area.y < bottom and area.y + area.height > top:
+                    return time.monotonic()
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return None
+            select.select([self.d.fileno()], [], [], left)
+
+    def close(self):
+        self.d.close()
+
+
+class KeySink:
+    """A focused window of our own that reports the keys it receives."""
+
+    def __init__(self, display_name):
+        from Xlib import X, display
+
+        self.X = X
+        self.d = display.Display(display_name)
+        screen = self.d.screen()
+        self.win = screen.root.create_window(0, 0, 100, 100, 0, screen.root_depth,
+                                             event_mask=X.KeyPressMask)
+        self.win.map()
+        self.d.sync()
+        self.win.set_input_focus(X.RevertToParent, X.CurrentTime)
+        self.d.sync()
+        self.modifiers = {code for codes in self.d.get_modifier_mapping() for code in codes if code}
+
+    def drain(self):
+        while self.d.pending_events():
+            self.d.next_event()
+
+    def wait(self, timeout):
+        """(monotonic time, keysym) of the next non-modifier key press, or None."""
+        deadline = time.monotonic() + timeout
+        while True:
+            while self.d.pending_events():
+                e = self.d.next_event()
+                if e.type != self.X.KeyPress or e.detail in self.modifiers:
+                    continue
+                index = 1 if e.state & self.X.ShiftMask else 0
+                return time.monotonic(), self.d.keycode_to_keysym(e.detail, index)
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return None
+            select.select([self.d.fileno()], [], [], left)
+
+    def close(self):
+        self.d.close()
+
+
+# ---------- Input ----------
+class VirtualGamepad:
+    """uinput gamepad with one stick and two face buttons."""
+
+    def __init__(self):
+        from evdev import UInput, AbsInfo, ecodes
+
+        self.ecodes = ecodes
+        stick = AbsInfo(value=0, min=-32768, max=32767, fuzz=16, flat=128, resolution=0)
+        self.ui = UInput({
+            ecodes.EV_KEY: [ecodes.BTN_SOUTH, ecodes.BTN_EAST],
+            ecodes.EV_ABS: [(ecodes.ABS_X, stick), (ecodes.ABS_Y, stick)],
+        }, name="Ellixpi benchmark pad")
+
+    @property
+    def path(self):
+        return self.ui.device.path
+
+    def axis(self, code, value):
+        self.ui.write(self.ecodes.EV_ABS, code, value)
+        self.ui.syn()
+
+    def press(self, code):
+        self.ui.write(self.ecodes.EV_KEY, code, 1)
+        self.ui.syn()
+        self.ui.write(self.ecodes.EV_KEY, code, 0)
+        self.ui.syn()
+
+    def close(self):
+        self.ui.close()
+
+
+# ---------- Process sampling ----------
+def opens(pid, path):
+    """True if the process has path open."""
+    try:
+        fds = os.listdir(f"/proc/{pid}/fd")
+    except OSError:
+        return False
+    for fd in fds:
+        try:
+            if os.readlink(f"/proc/{pid}/fd/{fd}") == path:
+                return True
+        except OSError:
+            pass
+    return False
+
+
+def cpu_sample(pid):
+    """(context switches over all threads, CPU seconds) of one process."""
+    switches = 0
+    for tid in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{tid}/status") as f:
+                for line in f:
+                    if line.startswith(("voluntary_ctxt_switches", "nonvoluntary_ctxt_switches")):
+                        switches += int(line.split()[1])
+        except OSError:
+            pass  # thread exited meanwhile
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    ticks = int(fields[11]) + int(fields[12])
+    return switches, ticks / os.sysconf("SC_CLK_TCK")
+
+
+# ---------- One target ----------
+class Run:
+    """One launcher script started in a throwaway $HOME with stub apps."""
+
+    def __init__(self, target, display, workdir):
+        self.target = target
+        self.home = os.path.join(workdir, target)
+        self.trace = os.path.join(self.home, "startup.json")
+        self.fifo = os.path.join(self.home, "spawned")
+        os.makedirs(os.path.join(self.home, ".config", "ellixpi"))
+        os.mkfifo(self.fifo)
+
+        # Two stub tiles and nothing from the system, so indices are stable
+        stub = {"cmd": ["sh", "-c", f"echo > {self.fifo}"], "icon": ""}
+        manifest = {
+            "apps": [dict(stub, name="Bench A"), dict(stub, name="Bench B")],
+            "categories": ["EllixpiBenchmarkNone"],
+            "rom_dirs": [os.path.join(self.home, "roms")],
+        }
+        with open(os.path.join(self.home, ".config", "ellixpi", "apps.json"), "w") as f:
+            json.dump(manifest, f)
+
+        env = {k: v for k, v in os.environ.items() if not k.startswith("XDG_")}
+        env.update(DISPLAY=display, HOME=self.home, GDK_BACKEND="x11", NO_AT_BRIDGE="1",
+                   ELLIXPI_STARTUP_TRACE=self.trace)
+        self.log = open(os.path.join(workdir, target + ".log"), "w")
+        self.started = time.monotonic()
+        self.proc = subprocess.Popen([sys.executable, os.path.join(HERE, SCRIPTS[target])],
+                                     cwd=HERE, env=env, stdout=self.log, stderr=subprocess.STDOUT)
+
+    def wait_ready(self):
+        """Wait for the startup trace, written once the deferred startup work is done."""
+        if not wait_for(lambda: os.path.exists(self.trace) or self.proc.poll() is not None, STARTUP_TIMEOUT):
+            raise RuntimeError(f"{self.target}: no startup trace after {STARTUP_TIMEOUT}s")
+        if self.proc.poll() is not None:
+            raise RuntimeError(f"{self.target}: exited with {self.proc.returncode}, see {self.log.name}")
+        ready = time.monotonic()
+        wait_for(lambda: os.path.getsize(self.trace) > 0, 5)
+        with open(self.trace) as f:
+            trace = json.load(f)
+        return {
+            "first_frame_ms": trace["process_to_first_frame_ms"],
+            "ready_ms": round((ready - self.started) * 1000, 1),
+        }
+
+    def measure_spawn(self, pad, samples):
+        """Button press to the stub app's first instruction."""
+        times, missed = [], 0
+        for _ in range(samples):
+            opened = []
+
+            def reader():
+                with open(self.fifo) as f:  # blocks until the stub opens it
+                    opened.append(time.monotonic())
+                    f.read()
+
+            t = threading.Thread(target=reader, daemon=True)
+            t.start()
+            t0 = time.monotonic()
+            pad.press(pad.ecodes.BTN_SOUTH)
+            t.join(2)
+            if opened:
+                times.append((opened[0] - t0) * 1000)
+            else:
+                missed += 1
+                # Unblock the reader so it does not swallow the next stub
+                with open(self.fifo, "w"):
+                    pass
+                t.join(1)
+            time.sleep(MOVE_DELAY)
+        return summarize("spawn", times, missed)
+
+    def measure_select(self, pad, damage, samples):
+        """Stick push to the first repaint of the tile row."""
+        times, missed = [], 0
+        for i in range(samples):
+            direction = 1 if i % 2 == 0 else -1
+            time.sleep(MOVE_DELAY)
+            damage.drain()
+            t0 = time.monotonic()
+            pad.axis(pad.ecodes.ABS_X, 32767 * direction)
+            t1 = damage.wait(1.0)
+            pad.axis(pad.ecodes.ABS_X, 0)
+            if t1 is None:
+                missed += 1
+            else:
+                times.append((t1 - t0) * 1000)
+        return summarize("select", times, missed)
+
+    def measure_idle(self, seconds):
+        s0, c0 = cpu_sample(self.proc.pid)
+        time.sleep(seconds)
+        s1, c1 = cpu_sample(self.proc.pid)
+        return {
+            "idle_wakeups_per_s": round((s1 - s0) / seconds, 2),
+            "idle_cpu_percent": round((c1 - c0) / seconds * 100, 2),
+        }
+
+    def stop(self):
+        self.proc.terminate()
+        try:
+            self.proc.wait(5)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+        self.log.close()
+
+
+def bench_target(target, display, workdir, pad, args):
+    run = Run(target, display, workdir)
+    try:
+        results = run.wait_ready()
+        if pad and wait_for(lambda: opens(run.proc.pid, pad.path), 5):
+            time.sleep(1)  # the launcher ignores input for its first 500 ms
+            if target == "desktop":
+                results.update(run.measure_spawn(pad, args.samples))
+            h = SCREEN[1]
+            damage = DamageWatch(display, (h // 4, h * 3 // 4))
+            try:
+                results.update(run.measure_select(pad, damage, args.samples))
+            finally:
+                damage.close()
+        elif pad:
+            print(f"{target}: gamepad was not opened, input metrics skipped", file=sys.stderr)
+        time.sleep(args.settle)
+        results.update(run.measure_idle(args.idle))
+    finally:
+        run.stop()
+    return results
+
+
+def bench_keys(display, samples):
+    from keyinject import KeyInjector
+
+    sink = KeySink(display)
+    keys = KeyInjector(display)
+    results = {}
+    try:
+        results.update(time_keys(sink, "inject", samples, keys.key))
+
+        # A whole string with capitals and symbols: throughput, and every keysym must arrive intact
+        expected = [keys.keysym(ch) for ch in TYPE_SAMPLE]
+        sink.drain()
+        t0 = time.monotonic()
+        keys.type(TYPE_SAMPLE)
+        received = []
+        while len(received) < len(expected):
+            got = sink.wait(2)
+            if got is None:
+                break
+            received.append(got[1])
+        elapsed = time.monotonic() - t0
+        results["type_chars_per_s"] = round(len(received) / elapsed) if received else None
+        results["type_errors"] = sum(a != b for a, b in zip(expected, received)) + len(expected) - len(received)
+
+        if shutil.which("xdotool"):
+            env = dict(os.environ, DISPLAY=display)
+            results.update(time_keys(sink, "xdotool", min(samples, 20),
+                                     lambda k: subprocess.call(["xdotool", "key", k], env=env)))
+    finally:
+        keys.close()
+        sink.close()
+    return results
+
+
+def time_keys(sink, prefix, samples, press):
+    """Latency from press(letter) to the sink window receiving it."""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    times, missed = [], 0
+    for i in range(samples):
+        sink.drain()
+        t0 = time.monotonic()
+        press(letters[i % len(letters)])
+        got = sink.wait(1)
+        if got is None:
+            missed += 1
+        else:
+            times.append((got[0] - t0) * 1000)
+    return summarize(prefix, times, missed)
+
+
+# ---------- Thresholds ----------
+def load_thresholds(args):
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    if args.thresholds:
+        with open(args.thresholds) as f:
+            thresholds.update(json.load(f))
+    for item in args.threshold:
+        name, _, value = item.partition("=")
+        thresholds[name] = float(value)
+    return thresholds
+
+
+def regressions(results, thresholds):
+    found = []
+    for name, limit in sorted(thresholds.items()):
+        target, _, metric = name.partition(".")
+        value = results.get(target, {}).get(metric)
+        if value is not None and limit is not None and value > limit:
+            found.append({"metric": name, "value": value, "threshold": limit})
+    return found
+
+
+# ---------- Run ----------
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the launcher headlessly.")
+    parser.add_argument("--target", choices=TARGETS + ["all"], default="all")
+    parser.add_argument("--samples", type=int, default=20, help="input samples per metric")
+    parser.add_argument("--idle", type=float, default=10, help="seconds of idle sampling")
+    parser.add_argument("--settle", type=float, default=3, help="seconds to wait before idle sampling")
+    parser.add_argument("--thresholds", help="JSON file of {\"target.metric\": limit}")
+    parser.add_argument("--threshold", action="append", default=[], metavar="METRIC=LIMIT")
+    parser.add_argument("--output", help="also write the results to this file")
+    args = parser.parse_args()
+
+    if not shutil.which("Xvfb"):
+        sys.exit("benchmark: Xvfb not found")
+    thresholds = load_thresholds(args)
+    targets = TARGETS if args.target == "all" else [args.target]
+
+    try:
+        pad = VirtualGamepad()
+    except Exception as e:  # no uinput module or no permission
+        print("benchmark: no virtual gamepad, input metrics skipped:", e, file=sys.stderr)
+        pad = None
+
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="ellixpi-bench-")
+    try:
+        with Xvfb() as xvfb:
+            for target in targets:
+                if target == "keys":
+                    results[target] = bench_keys(xvfb.display, args.samples)
+                else:
+                    results[target] = bench_target(target, xvfb.display, workdir, pad, args)
+    finally:
+        if pad:
+            pad.close()
+
+    found = regressions(results, thresholds)
+    report = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "release": release(),
+        "samples": args.samples,
+        "results": results,
+        "thresholds": thresholds,
+        "regressions": found,
+        "logs": workdir,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# boottrace.py — startup phase timings, dumped as JSON to track boot-to-launcher time
+
+import os
+import json
+import time
+import hashlib
+from contextlib import contextmanager
+
+from paths import HERE, cache_dir
+
+HISTORY_FILE = "startup-history.jsonl"
+MAX_HISTORY = 500
+
+
+def _now():
+    # Same clock as /proc/uptime, so "since boot" includes time spent suspended too
+    return time.clock_gettime(time.CLOCK_BOOTTIME)
+
+
+def _process_start():
+    """Seconds since boot at which this process was started."""
+    try:
+        with open("/proc/self/stat") as f:
+            # comm may contain spaces; fields after it are fixed
+            fields = f.read().rsplit(")", 1)[1].split()
+        return int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return _now()
+
+
+def release():
+    """$ELLIXPI_RELEASE, or a short hash of the launcher scripts."""
+    if os.environ.get("ELLIXPI_RELEASE"):
+        return os.environ["ELLIXPI_RELEASE"]
+    h = hashlib.sha1()
+    for name in sorted(os.listdir(HERE)):
+        if name.endswith(".py"):
+            with open(os.path.join(HERE, name), "rb") as f:
+                h.update(f.read())
+    return h.hexdigest()[:12]
+
+
+class StartupTrace:
+    """Wall time of each startup phase, measured from process start.
+
+    phase() times a block and mark() closes the span since the previous
+    phase or mark, for code that cannot be wrapped (module imports).
+    Everything is recorded against CLOCK_BOOTTIME, so the dump also says
+    how long after boot the first frame appeared.
+    """
+
+    def __init__(self):
+        self.process_start = _process_start()
+        self.phases = []  # {"name", "start", "ms"}, start relative to process start
+        self.first_frame = None
+        self._last = self.process_start
+
+    def _record(self, name, start, end):
+        self.phases.append({
+            "name": name,
+            "start": round((start - self.process_start) * 1000, 2),
+            "ms": round((end - start) * 1000, 2),
+        })
+        self._last = end
+
+    def mark(self, name):
+        self._record(name, self._last, _now())
+
+    @contextmanager
+    def phase(self, name):
+        start = _now()
+        try:
+            yield
+        finally:
+            self._record(name, start, _now())
+
+    def frame(self):
+        """Note that the first frame has been drawn."""
+        if self.first_frame is None:
+            self.first_frame = _now()
+            self._record("first draw", self._last, self.first_frame)
+
+    def report(self):
+        first = self.first_frame
+        return {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "release": release(),
+            "boot_to_first_frame_ms": round(first * 1000, 1) if first else None,
+            "process_to_first_frame_ms": round((first - self.process_start) * 1000, 1) if first else None,
+            "phases": self.phases,
+        }
+
+    def dump(self, path=None):
+        """Write the report to path ("-" for stdout), or append it to the history file.
+
+        $ELLIXPI_STARTUP_TRACE overrides the destination.
+        """
+        path = path or os.environ.get("ELLIXPI_STARTUP_TRACE")
+        data = self.report()
+        if path == "-":
+            print(json.dumps(data, indent=2))
+            return data
+        try:
+            if path:
+                with open(path, "w") as f:
+                    json.dump(data, f, indent=2)
+            else:
+                self._append_history(data)
+        except OSError as e:
+            print("startup trace write failed:", e)
+        return data
+
+    def _append_history(self, data):
+        path = os.path.join(cache_dir(), HISTORY_FILE)
+        try:
+            with open(path) as f:
+                lines = f.readlines()[-(MAX_HISTORY - 1):]
+        except OSError:
+            lines = []
+        lines.append(json.dumps(data) + "\n")
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            f.writelines(lines)
+        os.replace(tmp, path)
+
+
+STARTUP = StartupTrace()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# carousel.py — virtualized tile carousel/grid with a fixed pool of widgets
+
+import os
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk, Gdk
+
+from paths import asset
+from pixcache import PIXBUF_CACHE
+from theme import low_power
+from render import TILE_RASTER, GLOW
+
+TILE_SIZE = 220
+ICON_SIZE = 128
+# min-width + padding + border from the .app-button CSS, plus box spacing
+TILE_PITCH = TILE_SIZE + 2 * 12 + 2 + 30
+
+
+def columns_for_width(width):
+    return max(1, (width - 60) // TILE_PITCH)
+
+
+class Tile(Gtk.Button):
+    """One recyclable tile; bind() points it at a different APP_LIST entry."""
+
+    def __init__(self):
+        super().__init__()
+        self.app = None
+        self.selected = False
+        self.get_style_context().add_class("app-button")
+        self.set_can_focus(False)
+        self.set_size_request(TILE_SIZE, TILE_SIZE)
+
+        # Low-power: paint a cached raster instead of letting CSS redraw gradients and glow
+        self.low_power = low_power()
+        if self.low_power:
+            self.get_style_context().add_class("low-power")
+            self.connect("draw", self._draw_raster)
+            self.connect_after("size-allocate", self._extend_clip)
+
+        v = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        v.set_halign(Gtk.Align.CENTER)
+        v.set_valign(Gtk.Align.CENTER)
+
+        # Fixed-size placeholder until the cached icon arrives
+        self.image = Gtk.Image()
+        self.image.set_size_request(ICON_SIZE, ICON_SIZE)
+        v.pack_start(self.image, False, False, 0)
+
+        self.label = Gtk.Label()
+        self.label.set_name("app-label")
+        v.pack_start(self.label, False, False, 0)
+        self.add(v)
+
+    def bind(self, app):
+        if app is self.app:
+            return
+        self.app = app
+        self.label.set_text(app["name"])
+        self.image.clear()
+
+        icon_path = asset(app["icon"]) if app.get("icon") else ""
+        if os.path.isfile(icon_path):
+            pb = PIXBUF_CACHE.load(icon_path, ICON_SIZE, ICON_SIZE,
+                                   lambda pb, bound=app: self._on_icon(bound, pb))
+            if pb is not None:
+                self.image.set_from_pixbuf(pb)
+
+    def _on_icon(self, bound, pb):
+        # The tile may have been recycled while the icon was decoding
+        if bound is self.app:
+            self.image.set_from_pixbuf(pb)
+        return False
+
+    def _draw_raster(self, widget, cr):
+        alloc = self.get_allocation()
+        surf = TILE_RASTER.surface(self, alloc.width, alloc.height, self.selected)
+        cr.set_source_surface(surf, -GLOW, -GLOW)
+        cr.paint()
+        return False  # the button still draws its icon and label
+
+    def _extend_clip(self, widget, alloc):
+        # Room for the glow, so queue_draw() also clears it when deselected
+        clip = Gdk.Rectangle()
+        clip.x, clip.y = alloc.x - GLOW, alloc.y - GLOW
+        clip.width, clip.height = alloc.width + 2 * GLOW, alloc.height + 2 * GLOW
+        self.set_clip(clip)
+
+    def set_selected(self, selected):
+        if selected == self.selected:
+            return
+        self.selected = selected
+        if self.low_power:
+            # No style change, so no CSS recomputation: just repaint this tile
+            self.queue_draw()
+            return
+        ctx = self.get_style_context()
+        if selected:
+            ctx.add_class("selected")
+        else:
+            ctx.remove_class("selected")
+
+
+class TileCarousel(Gtk.Grid):
+    """Shows apps through a pool of columns x rows tiles.
+
+    Only the pooled widgets ever exist, however many apps there are. Moving
+    inside the visible window restyles just the old and new tile; moving
+    past its edge slides the window and rebinds the pool, so both memory
+    and per-move cost are independent of the library size. With rows=1 it
+    is the classic one-line carousel.
+    """
+
+    def __init__(self, columns, rows=1, on_activate=None):
+        super().__init__()
+        self.set_row_spacing(30)
+        self.set_column_spacing(30)
+        self.columns = columns
+        self.rows = rows
+        self.on_activate = on_activate
+        self.apps = []
+        self.selected = None
+        self.first = 0  # index of the app shown in the first pool slot
+
+        self.pool = []
+        for i in range(columns * rows):
+            tile = Tile()
+            tile.set_no_show_all(True)
+            tile.connect("clicked", self._on_tile_clicked)
+            self.attach(tile, i % columns, i // columns, 1, 1)
+            self.pool.append(tile)
+
+    # ---------- Data ----------
+    def set_apps(self, apps):
+        self.apps = list(apps)
+        if self.selected is not None:
+            self.selected = min(self.selected, len(self.apps) - 1) if self.apps else None
+        self.first = self._clamp_first(self.first)
+        self._scroll_to(self.selected if self.selected is not None else 0, force=True)
+
+    @property
+    def selected_app(self):
+        return self.apps[self.selected] if self.selected is not None else None
+
+    # ---------- Selection ----------
+    def select(self, idx, wrap=True):
+        """Select idx, wrapping around the ends or stopping at them. Returns True if it changed."""
+        if not self.apps:
+            self.selected = None
+            return False
+        idx = idx % len(self.apps) if wrap else max(0, min(len(self.apps) - 1, idx))
+        if idx == self.selected:
+            return False
+        old = self.selected
+        self.selected = idx
+        if not self._scroll_to(idx):
+            self._restyle(old)
+            self._restyle(idx)
+        return True
+
+    def move(self, dx, dy=0, wrap=True):
+        """Move by dx tiles along a row and dy rows (plain +-1 steps when rows=1).
+
+        Auto-repeat passes wrap=False, so holding a direction stops at the end
+        of the list instead of flying round it. Returns True if the selection moved.
+        """
+        if not self.apps:
+            return False
+        if self.selected is None:
+            return self.select(0)
+        if self.rows == 1:
+            return self.select(self.selected + dx + dy, wrap)
+        idx = self.selected + dx
+        if dy:
+            idx = self.selected + dy * self.columns
+            idx = max(0, min(len(self.apps) - 1, idx))
+        return self.select(idx, wrap)
+
+    def activate(self):
+        if self.selected is not None and self.on_activate:
+            self.on_activate(self.apps[self.selected])
+
+    # ---------- Virtualization ----------
+    def _clamp_first(self, first):
+        step = 1 if self.rows == 1 else self.columns
+        last_start = max(0, len(self.apps) - len(self.pool))
+        if step > 1:
+            last_start = -(-last_start // step) * step
+        return max(0, min(first, last_start))
+
+    def _scroll_to(self, idx, force=False):
+        """Slide the window so idx is visible. Returns True if the pool was rebound."""
+        size = len(self.pool)
+        first = self.first
+        if idx < first:
+            first = idx if self.rows == 1 else idx - idx % self.columns
+        elif idx >= first + size:
+            first = idx - size + 1
+            if self.rows > 1:
+                first = -(-first // self.columns) * self.columns
+        first = self._clamp_first(first)
+        if first == self.first and not force:
+            return False
+        self.first = first
+        self._rebind()
+        return True
+
+    def _rebind(self):
+        for slot, tile in enumerate(self.pool):
+            i = self.first + slot
+            if i < len(self.apps):
+                tile.bind(self.apps[i])
+                tile.set_selected(i == self.selected)
+                if not tile.get_visible():
+                    tile.show_all()
+            else:
+                tile.hide()
+
+    def _restyle(self, idx):
+        if idx is None:
+            return
+        slot = idx - self.first
+        if 0 <= slot < len(self.pool):
+            self.pool[slot].set_selected(idx == self.selected)
+
+    def _on_tile_clicked(self, tile):
+        idx = self.first + self.pool.index(tile)
+        if idx < len(self.apps):
+            self.select(idx)
+            self.activate()
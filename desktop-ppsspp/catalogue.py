@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# catalogue.py — launcher tiles from XDG .desktop files plus a user manifest
+
+import os
+import json
+import shlex
+from gi.repository import GLib, Gio
+
+from paths import cache_dir, config_dir
+
+DESKTOP_DIRS = [
+    "/usr/share/applications",
+    os.path.expanduser("~/.local/share/applications"),
+]
+INDEX_VERSION = 1
+DEFAULT_CATEGORIES = ["Game"]
+FIELD_CODES = {"%f", "%F", "%u", "%U", "%d", "%D", "%n", "%N", "%i", "%c", "%k", "%v", "%m"}
+
+
+def parse_exec(value):
+    """Split a desktop Exec= line into argv, dropping %f/%u-style field codes."""
+    try:
+        args = shlex.split(value)
+    except ValueError:
+        return []
+    return [a.replace("%%", "%") for a in args if a not in FIELD_CODES]
+
+
+def resolve_icon(icon):
+    """Absolute path for an Icon= value, looked up in the GTK icon theme if needed."""
+    if not icon or os.path.isabs(icon):
+        return icon
+    import gi
+    gi.require_version("Gtk", "3.0")
+    from gi.repository import Gtk
+    info = Gtk.IconTheme.get_default().lookup_icon(icon, 128, 0)
+    return info.get_filename() if info else ""
+
+
+def parse_desktop_file(path):
+    """Index record for one .desktop file, or None if it is not a launchable app."""
+    kf = GLib.KeyFile()
+    try:
+        kf.load_from_file(path, GLib.KeyFileFlags.NONE)
+        group = "Desktop Entry"
+        if kf.get_string(group, "Type") != "Application":
+            return None
+        name = kf.get_locale_string(group, "Name", None)
+        cmd = parse_exec(kf.get_string(group, "Exec"))
+    except GLib.Error:
+        return None
+
+    def optional(getter, key, default):
+        try:
+            return getter("Desktop Entry", key)
+        except GLib.Error:
+            return default
+
+    return {
+        "name": name,
+        "cmd": cmd,
+        "icon": resolve_icon(optional(kf.get_string, "Icon", "")),
+        "categories": [c for c in optional(kf.get_string_list, "Categories", []) if c],
+        "hidden": optional(kf.get_boolean, "NoDisplay", False) or optional(kf.get_boolean, "Hidden", False),
+    }
+
+
+def load_manifest():
+    """User manifest at ~/.config/ellixpi/apps.json.
+
+    {"apps": [APP_LIST-style entries], "categories": ["Game", ...],
+     "rom_dirs": ["~/ROMs", ...]}
+    All keys are optional.
+    """
+    path = os.path.join(config_dir(), "apps.json")
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print("apps.json ignored:", e)
+        return {}
+
+
+class Catalogue:
+    """Persisted index of .desktop files, kept current through inotify.
+
+    Startup only stats the application directories: a directory whose
+    mtime matches the index is taken as-is, so the cost does not grow with
+    the number of installed apps (package managers replace files by
+    rename, which bumps the directory mtime). At runtime each changed file
+    is parsed on its own and the index is written back shortly after.
+    """
+
+    def __init__(self, dirs=DESKTOP_DIRS, on_change=None):
+        self.dirs = dirs
+        self.on_change = on_change
+        self.index_path = os.path.join(cache_dir(), "desktop-index.json")
+        self.entries = {}    # .desktop path -> record (with "mtime")
+        self.dir_mtimes = {}
+        self._monitors = []
+        self._save_id = None
+
+        self._load_index()
+        dirty = False
+        for d in self.dirs:
+            dirty |= self._refresh_dir(d)
+        if dirty:
+            self._save()
+
+    # ---------- Index persistence ----------
+    def _load_index(self):
+        try:
+            with open(self.index_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != INDEX_VERSION:
+            return
+        self.entries = data.get("entries", {})
+        self.dir_mtimes = data.get("dirs", {})
+
+    def _save(self):
+        self._save_id = None
+        data = {"version": INDEX_VERSION, "dirs": self.dir_mtimes, "entries": self.entries}
+        tmp = self.index_path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.index_path)
+        except OSError as e:
+            print("desktop index write failed:", e)
+        return False
+
+    def _schedule_save(self):
+        if self._save_id is None:
+            self._save_id = GLib.timeout_add_seconds(2, self._save)
+
+    # ---------- Scanning ----------
+    def _refresh_dir(self, d):
+        """Bring one directory up to date. Returns True if the index changed."""
+        try:
+            mtime = os.stat(d).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime is not None and self.dir_mtimes.get(d) == mtime:
+            return False
+
+        seen = set()
+        if mtime is not None:
+            for entry in os.scandir(d):
+                if entry.name.endswith(".desktop"):
+                    seen.add(entry.path)
+                    self._update_file(entry.path)
+        for path in [p for p in self.entries if os.path.dirname(p) == d and p not in seen]:
+            del self.entries[path]
+        self.dir_mtimes[d] = mtime
+        return True
+
+    def _update_file(self, path):
+        """Re-parse path if it changed since it was indexed. Returns True if it did."""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return self.entries.pop(path, None) is not None
+        old = self.entries.get(path)
+        if old and old.get("mtime") == mtime:
+            return False
+        record = parse_desktop_file(path) or {"hidden": True}
+        record["mtime"] = mtime
+        self.entries[path] = record
+        return True
+
+    # ---------- inotify ----------
+    def watch(self):
+        for d in self.dirs:
+            if not os.path.isdir(d):
+                continue
+            mon = Gio.File.new_for_path(d).monitor_directory(Gio.FileMonitorFlags.WATCH_MOVES, None)
+            mon.connect("changed", self._on_dir_changed)
+            self._monitors.append(mon)
+
+    def _on_dir_changed(self, monitor, file, other, event):
+        paths = [file.get_path()]
+        if other is not None:
+            paths.append(other.get_path())
+        changed = False
+        for path in paths:
+            if path.endswith(".desktop"):
+                changed |= self._update_file(path)
+        if not changed:
+            return
+        d = os.path.dirname(paths[0])
+        try:
+            self.dir_mtimes[d] = os.stat(d).st_mtime_ns
+        except OSError:
+            pass
+        self._schedule_save()
+        if self.on_change:
+            self.on_change()
+
+    # ---------- Tiles ----------
+    def apps(self, categories=DEFAULT_CATEGORIES):
+        """APP_LIST-style entries for visible apps in any of categories."""
+        wanted = set(categories)
+        apps = []
+        for path, rec in sorted(self.entries.items(), key=lambda kv: kv[1].get("name") or ""):
+            if rec.get("hidden") or not rec.get("cmd"):
+                continue
+            if wanted and not wanted.intersection(rec.get("categories", [])):
+                continue
+            apps.append({"name": rec["name"], "cmd": rec["cmd"], "icon": rec.get("icon", ""),
+                         "desktop_file": path})
+        return apps
+
+
+def build_app_list(builtin, catalogue, groups=None):
+    """Manifest apps (or the built-in list), then catalogue apps, with Shutdown kept last.
+
+    groups maps a tile name to tiles shown right after it, e.g. the indexed
+    PSP games after "PPSSPP" and Steam games after "Steam".
+    """
+    manifest = load_manifest()
+    apps = list(manifest.get("apps") or builtin)
+    known = {a["name"] for a in apps} | {a["cmd"][0] for a in apps if a.get("cmd")}
+    extra = [a for a in catalogue.apps(manifest.get("categories", DEFAULT_CATEGORIES))
+             if a["name"] not in known and a["cmd"][0] not in known]
+
+    tail = [a for a in apps if a["name"] == "Shutdown System"]
+    head = [a for a in apps if a["name"] != "Shutdown System"]
+    grouped = []
+    for app in head:
+        grouped.append(app)
+        grouped.extend((groups or {}).get(app["name"], []))
+    return grouped + extra + tail
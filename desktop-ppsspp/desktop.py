@@ -1,102 +1,56 @@
 #!/usr/bin/env python3
 # desktop.py — Fixed overlay, glowy popups, carousel/selection, clean CSS
 
+from boottrace import STARTUP
+STARTUP.mark("interpreter")
+
 import gi
 gi.require_version("Gtk", "3.0")
-gi.require_version("GdkPixbuf", "2.0")
-from gi.repository import Gtk, Gdk, GdkPixbuf, GLib
-import psutil
+from gi.repository import Gtk, GLib
 import os
 import time
-import subprocess
-import fcntl
-from evdev import InputDevice, list_devices, ecodes
-import shutil
+from evdev import ecodes
 import sys
 
-# ---------- Styling (GTK CSS) ----------
-CSS = b"""
-window { background-color: #121212; }
-
-#bg { }
-
-.popup-dialog {
-    background: linear-gradient(145deg, rgba(155,155,155,0.85) 0%, rgba(120,120,120,0.70) 100%);
-    border-radius: 20px;
-    border: 1px solid rgba(255,255,255,0.12);
-    color: white;
-    font-size: 20px;
-    font-weight: bold;
-    padding: 25px;
-    min-width: 400px;
-    min-height: 100px;
-    box-shadow:
-        0 0 25px rgba(255,255,255,0.5),
-        inset 0 1px 10px rgba(255,255,255,0.45);
-}
-
-.app-button {
-  background: linear-gradient(145deg, rgba(255,255,255,0.55) 0%, rgba(220,220,220,0.40) 100%);
-  border-radius: 14px;
-  border: 1px solid rgba(255,255,255,0.12);
-  color: white;
-  font-weight: 600;
-  font-size: 20px;
-  min-width: 220px;
-  min-height: 220px;
-  padding: 12px;
-}
-
-.app-button:hover {
-  background-color: rgba(255,255,255,0.12);
-}
-
-.app-button.selected {
-  background: linear-gradient(145deg, rgba(255,255,255,0.75) 0%, rgba(220,220,220,0.50) 100%);
-  box-shadow:
-    inset 0 1px 8px rgba(255,255,255,0.45),
-    0 0 18px rgba(255,255,255,0.45);
-  color: white;
-}
-
-.app-label { color: white; margin-top: 8px; }
-
-#settings-btn {
-  background: linear-gradient(145deg, rgba(255,255,255,0.55) 0%, rgba(220,220,220,0.40) 100%);
-  border-radius: 12px;
-  border: 1px solid rgba(255,255,255,0.12);
-  color: white;
-  font-size: 18px;
-  padding: 10px 14px;
-}
-
-#settings-btn.selected {
-  background: linear-gradient(145deg, rgba(255,255,255,0.75) 0%, rgba(220,220,220,0.50) 100%);
-  box-shadow:
-    inset 0 1px 8px rgba(255,255,255,0.45),
-    0 0 15px rgba(255,255,255,0.45);
-  color: white;
-}
-
-#clock {
-  color: white;
-  background: linear-gradient(145deg, rgba(255,255,255,0.55) 0%, rgba(220,220,220,0.40) 100%);
-  padding: 6px 10px;
-  border-radius: 8px;
-  font-family: monospace;
-  font-size: 20px;
-}
-"""
+from tracing import TRACE
+from theme import install_css
+from render import meter_frames
+from scheduler import Scheduler, widget_timeout
+from gamepad import open_gamepad
+from navigation import StickNavigator
+from pixcache import PIXBUF_CACHE
+from sound import SOUND_ENGINE, play_sound
+from winindex import WindowIndex, wm_class_for
+from supervisor import Supervisor
+from prewarm import WarmPool
+from catalogue import Catalogue, build_app_list, load_manifest
+from library import GameLibrary
+from steamlib import SteamLibrary
+from carousel import TileCarousel, columns_for_width
+from settings import SettingsPage
+from Xlib.error import DisplayError
+STARTUP.mark("imports")
 
 # ---------- App definitions ----------
+# Built-in tiles. ~/.config/ellixpi/apps.json can replace them ("apps") and
+# choose which .desktop categories become tiles ("categories", default Game).
+# Optional keys:
+#   "wm_class": window class to focus when the app is already running
+#   "prewarm":  command started in the background after the first frame,
+#               or "readahead" to only page cmd[0] (+ "readahead" paths) in
+#   "resident": restart the prewarm command after the app exits
+#   "page":     name of a page hosted in this window instead of a command
+#   "focus_class": False to only focus windows of this tile's own processes
+#               (game tiles share PPSSPP's window class)
 APP_LIST = [
-    {"name": "Settings", "cmd": ["python3", "settings.py"], "icon": "settings.png"},
-    {"name": "Browser", "cmd": ["/usr/bin/firefox-esr"], "icon": "browser.png"},
-    {"name": "PPSSPP",  "cmd": ["/usr/local/bin/PPSSPP.AppImage", "--fullscreen"], "icon": "ppsspp.png"},
-    {"name": "Files",   "cmd": ["/usr/bin/nautilus"], "icon": "nautilus.png"},
-    {"name": "Revolt", "cmd": ["/usr/local/bin/Revolt.AppImage"], "icon": "revolt.png"},
-    {"name": "Steam", "cmd": ["steam"], "icon": "steam.png"},
-    {"name": "Minecraft", "cmd": ["/usr/local/bin/PrismLauncher.AppImage"], "icon": "prism.png"},
+    {"name": "Settings", "cmd": [""], "icon": "settings.png", "page": "settings"},
+    {"name": "Browser", "cmd": ["/usr/bin/firefox-esr"], "icon": "browser.png",
+     "prewarm": "readahead", "readahead": ["/usr/lib/firefox-esr/libxul.so"]},
+    {"name": "PPSSPP",  "cmd": ["/usr/local/bin/PPSSPP.AppImage", "--fullscreen"], "icon": "ppsspp.png", "prewarm": "readahead"},
+    {"name": "Files",   "cmd": ["/usr/bin/nautilus"], "icon": "nautilus.png", "wm_class": "org.gnome.Nautilus"},
+    {"name": "Revolt", "cmd": ["/usr/local/bin/Revolt.AppImage"], "icon": "revolt.png", "prewarm": "readahead"},
+    {"name": "Steam", "cmd": ["steam"], "icon": "steam.png", "prewarm": ["steam", "-silent"], "resident": True},
+    {"name": "Minecraft", "cmd": ["/usr/local/bin/PrismLauncher.AppImage"], "icon": "prism.png", "prewarm": "readahead"},
     {"name": "Shutdown System", "cmd": [""], "icon": "shutdown.png"},
 ]
 
@@ -113,34 +67,37 @@ class LauncherWindow(Gtk.Window):
         self.set_default_size(monitor.width, monitor.height)
         self.move(monitor.x, monitor.y)
 
-        style = Gtk.CssProvider()
-        style.load_from_data(CSS)
-        Gtk.StyleContext.add_provider_for_screen(screen, style, Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION)
+        with STARTUP.phase("css"):
+            install_css(screen)
 
         overlay = Gtk.Overlay()
         self.add(overlay)
         
         self.connect("delete-event", self.on_delete)
-        # Background
+
+        # Pages: the launcher itself, plus Settings once it is first opened
+        self.monitor = monitor
+        self.stack = Gtk.Stack()
+        self.stack.set_transition_type(Gtk.StackTransitionType.NONE)
+        overlay.add(self.stack)
+        home = Gtk.Overlay()
+        self.stack.add_named(home, "home")
+        self.settings_page = None
+
+        # Background (decoded off the main thread; the dark window shows until then)
+        self.bg = Gtk.Image()
+        self.bg.set_name("bg")
+        home.add(self.bg)
         bg_path = os.path.join(os.path.dirname(__file__), "purple-ppsspp-bg.jpg")
         if os.path.exists(bg_path):
-            try:
-                pb = GdkPixbuf.Pixbuf.new_from_file(bg_path)
-                scaled = pb.scale_simple(monitor.width, monitor.height, GdkPixbuf.InterpType.BILINEAR)
-                self.bg = Gtk.Image.new_from_pixbuf(scaled)
-                self.bg.set_name("bg")
-                overlay.add(self.bg)
-            except Exception as e:
-                print("bg load failed:", e)
-                self.bg = None
-        else:
-            self.bg = None
+            with STARTUP.phase("images"):
+                self._set_image(self.bg, bg_path, monitor.width, monitor.height)
 
-        # Buttons container (horizontal box)
-        self.button_box = Gtk.Box(spacing=30)
-        self.button_box.set_halign(Gtk.Align.CENTER)
-        self.button_box.set_valign(Gtk.Align.CENTER)
-        overlay.add_overlay(self.button_box)
+        # Tiles: a fixed pool of widgets, whatever the number of apps
+        self.carousel = TileCarousel(columns_for_width(monitor.width), on_activate=self.launch_app)
+        self.carousel.set_halign(Gtk.Align.CENTER)
+        self.carousel.set_valign(Gtk.Align.CENTER)
+        home.add_overlay(self.carousel)
 
         # Topbar container
         self.topbar_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
@@ -162,97 +119,160 @@ class LauncherWindow(Gtk.Window):
         self.clock = Gtk.Label(label="")
         self.clock.set_name("clock")
         self.topbar_box.pack_end(self.clock, False, False, 0)
-        GLib.timeout_add_seconds(1, self._tick_clock)
+
+        # Periodic work and input stop while a launched app is in front
+        self.scheduler = Scheduler(self, on_suspend=self._on_suspend, on_resume=self._on_resume)
+        self.scheduler.every(1, self._tick_clock)
         self._tick_clock()
 
-        # Create buttons
-        self.app_buttons = []
-        for app in APP_LIST:
-            btn = self._make_app_button(app)
-            self.app_buttons.append(btn)
-            self.button_box.pack_start(btn, False, False, 0)
+        STARTUP.mark("layout")
+
+        # Launched apps, reaped and tracked by pid; the pool reads the live tile list
+        self.supervisor = Supervisor()
+        self.warm_pool = WarmPool(self.supervisor, lambda: self.apps)
 
-        # Selection + joystick
-        self.selected = None
+        # Tiles: manifest/built-in apps, indexed PSP and Steam games, .desktop games
+        with STARTUP.phase("tiles"):
+            self.catalogue = Catalogue(on_change=self._on_catalogue_changed)
+            self.library = GameLibrary(load_manifest().get("rom_dirs"))
+            self.steam = SteamLibrary(on_change=self._refresh_tiles)
+            self._refresh_tiles()
+
+        # Selection + joystick (the gamepad is probed after the first frame)
         self.selection_enabled = False
         GLib.timeout_add(500, self._enable_selection_delay)
 
-        self.joystick = None
-        self._find_joystick()
-        self.joystick_last = 0
-        self.joystick_move_delay = 0.25
-        GLib.timeout_add(30, self._poll_joystick)
+        self.nav = StickNavigator(self._move_selection)
+        self.gamepad = None
+
+        # Top-level windows, for focusing apps that are already running (after the first frame)
+        self.windows = None
 
         # Events
         self.connect("key-press-event", self._on_key)
+        meter_frames(self)
+        self._first_draw_id = self.connect_after("draw", self._on_first_draw)
 
-        self.show_all()
+        with STARTUP.phase("widgets"):
+            self.show_all()
 
-    # ---------- Selection helpers ----------
-    def _apply_selection_styles(self):
-        for i, btn in enumerate(self.app_buttons):
-            ctx = btn.get_style_context()
-            if i == self.selected:
-                ctx.add_class("selected")
-            else:
-                ctx.remove_class("selected")
+    def _on_first_draw(self, widget, cr):
+        self.disconnect(self._first_draw_id)
+        STARTUP.frame()
+        # Let the frame reach the screen before the deferred work starts
+        GLib.idle_add(self._after_first_frame, priority=GLib.PRIORITY_LOW)
+        return False
+
+    def _after_first_frame(self):
+        """Everything the first frame does not need, in the order it is useful."""
+        with STARTUP.phase("device probing"):
+            self.gamepad = open_gamepad(self._on_joystick_event, on_attach=self.nav.calibrate)
+            if not self.scheduler.active:
+                self.gamepad.pause()
+            self._find_joystick()
+        with STARTUP.phase("window index"):
+            try:
+                self.windows = WindowIndex()
+            except DisplayError as e:
+                print("window index unavailable:", e)
+        with STARTUP.phase("sounds"):
+            SOUND_ENGINE.preload()
+            play_sound("start.mp3")
+        with STARTUP.phase("watches"):
+            self.catalogue.watch()
+            self.steam.watch()
+        STARTUP.dump()
+
+        # Give the first frames a moment before competing for disk and CPU
+        GLib.timeout_add_seconds(2, self.warm_pool.start)
+        self.library.scan_async(self._refresh_tiles)
+        return False
 
+    # ---------- Selection helpers ----------
     def _enable_selection_delay(self):
         self.selection_enabled = True
-        if self.selected is None and self.app_buttons:
-            self._set_selection(0)
+        if self.carousel.selected is None:
+            self.carousel.select(0)
         return False
 
-    def _set_selection(self, idx):
-        if not self.app_buttons:
-            self.selected = None
-            return
-        idx = idx % len(self.app_buttons)
-        self.selected = idx
-        self._apply_selection_styles()
-
-    def _move_selection(self, delta):
-        if self.selected is None:
-            if self.app_buttons:
-                self._set_selection(0)
-            return
-        self._set_selection(self.selected + delta)
+    def _active_carousel(self):
+        if self._settings_visible():
+            return self.settings_page.carousel
+        return self.carousel
+
+    def _settings_visible(self):
+        return self.settings_page is not None and self.stack.get_visible_child() is self.settings_page
+
+    def _move_selection(self, dx, dy=0, repeat=False):
+        if self._settings_visible() and self.settings_page.popup_move(dx, dy):
+            return True
+        return self._active_carousel().move(dx, dy, wrap=not repeat)
+
+    # ---------- Pages ----------
+    def show_settings(self):
+        if self.settings_page is None:
+            self.settings_page = SettingsPage(self.monitor.width, self.monitor.height, on_close=self.show_home,
+                                              get_apps=lambda: self.apps, get_sessions=self._app_sessions)
+            self.stack.add_named(self.settings_page, "settings")
+            self.settings_page.show_all()
+        self.settings_page.reset_selection()
+        self.stack.set_visible_child(self.settings_page)
+
+    def _app_sessions(self):
+        """Session id of every live launch -> tile name, for the task manager."""
+        return {e.pid: e.name for entries in self.supervisor.apps.values() for e in entries if not e.ended}
+
+    def show_home(self):
+        self.stack.set_visible_child_name("home")
+
+    def _go_home(self):
+        """Home button: bring the launcher back in front of whatever app has it."""
+        self.show_home()
+        win_id = self.windows.find_pid(os.getpid()) if self.windows else None
+        if win_id:
+            self.windows.activate(win_id)
+        else:
+            self.present()
 
     # ---------- Button creation / launching ----------
-    def _make_app_button(self, app):
-        btn = Gtk.Button()
-        btn.get_style_context().add_class("app-button")
-        btn.set_can_focus(False)
-        btn.set_size_request(220, 220)
-
-        v = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
-        v.set_halign(Gtk.Align.CENTER)
-        v.set_valign(Gtk.Align.CENTER)
-
-        icon_path = os.path.join(os.path.dirname(__file__), app["icon"])
-        if os.path.exists(icon_path):
-            try:
-                pb = GdkPixbuf.Pixbuf.new_from_file(icon_path)
-                pb = pb.scale_simple(128, 128, GdkPixbuf.InterpType.BILINEAR)
-                img = Gtk.Image.new_from_pixbuf(pb)
-                v.pack_start(img, False, False, 0)
-            except Exception as e:
-                print("icon load failed:", e)
-
-        lbl = Gtk.Label(label=app["name"])
-        lbl.set_name("app-label")
-        v.pack_start(lbl, False, False, 0)
-
-        btn.add(v)
-        btn.connect("clicked", lambda w: self.launch_app(app))
-        return btn
-    
-    
+    def _refresh_tiles(self):
+        groups = {"PPSSPP": self.library.tiles(), "Steam": self.steam.tiles()}
+        self.apps = build_app_list(APP_LIST, self.catalogue, groups)
+        self.carousel.set_apps(self.apps)
+        self.warm_pool.refresh()
+        return False
+
+    def _on_catalogue_changed(self):
+        self._refresh_tiles()
+
+    def _set_image(self, img, path, width, height):
+        pb = PIXBUF_CACHE.load(path, width, height, img.set_from_pixbuf)
+        if pb is not None:
+            img.set_from_pixbuf(pb)
+
+    def _find_app_window(self, app):
+        if not self.windows:
+            return None
+        # Prefer the windows of the process trees we started ourselves
+        for entry in self.supervisor.running_entries(app["name"]):
+            for pid in entry.pids():
+                win_id = self.windows.find_pid(pid)
+                if win_id:
+                    return win_id
+        # Single-instance apps may have handed off to a process we don't own
+        if not app.get("focus_class", True):
+            return None
+        return self.windows.find_class(wm_class_for(app))
+
     def launch_app(self, app, options=None):
         """
         self: LauncherWindow instance
         app: dict from APP_LIST
         """
+        if app.get("page") == "settings":
+            self.show_settings()
+            return
+
         if app["name"] == "Shutdown System":
             play_sound("quit.mp3")
             self._show_popup("Shutting Down. Please Wait")
@@ -262,31 +282,19 @@ class LauncherWindow(Gtk.Window):
             sys.exit()
         
         try:
-            cmd_name = app["cmd"][0]  # access dict key instead of attribute
-            # List all windows
-            output = subprocess.getoutput("wmctrl -lx").splitlines()
-            win_id = None
-
-            for line in output:
-                parts = line.split()
-                if len(parts) < 3:
-                    continue
-                wid, wclass = parts[0], parts[2]
-                if cmd_name.lower() in wclass.lower():
-                    win_id = wid
-                    break
+            self.warm_pool.claim(app)
+            win_id = self._find_app_window(app)
 
             if win_id:
-                subprocess.run(["xdotool", "windowmap", win_id])
-                subprocess.run(["xdotool", "windowactivate", win_id])
-                print(f"{app['name']} focused")
+                self.windows.activate(win_id)
+                TRACE.info("launch", "%s focused", app["name"])
             else:
-                subprocess.Popen(app["cmd"])
-                print(f"Launching {app['name']}")
+                self.supervisor.launch(app)
+                TRACE.info("launch", "launching %s", app["name"])
             
             play_sound("open.mp3")
         except Exception as e:
-            print(f"Error in launch_app: {e}")
+            TRACE.error("launch", "%s failed: %s", app["name"], e)
             play_sound("error.mp3")
 
 
@@ -321,7 +329,7 @@ class LauncherWindow(Gtk.Window):
         popup.show_all()
 
         self._center_popup(popup)
-        GLib.timeout_add(duration, popup.destroy)
+        widget_timeout(popup, duration, popup.destroy)
 
 
 
@@ -334,6 +342,20 @@ class LauncherWindow(Gtk.Window):
         y = (parent_height - popup_height)//2
         popup.move(x, y)
 
+    # ---------- Suspension ----------
+    def _on_suspend(self):
+        self.nav.reset()
+        if self.gamepad:
+            self.gamepad.pause()
+        if self.settings_page is not None:
+            self.settings_page.suspend()
+
+    def _on_resume(self):
+        if self.gamepad:
+            self.gamepad.resume()
+        if self.settings_page is not None:
+            self.settings_page.resume()
+
     # ---------- Clock ----------
     def _tick_clock(self):
         self.clock.set_text(time.strftime("%H:%M:%S"))
@@ -346,99 +368,43 @@ class LauncherWindow(Gtk.Window):
     # ---------- Keyboard ----------
     def _on_key(self, win, event):
         if not self.selection_enabled: return
+        if self._active_carousel() is not self.carousel:
+            self.settings_page.on_key(event)
+            return
         key = event.keyval
         if key in [65361, 104]:  # left / h
             self._move_selection(-1)
         elif key in [65363, 108]:  # right / l
             self._move_selection(1)
         elif key in [65293, 32]:  # enter / space
-            if self.selected is not None:
-                self.app_buttons[self.selected].clicked()
+            self.carousel.activate()
         elif key in [65307]:  # esc
             Gtk.main_quit()
 
     # ---------- Joystick ----------
     def _find_joystick(self):
-        from evdev import ecodes
-
-        for dev_path in list_devices():
-            dev = InputDevice(dev_path)
-            caps = dev.capabilities()
-            
-            # Debug: print capabilities for each device
-            print(f"Checking device: {dev.name} ({dev.path})")
-            print(f"Capabilities: {caps.keys()}")
-
-            # Look for ABS axes (analog stick) and BTN keys (buttons)
-            has_axes = any(code in [ecodes.ABS_X, ecodes.ABS_Y] for code, _ in caps.get(ecodes.EV_ABS, []))
-            has_buttons = ecodes.EV_KEY in caps
-
-            if has_axes or has_buttons:
-                self.joystick = dev
-                fcntl.fcntl(dev.fd, fcntl.F_SETFL, os.O_NONBLOCK)
-                print("Joystick/gamepad found:", dev.name, dev.path)
-                break
+        return self.gamepad.find()
 
-        if not self.joystick:
-            print("No joystick/gamepad detected")
-
-
-    def _poll_joystick(self):
-        if not self.joystick or not self.selection_enabled:
-            return True
-
-        try:
-            while True:
-                e = self.joystick.read_one()
-                if e is None:
-                    break
-
-                # Debug: print all events
-                print(f"Joystick event: type={e.type}, code={e.code}, value={e.value}")
-
-                if e.type == ecodes.EV_ABS:
-                    now = time.time()
-                    if now - self.joystick_last < self.joystick_move_delay:
-                        continue
-
-                    if e.code == ecodes.ABS_X:
-                        if e.value < -1000:
-                            print("Move left detected")
-                            self._move_selection(-1)
-                            self.joystick_last = now
-                        elif e.value > 1000:
-                            print("Move right detected")
-                            self._move_selection(1)
-                            self.joystick_last = now
-
-                    elif e.code == ecodes.ABS_Y:
-                        if e.value < -1000:
-                            print("Move up detected")
-                            self._move_selection(-1)
-                            self.joystick_last = now
-                        elif e.value > 1000:
-                            print("Move down detected")
-                            self._move_selection(1)
-                            self.joystick_last = now
-
-                elif e.type == ecodes.EV_KEY and e.value == 1:  # button press
-                    if e.code == ecodes.BTN_SOUTH:
-                        print("Button A pressed")
-                        if self.selected is not None:
-                            self.app_buttons[self.selected].clicked()
-                            self.joystick_last = now
-                    elif e.code == ecodes.BTN_EAST:
-                        print("Button X pressed")
-                        if self.selected is not None:
-                            self.app_buttons[self.selected].clicked()
-                            self.joystick_last = now
-
-        except BlockingIOError:
-            pass
-        except Exception as exc:
-            print("Joystick error:", exc)
+    @TRACE.timed("input.joystick")
+    def _on_joystick_event(self, e):
+        TRACE.debug("input", "joystick type=%d code=%d value=%d", e.type, e.code, e.value)
+        if e.type == ecodes.EV_KEY and e.code == ecodes.BTN_MODE and e.value == 1:
+            self._go_home()
+            return
+        if not self.selection_enabled:
+            return
 
-        return True
+        if self.nav.feed(e):
+            return
+        if e.type == ecodes.EV_KEY and e.value == 1:  # button press
+            if self._settings_visible() and self.settings_page.popup_button(e.code):
+                return
+            if e.code == ecodes.BTN_SOUTH:
+                TRACE.debug("input", "button A")
+                self._active_carousel().activate()
+            elif e.code == ecodes.BTN_EAST:
+                TRACE.debug("input", "button X")
+                self._active_carousel().activate()
 
     def on_delete(self, widget, event):
         # Ignore all delete events
@@ -447,21 +413,11 @@ class LauncherWindow(Gtk.Window):
     
 
     
-def play_sound(file_path):
-    """Play a WAV or MP3 file asynchronously."""
-    if shutil.which("mpg123") and file_path.endswith(".mp3"):
-        subprocess.Popen(["mpg123", file_path])
-    elif shutil.which("aplay") and file_path.endswith(".wav"):
-        subprocess.Popen(["aplay", file_path])
-    else:
-        print("No suitable audio player found")
-
-
 # ---------- Run ----------
 if __name__ == "__main__":
+    TRACE.serve("desktop")
     win = LauncherWindow()
     win.connect("destroy", Gtk.main_quit)
-    play_sound("start.mp3")
     Gtk.main()
 
 
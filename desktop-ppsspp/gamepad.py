@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# gamepad.py — event-driven gamepad reader with /dev/input hotplug, or via the input router
+
+import os
+import fcntl
+import errno
+from gi.repository import GLib, Gio
+from evdev import InputDevice, list_devices, ecodes
+
+from tracing import TRACE
+from inputrouter import RouterConnection, HOME_BUTTON
+
+INPUT_DIR = "/dev/input"
+
+
+def is_gamepad(dev):
+    """True if the evdev device looks like a joystick or gamepad."""
+    caps = dev.capabilities()
+    keys = caps.get(ecodes.EV_KEY, [])
+    axes = [code for code, _ in caps.get(ecodes.EV_ABS, [])]
+
+    # Look for ABS axes (analog stick) and BTN keys (buttons)
+    has_axes = ecodes.ABS_X in axes or ecodes.ABS_Y in axes
+    has_buttons = ecodes.BTN_GAMEPAD in keys or ecodes.BTN_JOYSTICK in keys
+    # Touchpads and tablets also report ABS_X/ABS_Y
+    is_pointer = ecodes.BTN_TOUCH in keys or ecodes.BTN_TOOL_PEN in keys
+    return has_buttons or (has_axes and not is_pointer)
+
+
+class Gamepad:
+    """Follows the first gamepad on the system and forwards its events.
+
+    Events are delivered to on_event(event) from a GLib IO watch, so nothing
+    runs until the kernel has input for us. /dev/input is watched with
+    inotify, and only nodes that appear or disappear are probed again.
+    """
+
+    def __init__(self, on_event, on_attach=None):
+        self.on_event = on_event
+        self.on_attach = on_attach
+        self.device = None
+        self.paused = False
+        self._watch_id = None
+        self._rejected = set()  # nodes already probed that are not gamepads
+
+        self._monitor = Gio.File.new_for_path(INPUT_DIR).monitor_directory(Gio.FileMonitorFlags.NONE, None)
+        self._monitor.connect("changed", self._on_dir_changed)
+
+    # ---------- Discovery ----------
+    def find(self):
+        """Attach to the first gamepad not probed yet. Returns True if attached."""
+        if self.device:
+            return True
+        for dev_path in list_devices():
+            if self._probe(dev_path):
+                return True
+        TRACE.info("gamepad", "no joystick/gamepad detected")
+        return False
+
+    def _probe(self, dev_path):
+        if self.device or dev_path in self._rejected:
+            return self.device is not None
+        try:
+            dev = InputDevice(dev_path)
+        except PermissionError:
+            # udev has not applied the ACL yet; ATTRIB will bring us back
+            return False
+        except OSError:
+            return False
+
+        TRACE.debug("gamepad", "checking %s (%s)", dev.name, dev.path)
+        if not is_gamepad(dev):
+            self._rejected.add(dev_path)
+            dev.close()
+            return False
+
+        self._attach(dev)
+        return True
+
+    def _attach(self, dev):
+        fcntl.fcntl(dev.fd, fcntl.F_SETFL, os.O_NONBLOCK)
+        self.device = dev
+        if not self.paused:
+            self._watch()
+        TRACE.info("gamepad", "found %s (%s)", dev.name, dev.path)
+        if self.on_attach:
+            self.on_attach(dev)
+
+    def _watch(self):
+        self._watch_id = GLib.io_add_watch(
+            self.device.fd, GLib.PRIORITY_DEFAULT,
+            GLib.IO_IN | GLib.IO_HUP | GLib.IO_ERR,
+            self._on_readable)
+
+    def _unwatch(self):
+        if self._watch_id is not None:
+            GLib.source_remove(self._watch_id)
+            self._watch_id = None
+
+    def _detach(self):
+        self._unwatch()
+        if self.device:
+            TRACE.info("gamepad", "removed %s", self.device.path)
+            try:
+                self.device.close()
+            except OSError:
+                pass
+            self.device = None
+
+    # ---------- Suspension ----------
+    def pause(self):
+        """Stop reading while another app is in front; its input is not ours."""
+        self.paused = True
+        self._unwatch()
+
+    def resume(self):
+        """Read again, dropping whatever was queued while paused."""
+        if not self.paused:
+            return
+        self.paused = False
+        if not self.device:
+            self.find()
+            return
+        try:
+            while self.device.read_one() is not None:
+                pass
+        except OSError:
+            self._detach()
+            self.find()
+            return
+        self._watch()
+
+    def close(self):
+        self._detach()
+        self._monitor.cancel()
+
+    # ---------- Hotplug ----------
+    def _on_dir_changed(self, monitor, file, other, event):
+        path = file.get_path()
+        if not os.path.basename(path).startswith("event"):
+            return
+
+        if event == Gio.FileMonitorEvent.DELETED:
+            self._rejected.discard(path)
+            if self.device and self.device.path == path:
+                self._detach()
+                # Another controller may still be plugged in
+                self.find()
+        elif event in (Gio.FileMonitorEvent.CREATED, Gio.FileMonitorEvent.ATTRIBUTE_CHANGED):
+            if not self.device:
+                self._probe(path)
+
+    # ---------- Reading ----------
+    def _on_readable(self, fd, condition):
+        if condition & (GLib.IO_HUP | GLib.IO_ERR):
+            self._watch_id = None
+            self._detach()
+            # Another controller may still be plugged in
+            self.find()
+            return False
+
+        try:
+            for e in self.device.read():
+                self.on_event(e)
+        except BlockingIOError:
+            pass
+        except OSError as exc:
+            if exc.errno != errno.ENODEV:
+                TRACE.warn("gamepad", "read error: %s", exc)
+            self._watch_id = None
+            self._detach()
+            self.find()
+            return False
+        return True
+
+
+class RouterGamepad:
+    """The Gamepad interface on top of the input router (inputrouter.py).
+
+    The router holds the exclusive grab; this client claims input while it
+    runs and releases it on pause(), which hands the pad back to the game.
+    While paused only the home button still arrives.
+    """
+
+    RETRY = 2  # seconds between reconnects after the router went away
+
+    def __init__(self, role, on_event, on_attach=None, conn=None):
+        self.role = role
+        self.on_event = on_event
+        self.on_attach = on_attach
+        self.conn = conn
+        self.paused = False
+        self._watch_id = None
+        self._retry_id = None
+
+    @property
+    def device(self):
+        return self.conn.device if self.conn else None
+
+    def find(self):
+        if self.conn is None:
+            try:
+                self.conn = RouterConnection(self.role)
+            except OSError as e:
+                TRACE.warn("gamepad", "input router unavailable: %s", e)
+                self._schedule_retry()
+                return False
+        if self._watch_id is None:
+            self._watch_id = GLib.io_add_watch(
+                self.conn.fileno(), GLib.PRIORITY_DEFAULT,
+                GLib.IO_IN | GLib.IO_HUP | GLib.IO_ERR,
+                self._on_readable)
+            self._send(self.conn.release if self.paused else self.conn.claim)
+            TRACE.info("gamepad", "connected to the input router as %s", self.role)
+        return True
+
+    def pause(self):
+        self.paused = True
+        if self.conn:
+            self._send(self.conn.release)
+
+    def resume(self):
+        self.paused = False
+        if self.conn:
+            self._send(self.conn.claim)
+
+    def close(self):
+        if self._watch_id is not None:
+            GLib.source_remove(self._watch_id)
+            self._watch_id = None
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def _send(self, request):
+        try:
+            request()
+        except OSError:
+            self._lost()
+
+    def _on_readable(self, fd, condition):
+        if condition & (GLib.IO_HUP | GLib.IO_ERR):
+            self._watch_id = None
+            self._lost()
+            return False
+        before = self.device
+        try:
+            events = self.conn.read()
+        except BlockingIOError:
+            events = []
+        except OSError:
+            self._watch_id = None
+            self._lost()
+            return False
+        if self.device is not None and self.device is not before and self.on_attach:
+            self.on_attach(self.device)
+        for e in events:
+            # Frames already in flight when we released
+            if self.paused and not (e.type == ecodes.EV_KEY and e.code == HOME_BUTTON):
+                continue
+            self.on_event(e)
+        return True
+
+    def _lost(self):
+        TRACE.warn("gamepad", "lost the input router")
+        self.close()
+        self._schedule_retry()
+
+    def _schedule_retry(self):
+        if self._retry_id is None:
+            self._retry_id = GLib.timeout_add_seconds(self.RETRY, self._retry)
+
+    def _retry(self):
+        self._retry_id = None
+        self.find()
+        return False
+
+
+def open_gamepad(on_event, on_attach=None, role="launcher"):
+    """A RouterGamepad if the input router is running, else a Gamepad reading /dev/input itself."""
+    try:
+        conn = RouterConnection(role)
+    except OSError:
+        return Gamepad(on_event, on_attach)
+    return RouterGamepad(role, on_event, on_attach, conn)
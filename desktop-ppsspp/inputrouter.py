@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+# inputrouter.py — one reader for every gamepad: exclusive grab, epoll, dispatch over a Unix socket
+#
+# Run once per session, before the launcher. Each physical controller is
+# grabbed (EVIOCGRAB) so nothing else sees its raw events, and a uinput
+# clone of it is created for games. Frames of events go to whichever
+# client claimed input last (launcher, mouse emulator, on-screen
+# keyboard); when nobody has claimed it they are replayed on the clone.
+# Select + Start together toggles the mouse emulator's mouse mode,
+# whoever has input.
+
+import os
+import sys
+import json
+import errno
+import ctypes
+import socket
+import select
+import struct
+from evdev import InputDevice, UInput, AbsInfo, InputEvent, list_devices, ecodes
+
+from paths import runtime_dir
+from tracing import TRACE
+
+INPUT_DIR = "/dev/input"
+SOCKET_NAME = "input.sock"
+ROUTER_PHYS = "ellixpi-router"  # marks our own clones so they are never grabbed
+ROLES = ("launcher", "mouse", "keyboard")
+# Always delivered to the launcher, whoever has input, so it can come back to the front
+HOME_BUTTON = ecodes.BTN_MODE
+# Pressed together, sent to the mouse client as a toggle of mouse mode
+MOUSE_CHORD = {ecodes.BTN_SELECT, ecodes.BTN_START}
+# What the clone's axes are set to when input is taken back from a game:
+# sticks to their centre, hats to 0, and everything else (triggers) to its minimum
+STICK_AXES = (ecodes.ABS_X, ecodes.ABS_Y, ecodes.ABS_RX, ecodes.ABS_RY)
+HAT_AXES = tuple(range(ecodes.ABS_HAT0X, ecodes.ABS_HAT3Y + 1))
+
+EVENT = struct.Struct("<qHHi")  # timestamp (us), type, code, value
+# Messages are SOCK_SEQPACKET datagrams, tagged by their first byte:
+#   router -> client: b"E" + EVENT * n  one SYN_REPORT frame
+#                     b"A" + json       a controller attached: {"abs": {code: [min, max, flat, value]}}
+#                     b"D"              the last controller went away
+#                     b"T"              toggle mouse mode (mouse clients only)
+#   client -> router: b"hello <role>", b"claim", b"release"
+MAX_MESSAGE = 64 * EVENT.size + 1
+
+
+def socket_path():
+    return os.path.join(runtime_dir(), SOCKET_NAME)
+
+
+# ---------- Hotplug ----------
+class Inotify:
+    """Minimal non-blocking inotify on one directory, for an epoll loop."""
+
+    IN_ATTRIB = 0x4
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    def __init__(self, path):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        mask = self.IN_CREATE | self.IN_DELETE | self.IN_ATTRIB
+        if libc.inotify_add_watch(self.fd, path.encode(), mask) < 0:
+            raise OSError(ctypes.get_errno(), "inotify_add_watch " + path)
+
+    def read(self):
+        """[(name, mask)] of the changes queued so far."""
+        try:
+            data = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return []
+        changes = []
+        pos = 0
+        while pos < len(data):
+            _wd, mask, _cookie, length = struct.unpack_from("iIII", data, pos)
+            name = data[pos + 16:pos + 16 + length].rstrip(b"\0").decode(errors="replace")
+            changes.append((name, mask))
+            pos += 16 + length
+        return changes
+
+
+# ---------- Router ----------
+class Controller:
+    """A grabbed physical pad and the uinput clone games see instead."""
+
+    def __init__(self, dev):
+        dev.grab()
+        self.dev = dev
+        # Same ids as the pad so SDL and Steam mappings apply, and EV_FF kept for rumble
+        info = dev.info
+        self.clone = UInput.from_device(dev, filtered_types=(ecodes.EV_SYN,), name=dev.name, phys=ROUTER_PHYS,
+                                        vendor=info.vendor, product=info.product, version=info.version,
+                                        bustype=info.bustype)
+        os.set_blocking(dev.fd, False)
+        self.frame = []
+        self.down = set()  # keys held, released on the clone when input is taken back
+        self.held = set()  # keys held on the pad, whoever gets them
+        self.effects = {}  # force feedback effect id on the clone -> id on the pad
+
+    def abs_info(self):
+        return {code: [info.min, info.max, info.flat, info.value]
+                for code, info in self.dev.capabilities().get(ecodes.EV_ABS, [])}
+
+    def replay(self, frame):
+        for e in frame:
+            self.clone.write(e.type, e.code, e.value)
+        self.clone.syn()
+
+    def release_clone(self):
+        """Let go of anything the game still thinks is held."""
+        for code in self.down:
+            self.clone.write(ecodes.EV_KEY, code, 0)
+        for code, info in self.dev.capabilities().get(ecodes.EV_ABS, []):
+            if code in HAT_AXES:
+                value = 0
+            elif code in STICK_AXES:
+                value = (info.min + info.max) // 2
+            else:
+                value = info.min
+            self.clone.write(ecodes.EV_ABS, code, value)
+        self.clone.syn()
+
+    # ---------- Force feedback ----------
+    def forward_ff(self):
+        """Effects a game uploads, erases or plays on the clone, done on the pad."""
+        try:
+            events = list(self.clone.read())
+        except BlockingIOError:
+            return
+        for e in events:
+            if e.type == ecodes.EV_UINPUT and e.code == ecodes.UI_FF_UPLOAD:
+                upload = self.clone.begin_upload(e.value)
+                effect = upload.effect
+                clone_id = effect.id
+                effect.id = self.effects.get(clone_id, -1)  # -1 asks the pad for a new slot
+                try:
+                    self.effects[clone_id] = self.dev.upload_effect(effect)
+                    upload.retval = 0
+                except OSError as err:
+                    TRACE.warn("router", "effect upload to %s failed: %s", self.dev.path, err)
+                    upload.retval = -err.errno
+                effect.id = clone_id
+                self.clone.end_upload(upload)
+            elif e.type == ecodes.EV_UINPUT and e.code == ecodes.UI_FF_ERASE:
+                erase = self.clone.begin_erase(e.value)
+                pad_id = self.effects.pop(erase.effect_id, None)
+                erase.retval = 0
+                if pad_id is not None:
+                    try:
+                        self.dev.erase_effect(pad_id)
+                    except OSError as err:
+                        erase.retval = -err.errno
+                self.clone.end_erase(erase)
+            elif e.type == ecodes.EV_FF:
+                # Codes below FF_GAIN are effect ids; FF_GAIN and FF_AUTOCENTER pass as they are
+                code = self.effects.get(e.code, e.code) if e.code < ecodes.FF_GAIN else e.code
+                try:
+                    self.dev.write(ecodes.EV_FF, code, e.value)
+                except OSError:
+                    pass
+
+    def close(self):
+        for f in (self.dev.ungrab, self.clone.close, self.dev.close):
+            try:
+                f()
+            except OSError:
+                pass
+
+
+class Client:
+    def __init__(self, conn):
+        self.conn = conn
+        self.role = None
+
+
+class InputRouter:
+    """epoll loop over the grabbed controllers, the client socket and /dev/input."""
+
+    def __init__(self):
+        # Deferred so importing this module for the client side stays free of gi
+        from gamepad import is_gamepad
+
+        self.is_gamepad = is_gamepad
+        self.epoll = select.epoll()
+        self.controllers = {}  # fd -> Controller
+        self.clones = {}  # clone fd -> Controller, for force feedback from games
+        self.clients = {}  # fd -> Client
+        self.claims = []  # clients holding input, most recent last
+        self.rejected = set()
+
+        path = socket_path()
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.listener.bind(path)
+        self.listener.listen(8)
+        self.listener.setblocking(False)
+        self.epoll.register(self.listener.fileno(), select.EPOLLIN)
+
+        self.inotify = Inotify(INPUT_DIR)
+        self.epoll.register(self.inotify.fd, select.EPOLLIN)
+
+    @property
+    def target(self):
+        return self.claims[-1] if self.claims else None
+
+    # ---------- Controllers ----------
+    def scan(self):
+        for path in list_devices():
+            self._probe(path)
+
+    def _probe(self, path):
+        if path in self.rejected or any(c.dev.path == path for c in self.controllers.values()):
+            return
+        try:
+            dev = InputDevice(path)
+        except OSError:
+            return  # no permission yet; IN_ATTRIB brings us back
+        if dev.phys == ROUTER_PHYS or not self.is_gamepad(dev):
+            self.rejected.add(path)
+            dev.close()
+            return
+        try:
+            ctrl = Controller(dev)
+        except OSError as e:
+            TRACE.warn("router", "cannot grab %s: %s", path, e)
+            dev.close()
+            return
+        self.controllers[dev.fd] = ctrl
+        self.epoll.register(dev.fd, select.EPOLLIN)
+        self.clones[ctrl.clone.fd] = ctrl
+        self.epoll.register(ctrl.clone.fd, select.EPOLLIN)
+        TRACE.info("router", "grabbed %s (%s)", dev.name, path)
+        self._broadcast(b"A" + json.dumps({"abs": ctrl.abs_info()}).encode())
+
+    def _remove(self, ctrl):
+        self.epoll.unregister(ctrl.dev.fd)
+        del self.controllers[ctrl.dev.fd]
+        self.epoll.unregister(ctrl.clone.fd)
+        del self.clones[ctrl.clone.fd]
+        TRACE.info("router", "released %s", ctrl.dev.path)
+        ctrl.close()
+        if not self.controllers:
+            self._broadcast(b"D")
+
+    def _on_hotplug(self):
+        for name, mask in self.inotify.read():
+            if not name.startswith("event"):
+                continue
+            path = os.path.join(INPUT_DIR, name)
+            if mask & Inotify.IN_DELETE:
+                self.rejected.discard(path)
+            else:
+                self._probe(path)
+
+    def _on_controller(self, ctrl):
+        try:
+            events = list(ctrl.dev.read())
+        except BlockingIOError:
+            return
+        except OSError as e:
+            if e.errno != errno.ENODEV:
+                TRACE.warn("router", "read error on %s: %s", ctrl.dev.path, e)
+            self._remove(ctrl)
+            return
+        for e in events:
+            if e.type == ecodes.EV_SYN and e.code == ecodes.SYN_REPORT:
+                self._dispatch(ctrl, ctrl.frame)
+                ctrl.frame = []
+            elif e.type != ecodes.EV_SYN:
+                ctrl.frame.append(e)
+
+    def _dispatch(self, ctrl, frame):
+        if not frame:
+            return
+        TRACE.count("router.frames")
+        pressed = False
+        for e in frame:
+            if e.type == ecodes.EV_KEY:
+                (ctrl.held.add if e.value else ctrl.held.discard)(e.code)
+                pressed = pressed or (e.value == 1 and e.code in MOUSE_CHORD)
+        if pressed and MOUSE_CHORD <= ctrl.held:
+            for client in list(self.clients.values()):
+                if client.role == "mouse":
+                    self._send(client, b"T")
+        home = [e for e in frame if e.type == ecodes.EV_KEY and e.code == HOME_BUTTON]
+        target = self.target
+        if home:
+            for client in self.clients.values():
+                if client.role == "launcher" and client is not target:
+                    self._send(client, self._pack(home))
+
+        if target is None:
+            for e in frame:
+                if e.type == ecodes.EV_KEY:
+                    (ctrl.down.add if e.value else ctrl.down.discard)(e.code)
+            ctrl.replay(frame)
+        else:
+            self._send(target, self._pack(frame))
+
+    @staticmethod
+    def _pack(frame):
+        return b"E" + b"".join(EVENT.pack(e.sec * 1000000 + e.usec, e.type, e.code, e.value)
+                               for e in frame)
+
+    # ---------- Clients ----------
+    def _accept(self):
+        try:
+            conn, _ = self.listener.accept()
+        except BlockingIOError:
+            return
+        conn.setblocking(False)
+        self.clients[conn.fileno()] = Client(conn)
+        self.epoll.register(conn.fileno(), select.EPOLLIN)
+
+    def _on_client(self, client):
+        try:
+            msg = client.conn.recv(256)
+        except BlockingIOError:
+            return
+        except OSError:
+            msg = b""
+        if not msg:
+            self._drop(client)
+            return
+        words = msg.decode(errors="replace").split()
+        if words[:1] == ["hello"] and len(words) == 2 and words[1] in ROLES:
+            client.role = words[1]
+            for ctrl in list(self.controllers.values())[:1]:
+                self._send(client, b"A" + json.dumps({"abs": ctrl.abs_info()}).encode())
+        elif words == ["claim"]:
+            self._set_claim(client, True)
+        elif words == ["release"]:
+            self._set_claim(client, False)
+
+    def _set_claim(self, client, claim):
+        before = self.target
+        if client in self.claims:
+            self.claims.remove(client)
+        if claim:
+            self.claims.append(client)
+        if before is None and self.target is not None:
+            for ctrl in self.controllers.values():
+                ctrl.release_clone()
+                ctrl.down.clear()
+        if before is not self.target:
+            TRACE.info("router", "input -> %s", self.target.role if self.target else "game")
+
+    def _drop(self, client):
+        self._set_claim(client, False)
+        self.epoll.unregister(client.conn.fileno())
+        del self.clients[client.conn.fileno()]
+        client.conn.close()
+
+    def _send(self, client, msg):
+        try:
+            client.conn.send(msg)
+        except BlockingIOError:
+            TRACE.count("router.dropped")  # a stalled client loses frames rather than stalling us
+        except OSError:
+            self._drop(client)
+
+    def _broadcast(self, msg):
+        for client in list(self.clients.values()):
+            if client.role:
+                self._send(client, msg)
+
+    # ---------- Loop ----------
+    def run(self):
+        self.scan()
+        while True:
+            for fd, _mask in self.epoll.poll():
+                if fd in self.controllers:
+                    self._on_controller(self.controllers[fd])
+                elif fd in self.clones:
+                    self.clones[fd].forward_ff()
+                elif fd in self.clients:
+                    self._on_client(self.clients[fd])
+                elif fd == self.listener.fileno():
+                    self._accept()
+                elif fd == self.inotify.fd:
+                    self._on_hotplug()
+
+    def close(self):
+        for ctrl in list(self.controllers.values()):
+            ctrl.close()
+        self.listener.close()
+        try:
+            os.unlink(socket_path())
+        except OSError:
+            pass
+
+
+# ---------- Client side ----------
+class RouterDevice:
+    """What a client knows about the routed pad; enough for StickNavigator.calibrate()."""
+
+    path = "router"
+    name = "routed gamepad"
+
+    def __init__(self, abs_info):
+        self.abs = {int(code): info for code, info in abs_info.items()}
+
+    def capabilities(self):
+        return {ecodes.EV_ABS: [(code, AbsInfo(value=v, min=lo, max=hi, fuzz=0, flat=flat, resolution=0))
+                                for code, (lo, hi, flat, v) in self.abs.items()]}
+
+
+class RouterConnection:
+    """Client end of the router socket, for any loop: fileno() to wait on, read() like evdev's.
+
+    read() returns the events received so far and raises BlockingIOError
+    when there are none, so it drops into code written for a non-blocking
+    InputDevice. A lost router raises ConnectionError.
+    """
+
+    def __init__(self, role):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.sock.connect(socket_path())
+        self.sock.send(f"hello {role}".encode())
+        self.sock.setblocking(False)
+        self.device = None  # RouterDevice once a controller is known
+        self.toggles = 0  # mouse-mode toggles received and not yet taken
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def claim(self):
+        self.sock.send(b"claim")
+
+    def release(self):
+        self.sock.send(b"release")
+
+    def read(self):
+        events = []
+        while True:
+            try:
+                msg = self.sock.recv(MAX_MESSAGE)
+            except BlockingIOError:
+                break
+            if not msg:
+                raise ConnectionError("input router went away")
+            kind, body = msg[:1], msg[1:]
+            if kind == b"E":
+                for ts, type_, code, value in EVENT.iter_unpack(body):
+                    events.append(InputEvent(ts // 1000000, ts % 1000000, type_, code, value))
+                events.append(InputEvent(0, 0, ecodes.EV_SYN, ecodes.SYN_REPORT, 0))
+            elif kind == b"A":
+                self.device = RouterDevice(json.loads(body)["abs"])
+            elif kind == b"D":
+                self.device = None
+            elif kind == b"T":
+                self.toggles += 1
+        if not events:
+            raise BlockingIOError(errno.EAGAIN, "no events")
+        return events
+
+    def close(self):
+        self.sock.close()
+
+
+def router_running():
+    return os.path.exists(socket_path())
+
+
+# ---------- Run ----------
+if __name__ == "__main__":
+    TRACE.handle_signals("inputrouter")
+    router = InputRouter()
+    try:
+        router.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        router.close()
+        sys.exit(0)
@@ -1,80 +1,316 @@
 #!/usr/bin/env python3
-# joystick_mouse.py — continuous smooth mouse from right stick + X/O buttons
+# joystick_mouse.py — smooth mouse from right stick + X/O buttons, driven by input events
+#
+# On a pad opened directly mouse mode is on from the start. Through the input
+# router it starts off, Select + Start on the pad toggles it (the router
+# watches for the chord), and mouse mode holds a claim on the pad; leaving it
+# releases the claim, so the pad goes back to the launcher or the game.
+# `joystick-mouse.py on|off|toggle` switches the running instance as well.
 
+import os
+import re
+import sys
+import json
+import math
 import time
 import fcntl
-import os
+import select
+import socket
+import subprocess
 from evdev import InputDevice, list_devices, ecodes
 import uinput
 
-# ---------- Find joystick ----------
-joystick = None
-for dev_path in list_devices():
-    dev = InputDevice(dev_path)
-    caps = dev.capabilities()
-    if ecodes.EV_ABS in caps and ecodes.EV_KEY in caps:
-        joystick = dev
-        fcntl.fcntl(dev.fd, fcntl.F_SETFL, os.O_NONBLOCK)
-        print("Using joystick:", dev.name, dev.path)
-        break
-
-if joystick is None:
-    print("No joystick found!")
-    exit(1)
-
-# ---------- Create virtual mouse ----------
-device = uinput.Device([
-    uinput.REL_X,
-    uinput.REL_Y,
-    uinput.BTN_LEFT,
-    uinput.BTN_RIGHT,
-])
+from inputrouter import RouterConnection
+from paths import config_dir, runtime_dir
+from tracing import TRACE
 
 # ---------- Settings ----------
-SENSITIVITY = 0.15   # tweak speed
-DEADZONE = 8000     # ignore tiny movements
+# Defaults; ~/.config/ellixpi/mouse.json can override any of them
+SETTINGS = {
+    "speed": 750,      # px/s at full deflection
+    "curve": 1.6,      # response exponent: 1 is linear, higher gives finer control near centre
+    "deadzone": 0.25,  # fraction of the stick's travel ignored around centre
+}
+DEFAULT_HZ = 60
+MAX_DT = 0.1  # never integrate more than this in one tick (e.g. after a stall)
 
 # Button mappings
 LEFT_CLICK = ecodes.BTN_SOUTH    # X on PS / A on Xbox
 RIGHT_CLICK = ecodes.BTN_EAST    # O on PS / B on Xbox
+BUTTONS = {LEFT_CLICK: uinput.BTN_LEFT, RIGHT_CLICK: uinput.BTN_RIGHT}
 
 # Right stick axes
 AXIS_X = ecodes.ABS_RX
 AXIS_Y = ecodes.ABS_RY
 
-# Track last stick values
-stick_x = 0
-stick_y = 0
-buttons = {}
+CONTROL_SOCKET = "mouse.sock"
+COMMANDS = ("on", "off", "toggle")
+
+
+def load_settings():
+    settings = dict(SETTINGS)
+    try:
+        with open(os.path.join(config_dir(), "mouse.json")) as f:
+            settings.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print("mouse.json ignored:", e)
+    return settings
+
+
+def refresh_rate():
+    """Refresh rate of the current mode, so the cursor moves once per frame."""
+    try:
+        out = subprocess.check_output(["xrandr", "--current"], universal_newlines=True, timeout=2)
+    except (OSError, subprocess.SubprocessError):
+        return DEFAULT_HZ
+    m = re.search(r"(\d+(?:\.\d+)?)\*", out)
+    return float(m.group(1)) if m else DEFAULT_HZ
+
+
+# ---------- Control ----------
+def control_path():
+    return os.path.join(runtime_dir(), CONTROL_SOCKET)
+
+
+def open_control():
+    """Datagram socket the running instance takes on/off/toggle commands on."""
+    path = control_path()
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.bind(path)
+    sock.setblocking(False)
+    return sock
+
+
+def send_command(command):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        sock.sendto(command.encode(), control_path())
 
-# ---------- Main loop ----------
-while True:
-    # Read events (non-blocking)
+
+# ---------- Find joystick ----------
+def open_joystick():
+    # Through the input router when it is running (it holds the exclusive grab).
+    # No claim yet: that is taken only while mouse mode is on.
     try:
-        for e in joystick.read():
-            if e.type == ecodes.EV_ABS:
-                if e.code == AXIS_X:
-                    stick_x = e.value
-                elif e.code == AXIS_Y:
-                    stick_y = e.value
-            elif e.type == ecodes.EV_KEY:
-                buttons[e.code] = e.value
-    except BlockingIOError:
+        conn = RouterConnection("mouse")
+        print("Using the input router")
+        return conn
+    except OSError:
         pass
 
-    # Calculate mouse movement continuously
-    dx = dy = 0
-    if abs(stick_x) > DEADZONE:
-        dx = int((stick_x / 32767) * SENSITIVITY * 50)
-    if abs(stick_y) > DEADZONE:
-        dy = int((stick_y / 32767) * SENSITIVITY * 50)
+    # Deferred like the router's, so the router path needs no gi
+    from gamepad import is_gamepad
 
-    if dx != 0 or dy != 0:
-        device.emit(uinput.REL_X, dx, syn=False)
-        device.emit(uinput.REL_Y, dy)
+    for dev_path in list_devices():
+        try:
+            dev = InputDevice(dev_path)
+        except OSError:
+            continue
+        if is_gamepad(dev):
+            fcntl.fcntl(dev.fd, fcntl.F_SETFL, os.O_NONBLOCK)
+            print("Using joystick:", dev.name, dev.path)
+            return dev
+        dev.close()
+    return None
 
-    # Handle mouse buttons (continuous hold)
-    device.emit(uinput.BTN_LEFT, buttons.get(LEFT_CLICK, 0))
-    device.emit(uinput.BTN_RIGHT, buttons.get(RIGHT_CLICK, 0))
 
-    time.sleep(0.01)
+# ---------- Engine ----------
+class MouseEngine:
+    """Integrates stick deflection into cursor motion, but only while the stick is deflected.
+
+    With the stick centred the loop blocks in epoll with no timeout, so an
+    idle pad costs nothing. While deflected it ticks at the display's
+    refresh rate: each tick moves by speed * curve(deflection) * dt, and
+    the fractional part is carried to the next tick, so small deflections
+    still creep the cursor along. Buttons are sent on press and release only.
+    Nothing moves or clicks unless mouse mode is active (set_active()).
+    """
+
+    def __init__(self, source, mouse, settings, hz, control=None):
+        self.source = source
+        self.mouse = mouse
+        self.control = control
+        # Through the router the pad is shared, so mouse mode waits to be asked for
+        self.active = not isinstance(source, RouterConnection)
+        self.speed = float(settings["speed"])
+        self.curve = float(settings["curve"])
+        self.deadzone = float(settings["deadzone"])
+        self.period = 1.0 / hz
+        self.ranges = {}  # axis -> (center, half range)
+        self.stick = {AXIS_X: 0.0, AXIS_Y: 0.0}  # normalized -1..1
+        self.buttons = {}
+        self.remainder = [0.0, 0.0]
+        self.last_tick = None
+        self.next_tick = None
+        self._calibrated_from = None
+
+    def calibrate(self, dev):
+        self._calibrated_from = dev
+        self.ranges = {}
+        for code, info in dev.capabilities().get(ecodes.EV_ABS, []):
+            if code in self.stick:
+                self.ranges[code] = ((info.min + info.max) / 2, max(1, (info.max - info.min) / 2))
+
+    # ---------- Mode ----------
+    def set_active(self, active):
+        """Enter or leave mouse mode; through the router this claims or releases the pad."""
+        if active == self.active:
+            return
+        self.active = active
+        if isinstance(self.source, RouterConnection):
+            (self.source.claim if active else self.source.release)()
+        if not active:
+            for code, value in self.buttons.items():
+                if value:
+                    self.mouse.emit(BUTTONS[code], 0)
+            self.buttons = {}
+            self.stick = {AXIS_X: 0.0, AXIS_Y: 0.0}
+        TRACE.info("mouse", "mouse mode %s", "on" if active else "off")
+
+    def _on_control(self):
+        try:
+            command = self.control.recv(64).decode(errors="replace").strip()
+        except BlockingIOError:
+            return
+        if command == "toggle":
+            self.set_active(not self.active)
+        elif command in COMMANDS:
+            self.set_active(command == "on")
+
+    # ---------- Input ----------
+    def handle(self, e):
+        if not self.active:
+            return  # a directly opened pad is read either way, but ignored
+        if e.type == ecodes.EV_ABS and e.code in self.stick:
+            center, half = self.ranges.get(e.code, (0, 32767))
+            self.stick[e.code] = max(-1.0, min(1.0, (e.value - center) / half))
+        elif e.type == ecodes.EV_KEY and e.code in BUTTONS and e.value in (0, 1):
+            # Edges only; autorepeat (value 2) and repeated states are dropped
+            if self.buttons.get(e.code, 0) != e.value:
+                self.buttons[e.code] = e.value
+                self.mouse.emit(BUTTONS[e.code], e.value)
+
+    def velocity(self):
+        x, y = self.stick[AXIS_X], self.stick[AXIS_Y]
+        mag = math.hypot(x, y)
+        if mag <= self.deadzone:
+            return 0.0, 0.0
+        # Radial deadzone, then the response curve over what is left
+        n = min(1.0, (mag - self.deadzone) / (1.0 - self.deadzone))
+        speed = self.speed * n ** self.curve
+        return x / mag * speed, y / mag * speed
+
+    # ---------- Motion ----------
+    def tick(self, now):
+        dt = min(MAX_DT, now - self.last_tick)
+        self.last_tick = now
+        vx, vy = self.velocity()
+        self.remainder[0] += vx * dt
+        self.remainder[1] += vy * dt
+        dx, dy = int(self.remainder[0]), int(self.remainder[1])
+        self.remainder[0] -= dx
+        self.remainder[1] -= dy
+        if dx or dy:
+            self.mouse.emit(uinput.REL_X, dx, syn=False)
+            self.mouse.emit(uinput.REL_Y, dy)
+
+    def _check_calibration(self):
+        # Through the router the pad's ranges arrive as a message; an InputDevice is the pad
+        dev = self.source.device if isinstance(self.source, RouterConnection) else self.source
+        if dev is not None and dev is not self._calibrated_from:
+            self.calibrate(dev)
+
+    def _read(self):
+        try:
+            for e in self.source.read():
+                self.handle(e)
+        except BlockingIOError:
+            pass
+        if isinstance(self.source, RouterConnection) and self.source.toggles:
+            # Select + Start, seen by the router
+            if self.source.toggles % 2:
+                self.set_active(not self.active)
+            self.source.toggles = 0
+        self._check_calibration()
+
+    def run(self):
+        ep = select.epoll()
+        ep.register(self.source.fileno(), select.EPOLLIN)
+        if self.control is not None:
+            ep.register(self.control.fileno(), select.EPOLLIN)
+        self._check_calibration()
+        while True:
+            moving = self.velocity() != (0.0, 0.0)
+            timeout = max(0.0, self.next_tick - time.monotonic()) if moving else -1
+            for fd, _mask in ep.poll(timeout):
+                if self.control is not None and fd == self.control.fileno():
+                    self._on_control()
+                else:
+                    self._read()
+                TRACE.count("mouse.wakeups")
+
+            now = time.monotonic()
+            if self.velocity() == (0.0, 0.0):
+                # Centred: forget the phase and the remainder, and block again
+                self.last_tick = self.next_tick = None
+                self.remainder = [0.0, 0.0]
+            elif self.last_tick is None:
+                self.last_tick = now
+                self.next_tick = now + self.period
+            elif now >= self.next_tick:
+                self.tick(now)
+                self.next_tick += self.period
+                if self.next_tick < now:
+                    self.next_tick = now + self.period
+
+
+# ---------- Run ----------
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] in COMMANDS:
+        try:
+            send_command(sys.argv[1])
+        except OSError as e:
+            sys.exit(f"joystick-mouse is not running: {e}")
+        sys.exit(0)
+
+    TRACE.handle_signals("joystick-mouse")
+    joystick = open_joystick()
+    if joystick is None:
+        print("No joystick found!")
+        exit(1)
+
+    # ---------- Create virtual mouse ----------
+    device = uinput.Device([
+        uinput.REL_X,
+        uinput.REL_Y,
+        uinput.BTN_LEFT,
+        uinput.BTN_RIGHT,
+    ])
+
+    try:
+        control = open_control()
+    except OSError as e:
+        print("No control socket, on/off/toggle unavailable:", e)
+        control = None
+    engine = MouseEngine(joystick, device, load_settings(), refresh_rate(), control)
+    try:
+        engine.run()
+    except OSError as e:  # device unplugged or the router went away
+        print("Joystick lost:", e)
+        exit(1)
+    finally:
+        try:
+            engine.set_active(False)
+        except OSError:
+            pass
+        if control is not None:
+            control.close()
+            try:
+                os.unlink(control_path())
+            except OSError:
+                pass
@@ -2,9 +2,14 @@
 import gi
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk, Gdk, GLib
-import subprocess
-import threading
-import time
+import os
+import json
+
+from keyinject import KeyInjector
+from paths import config_dir
+from predict import open_predictor, WORD_SLOTS, CHAR_SLOTS
+from tracing import TRACE
+from winindex import WindowIndex
 
 # Keyboard mapping (example)
 KEYS = [
@@ -13,28 +18,42 @@ KEYS = [
     ['Z','X','C','V','B','N','M','SPACE']
 ]
 
-DEBUG = True
+# What the overlay does when a window of this WM_CLASS (instance or class,
+# lowercased) comes to the front: "show", "hide", or absent to stay as it is.
+# ~/.config/ellixpi/keyboard.json can add or override rules and the default.
+RULES = {
+    "ppsspp": "hide",
+    "retroarch": "hide",
+    "firefox": "show",
+    "firefox-esr": "show",   # the launcher's Browser tile (instance "Navigator")
+    "navigator": "show",
+    "chromium": "show",
+    "revolt": "show",
+}
+DEFAULT_RULE = None
+SAVE_EVERY = 20  # committed words between saves of what was learned
 
-def debug(msg):
-    if DEBUG:
-        print(f"[DEBUG] {msg}")
+def debug(fmt, *args):
+    TRACE.debug("keyboarder", fmt, *args)
 
-# Get the currently active window using X11
-def get_active_window():
+def load_rules():
+    rules, default = dict(RULES), DEFAULT_RULE
     try:
-        wid = subprocess.check_output(["xdotool", "getactivewindow"]).decode().strip()
-        name = subprocess.check_output(["xdotool", "getwindowname", wid]).decode().strip()
-        cls = subprocess.check_output(["xprop", "-id", wid, "WM_CLASS"]).decode().strip()
-        return name, cls
-    except Exception as e:
-        return "<unknown>", "<noclass>"
-
-# Send a keypress using xdotool
-def send_key(key):
-    if key == "SPACE":
-        subprocess.call(["xdotool", "key", "space"])
-    else:
-        subprocess.call(["xdotool", "key", key.lower()])
+        with open(os.path.join(config_dir(), "keyboard.json")) as f:
+            conf = json.load(f)
+        rules.update({k.lower(): v for k, v in conf.get("rules", {}).items()})
+        default = conf.get("default", default)
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, AttributeError) as e:
+        TRACE.warn("keyboarder", "keyboard.json ignored: %s", e)
+    return rules, default
+
+def rule_for(rules, default, instance, cls):
+    for name in (instance.lower(), cls.lower()):
+        if name in rules:
+            return rules[name]
+    return default
 
 class KeyboardOverlay(Gtk.Window):
     def __init__(self):
@@ -46,12 +65,43 @@ class KeyboardOverlay(Gtk.Window):
         self.modify_bg(Gtk.StateType.NORMAL, Gdk.color_parse("black"))
         self.set_opacity(0.7)
         self.set_default_size(800, 200)
-        self.connect("destroy", Gtk.main_quit)
+        # Showing the overlay must not take focus from the app it types into
+        self.set_accept_focus(False)
+        self.set_focus_on_map(False)
+        self.connect("destroy", self.on_destroy)
+
+        # One XTEST connection for the overlay's lifetime instead of an xdotool fork per key
+        self.keys = KeyInjector()
+
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
+        self.add(box)
+
+        # Suggestion row: whole words first, then likely next letters
+        self.predictor = open_predictor()
+        self.prefix = ""       # letters of the word being typed
+        self.selections = 0    # selections spent on it so far
+        self.words = 0
+        self.word_selections = 0
+        self.typing_into = None  # window the prefix was typed into
+        row = Gtk.Box(spacing=5)
+        box.pack_start(row, False, False, 0)
+        self.word_buttons = []
+        for _ in range(WORD_SLOTS):
+            button = Gtk.Button()
+            button.connect("clicked", self.on_word_click)
+            row.pack_start(button, True, True, 0)
+            self.word_buttons.append(button)
+        self.char_buttons = []
+        for _ in range(CHAR_SLOTS):
+            button = Gtk.Button()
+            button.connect("clicked", self.on_char_click)
+            row.pack_start(button, False, False, 0)
+            self.char_buttons.append(button)
 
         grid = Gtk.Grid()
         grid.set_row_spacing(5)
         grid.set_column_spacing(5)
-        self.add(grid)
+        box.pack_start(grid, True, True, 0)
 
         for r, row in enumerate(KEYS):
             for c, key in enumerate(row):
@@ -60,26 +110,94 @@ class KeyboardOverlay(Gtk.Window):
                 grid.attach(button, c, r, 1, 1)
 
         self.show_all()
+        self.update_suggestions()
+
+        # Shown and hidden by what is in front, straight from X property events
+        self.rules, self.default_rule = load_rules()
+        self.windows = WindowIndex(on_active=self.on_active_window)
 
     def on_key_click(self, widget, key):
-        debug(f"Sending key: {key}")
-        send_key(key)
-
-# Periodically check active window
-def monitor_active_window(win):
-    last_name = None
-    while True:
-        name, cls = get_active_window()
-        if name != last_name:
-            debug(f"Active window: {name}, class: {cls}")
-            last_name = name
-        time.sleep(0.5)
+        debug("Sending key: %s", key)
+        self.selections += 1
+        self.send_key(key)
+        if key == "SPACE":
+            self.commit_word(self.prefix)
+        else:
+            self.prefix += key.lower()
+        self.update_suggestions()
+
+    # ---------- Predictions ----------
+    def on_word_click(self, widget):
+        word = widget.get_label()
+        if not word:
+            return
+        self.selections += 1
+        # The rest of the word and the space after it, in one batch
+        self.type_text(word[len(self.prefix):] + " ")
+        self.commit_word(word)
+        self.update_suggestions()
+
+    def on_char_click(self, widget):
+        c = widget.get_label()
+        if not c:
+            return
+        self.selections += 1
+        self.type_text(c)
+        self.prefix += c
+        self.update_suggestions()
+
+    def commit_word(self, word):
+        if word:
+            self.predictor.learn(word)
+            self.words += 1
+            self.word_selections += self.selections
+            TRACE.info("keyboarder", "%r in %d selections (%.2f per word over %d words)",
+                       word, self.selections, self.word_selections / self.words, self.words)
+            if self.words % SAVE_EVERY == 0:
+                self.predictor.save()
+        self.prefix = ""
+        self.selections = 0
+
+    def update_suggestions(self):
+        words = self.predictor.words(self.prefix)
+        chars = self.predictor.chars(self.prefix)
+        for buttons, items in ((self.word_buttons, words), (self.char_buttons, chars)):
+            for i, button in enumerate(buttons):
+                button.set_label(items[i] if i < len(items) else "")
+                button.set_sensitive(i < len(items))
+
+    def send_key(self, key):
+        self.keys.key(key.lower() if len(key) == 1 else key)
+
+    def type_text(self, text):
+        """Type a whole string (capitals and symbols included) in one batch."""
+        debug("Typing: %r", text)
+        self.keys.type(text)
+
+    def on_active_window(self, wid, instance, cls, pid, title):
+        debug("Active window: %s, class: %s.%s", title, instance, cls)
+        if wid is None or pid == os.getpid():
+            return
+        if self.prefix and wid != self.typing_into:
+            # A half-typed word does not follow the focus to another window
+            self.prefix = ""
+            self.selections = 0
+            self.update_suggestions()
+        self.typing_into = wid
+        action = rule_for(self.rules, self.default_rule, instance, cls)
+        if action == "show":
+            self.show()
+        elif action == "hide":
+            self.hide()
+
+    def on_destroy(self, *args):
+        self.windows.close()
+        self.keys.close()
+        self.predictor.save()
+        Gtk.main_quit()
 
 if __name__ == "__main__":
+    TRACE.serve("keyboarder")
     debug("Application activated")
     win = KeyboardOverlay()
-
-    # Run window monitor in background thread
-    threading.Thread(target=monitor_active_window, args=(win,), daemon=True).start()
-
     Gtk.main()
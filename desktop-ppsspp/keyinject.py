@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# keyinject.py — key presses and typed text through one long-lived XTEST connection
+
+import atexit
+
+from Xlib import X, XK, display, error
+from Xlib.ext import xtest
+
+# xdotool-style names for keys that are not single characters
+KEY_NAMES = {"SPACE": "space", "ENTER": "Return", "BACKSPACE": "BackSpace", "TAB": "Tab", "ESC": "Escape"}
+MODIFIERS = {"shift": "Shift_L", "ctrl": "Control_L", "alt": "Alt_L", "super": "Super_L"}
+# XK names of punctuation (XK.string_to_keysym wants names, not characters)
+CHAR_NAMES = {
+    " ": "space", "\n": "Return", "\t": "Tab", "!": "exclam", '"': "quotedbl", "#": "numbersign",
+    "$": "dollar", "%": "percent", "&": "ampersand", "'": "apostrophe", "(": "parenleft",
+    ")": "parenright", "*": "asterisk", "+": "plus", ",": "comma", "-": "minus", ".": "period",
+    "/": "slash", ":": "colon", ";": "semicolon", "<": "less", "=": "equal", ">": "greater",
+    "?": "question", "@": "at", "[": "bracketleft", "\\": "backslash", "]": "bracketright",
+    "^": "asciicircum", "_": "underscore", "`": "grave", "{": "braceleft", "|": "bar",
+    "}": "braceright", "~": "asciitilde",
+}
+
+
+class KeyInjector:
+    """Synthesizes key events with XTEST over a single X connection.
+
+    Keycodes and the shift level of every keysym are looked up once and
+    cached. A keysym missing from the keyboard map is bound to a spare
+    keycode on demand, as xdotool does, and the keycode's original
+    (empty) mapping is put back by close() or at exit. type() queues a whole string and
+    flushes it in one write, so typing costs one round trip, not a fork
+    and a new connection per key.
+    """
+
+    def __init__(self, display_name=None):
+        self.d = display.Display(display_name)
+        if not self.d.has_extension("XTEST"):
+            raise RuntimeError("X server has no XTEST extension")
+        self._codes = {}  # keysym -> (keycode, needs shift)
+        self._shift = self.d.keysym_to_keycode(XK.string_to_keysym("Shift_L"))
+        self._spare, self._spare_orig = self._find_spare()
+        self._spare_sym = None
+        atexit.register(self._restore_spare)
+
+    def _find_spare(self):
+        first = self.d.display.info.min_keycode
+        count = self.d.display.info.max_keycode - first + 1
+        mapping = self.d.get_keyboard_mapping(first, count)
+        for i, syms in enumerate(mapping):
+            if not any(syms):
+                return first + i, tuple(syms)
+        return None, None
+
+    def _restore_spare(self):
+        if self._spare_sym is None:
+            return
+        self._spare_sym = None
+        try:
+            self.d.change_keyboard_mapping(self._spare, [self._spare_orig])
+            self.d.sync()
+        except (error.XError, error.ConnectionClosedError, OSError):
+            pass  # the server is gone, and its keymap with it
+
+    # ---------- Lookup ----------
+    def keysym(self, name):
+        """Keysym for a character or an X key name ("a", "A", "@", "Return")."""
+        name = KEY_NAMES.get(name.upper(), name) if len(name) > 1 else name
+        sym = XK.string_to_keysym(CHAR_NAMES.get(name, name))
+        if sym == X.NoSymbol and len(name) == 1:
+            sym = ord(name) if ord(name) < 0x100 else 0x01000000 | ord(name)
+        return sym
+
+    def _code(self, sym):
+        if sym in self._codes:
+            return self._codes[sym]
+        code = self.d.keysym_to_keycode(sym)
+        if code:
+            shift = self.d.keycode_to_keysym(code, 0) != sym and self.d.keycode_to_keysym(code, 1) == sym
+            self._codes[sym] = (code, shift)
+            return self._codes[sym]
+        if self._spare is None:
+            return None, False
+        # Not on the keyboard: bind it to the spare keycode (not cached, the binding changes)
+        if self._spare_sym != sym:
+            self.d.change_keyboard_mapping(self._spare, [(sym, sym)])
+            self.d.sync()
+            self._spare_sym = sym
+        return self._spare, False
+
+    # ---------- Injection ----------
+    def _tap(self, code, modifiers=()):
+        for mod in modifiers:
+            xtest.fake_input(self.d, X.KeyPress, mod)
+        xtest.fake_input(self.d, X.KeyPress, code)
+        xtest.fake_input(self.d, X.KeyRelease, code)
+        for mod in reversed(modifiers):
+            xtest.fake_input(self.d, X.KeyRelease, mod)
+
+    def key(self, combo):
+        """Press one key or an xdotool-style combo such as "ctrl+l" or "shift+Tab"."""
+        *mods, name = combo.split("+") if len(combo) > 1 else [combo]
+        code, shift = self._code(self.keysym(name))
+        if code is None:
+            return False
+        modifiers = [self.d.keysym_to_keycode(XK.string_to_keysym(MODIFIERS[m.lower()]))
+                     for m in mods if m.lower() in MODIFIERS]
+        if shift and self._shift not in modifiers:
+            modifiers.append(self._shift)
+        self._tap(code, modifiers)
+        self.d.flush()
+        return True
+
+    def type(self, text):
+        """Type a string, shifting for capitals and symbols; one flush for all of it."""
+        for ch in text:
+            code, shift = self._code(self.keysym(ch))
+            if code is None:
+                continue
+            self._tap(code, [self._shift] if shift else [])
+            if code == self._spare:
+                # The next character may rebind the spare keycode; let the server see this one first
+                self.d.sync()
+        self.d.flush()
+
+    def close(self):
+        self._restore_spare()
+        atexit.unregister(self._restore_spare)
+        self.d.close()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# library.py — PSP game library: ISO/CSO/PBP scanner with an SQLite index
+
+import os
+import struct
+import zlib
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from paths import cache_dir
+
+PPSSPP = "/usr/local/bin/PPSSPP.AppImage"
+GAME_EXTENSIONS = (".iso", ".cso", ".pbp")
+DEFAULT_ROM_DIRS = ["~/ROMs", "~/PSP", "/media/" + os.environ.get("USER", "")]
+MAX_DEPTH = 4
+SECTOR = 2048
+
+
+# ---------- Disc images ----------
+class IsoImage:
+    """Sector reader for a plain .iso."""
+
+    def __init__(self, f):
+        self.f = f
+
+    def read(self, lba, size):
+        self.f.seek(lba * SECTOR)
+        return self.f.read(size)
+
+
+class CsoImage:
+    """Sector reader for a compressed (CISO) image: deflate-compressed blocks."""
+
+    def __init__(self, f):
+        self.f = f
+        magic, header_size, total, block_size, _ver, align = struct.unpack("<4sIQIBB", f.read(22))
+        if magic != b"CISO":
+            raise ValueError("not a CSO image")
+        self.block_size = block_size
+        self.align = align
+        blocks = (total + block_size - 1) // block_size
+        f.seek(24)
+        self.index = struct.unpack(f"<{blocks + 1}I", f.read(4 * (blocks + 1)))
+
+    def _block(self, n):
+        start, end = self.index[n], self.index[n + 1]
+        plain = start & 0x80000000
+        start = (start & 0x7FFFFFFF) << self.align
+        end = (end & 0x7FFFFFFF) << self.align
+        self.f.seek(start)
+        data = self.f.read(end - start)
+        return data[:self.block_size] if plain else zlib.decompress(data, -15)
+
+    def read(self, lba, size):
+        offset = lba * SECTOR
+        out = b""
+        while len(out) < size:
+            n, skip = divmod(offset + len(out), self.block_size)
+            if n + 1 >= len(self.index):
+                break
+            chunk = self._block(n)[skip:]
+            if not chunk:
+                break
+            out += chunk
+        return out[:size]
+
+
+def _iso_dir(image, lba, size):
+    """{NAME: (lba, size)} for one ISO9660 directory extent."""
+    data = image.read(lba, size)
+    entries = {}
+    pos = 0
+    while pos < len(data):
+        length = data[pos]
+        if length == 0:
+            # Records never cross a sector boundary; skip the padding
+            pos = (pos // SECTOR + 1) * SECTOR
+            continue
+        rec = data[pos:pos + length]
+        extent, = struct.unpack_from("<I", rec, 2)
+        dsize, = struct.unpack_from("<I", rec, 10)
+        name = rec[33:33 + rec[32]].decode("ascii", "replace").split(";")[0]
+        entries[name.upper()] = (extent, dsize)
+        pos += length
+    return entries
+
+
+def _iso_files(image, names):
+    """Read PSP_GAME/<name> for each name out of an ISO9660 image."""
+    pvd = image.read(16, SECTOR)
+    if pvd[1:6] != b"CD001":
+        raise ValueError("no ISO9660 volume descriptor")
+    root_lba, = struct.unpack_from("<I", pvd, 156 + 2)
+    root_size, = struct.unpack_from("<I", pvd, 156 + 10)
+    root = _iso_dir(image, root_lba, root_size)
+    if "PSP_GAME" not in root:
+        raise ValueError("no PSP_GAME directory")
+    game = _iso_dir(image, *root["PSP_GAME"])
+    return {name: image.read(*game[name]) if name in game else None for name in names}
+
+
+def _pbp_files(f):
+    """PARAM.SFO and ICON0.PNG out of an EBOOT.PBP."""
+    header = f.read(40)
+    if header[:4] != b"\0PBP":
+        raise ValueError("not a PBP file")
+    offsets = struct.unpack_from("<8I", header, 8)
+    f.seek(0, os.SEEK_END)
+    end = f.tell()
+
+    def chunk(i):
+        stop = offsets[i + 1] if i + 1 < len(offsets) else end
+        f.seek(offsets[i])
+        return f.read(stop - offsets[i]) or None
+
+    return {"PARAM.SFO": chunk(0), "ICON0.PNG": chunk(1)}
+
+
+def parse_sfo(data):
+    """Key/value pairs of a PARAM.SFO blob."""
+    magic, _version, key_table, data_table, count = struct.unpack_from("<4sIIII", data)
+    if magic != b"\0PSF":
+        raise ValueError("not a PARAM.SFO")
+    values = {}
+    for i in range(count):
+        key_off, fmt, length, _max_len, data_off = struct.unpack_from("<HHIII", data, 20 + 16 * i)
+        key_start = key_table + key_off
+        key = data[key_start:data.index(b"\0", key_start)].decode("ascii", "replace")
+        raw = data[data_table + data_off:data_table + data_off + length]
+        if fmt == 0x0404:
+            values[key], = struct.unpack("<I", raw[:4])
+        else:
+            values[key] = raw.rstrip(b"\0").decode("utf-8", "replace")
+    return values
+
+
+def extract_metadata(path):
+    """Title, disc ID and ICON0 bytes of one game file. Runs in a worker thread."""
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        with open(path, "rb") as f:
+            if ext == ".pbp":
+                files = _pbp_files(f)
+            else:
+                image = CsoImage(f) if ext == ".cso" else IsoImage(f)
+                files = _iso_files(image, ["PARAM.SFO", "ICON0.PNG"])
+        sfo = parse_sfo(files["PARAM.SFO"]) if files["PARAM.SFO"] else {}
+    except (OSError, ValueError, struct.error, zlib.error) as e:
+        return {"path": path, "error": str(e)}
+    return {
+        "path": path,
+        "title": sfo.get("TITLE") or os.path.splitext(os.path.basename(path))[0],
+        "disc_id": sfo.get("DISC_ID", ""),
+        "icon": files.get("ICON0.PNG"),
+    }
+
+
+# ---------- Library ----------
+class GameLibrary:
+    """SQLite index of the PSP games found under the ROM directories.
+
+    A rescan only stats files: anything whose mtime and size match the
+    index is skipped, and only new or changed files are opened, by a
+    small thread pool (the reads are small and mostly wait on I/O).
+    Results are written from the scanning thread, so the launcher can
+    show the indexed games immediately and refresh when the scan
+    reports back.
+    """
+
+    def __init__(self, rom_dirs=None):
+        self.rom_dirs = [os.path.expanduser(d) for d in (rom_dirs or DEFAULT_ROM_DIRS)]
+        self.db_path = os.path.join(cache_dir(), "library.sqlite")
+        self.icon_dir = cache_dir("psp-icons")
+        with self._db() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS games (
+                path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER,
+                title TEXT, disc_id TEXT, icon TEXT)""")
+        self._scanning = threading.Lock()
+
+    @contextmanager
+    def _db(self):
+        db = sqlite3.connect(self.db_path)
+        try:
+            with db:  # commit or roll back
+                yield db
+        finally:
+            db.close()
+
+    def games(self):
+        with self._db() as db:
+            rows = db.execute("SELECT path, title, disc_id, icon FROM games ORDER BY title").fetchall()
+        return [{"path": p, "title": t, "disc_id": d, "icon": i} for p, t, d, i in rows]
+
+    def tiles(self):
+        """APP_LIST-style entries that start each game directly in PPSSPP."""
+        return [{"name": g["title"], "cmd": [PPSSPP, "--fullscreen", g["path"]],
+                 "icon": g["icon"] or "ppsspp.png", "focus_class": False}
+                for g in self.games()]
+
+    # ---------- Scanning ----------
+    def _walk(self):
+        for root_dir in self.rom_dirs:
+            base_depth = root_dir.rstrip(os.sep).count(os.sep)
+            for dirpath, dirnames, filenames in os.walk(root_dir):
+                if dirpath.count(os.sep) - base_depth >= MAX_DEPTH:
+                    dirnames[:] = []
+                for name in filenames:
+                    if name.lower().endswith(GAME_EXTENSIONS):
+                        yield os.path.join(dirpath, name)
+
+    def scan(self, workers=None):
+        """Bring the index up to date. Returns True if anything changed."""
+        with self._scanning:
+            found = {}
+            for path in self._walk():
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found[path] = (st.st_mtime_ns, st.st_size)
+
+            with self._db() as db:
+                known = {p: (m, s) for p, m, s in db.execute("SELECT path, mtime, size FROM games")}
+                removed = [p for p in known if p not in found]
+                db.executemany("DELETE FROM games WHERE path = ?", [(p,) for p in removed])
+
+            todo = [p for p, stamp in found.items() if known.get(p) != stamp]
+            if todo:
+                self._extract(todo, found, workers)
+            return bool(todo or removed)
+
+    def _extract(self, paths, stamps, workers):
+        workers = workers or min(4, len(paths))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="library") as pool, self._db() as db:
+            for meta in pool.map(extract_metadata, paths):
+                path = meta["path"]
+                if "error" in meta:
+                    print("library: unreadable", path, meta["error"])
+                    meta = {"title": os.path.splitext(os.path.basename(path))[0], "disc_id": "", "icon": None}
+                icon = self._save_icon(path, meta["icon"])
+                mtime, size = stamps[path]
+                db.execute("INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?, ?)",
+                           (path, mtime, size, meta["title"], meta["disc_id"], icon))
+
+    def _save_icon(self, path, data):
+        if not data:
+            return None
+        icon = os.path.join(self.icon_dir, hashlib.sha1(path.encode()).hexdigest() + ".png")
+        with open(icon, "wb") as f:
+            f.write(data)
+        return icon
+
+    def scan_async(self, on_done):
+        """Rescan on a background thread; on_done() runs on the GLib main loop if anything changed."""
+        from gi.repository import GLib
+
+        def run():
+            try:
+                changed = self.scan()
+            except (OSError, sqlite3.Error) as e:
+                print("library scan failed:", e)
+                return
+            if changed:
+                GLib.idle_add(on_done)
+
+        threading.Thread(target=run, daemon=True).start()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# navigation.py — calibrated stick/d-pad navigation with hold-to-repeat acceleration
+
+from gi.repository import GLib
+from evdev import ecodes
+
+# Fractions of the axis half-range; the gap between them is the hysteresis
+ENGAGE = 0.5
+RELEASE = 0.3
+# Auto-repeat while a direction is held: first repeat, then a ramping rate
+INITIAL_DELAY = 0.40
+REPEAT_START = 0.18
+REPEAT_MIN = 0.05  # 20 items/s
+ACCEL = 0.85
+
+# axis code -> 0 for horizontal, 1 for vertical
+AXES = {
+    ecodes.ABS_X: 0, ecodes.ABS_HAT0X: 0,
+    ecodes.ABS_Y: 1, ecodes.ABS_HAT0Y: 1,
+}
+
+
+class Axis:
+    """One calibrated axis, reduced to -1 / 0 / +1 with a deadzone and hysteresis."""
+
+    def __init__(self, minimum=-32768, maximum=32767, flat=0, value=None):
+        self.center = (minimum + maximum) / 2
+        self.half = max(1, (maximum - minimum) / 2)
+        # A noisy stick reports its own deadzone in "flat"
+        self.release = max(RELEASE, flat / self.half)
+        self.engage = max(ENGAGE, self.release + 0.1)
+        self.pos = 0
+        if value is not None:
+            self.update(value)
+
+    def update(self, value):
+        off = (value - self.center) / self.half
+        sign = 1 if off > 0 else -1
+        if abs(off) >= self.engage:
+            self.pos = sign
+        elif abs(off) < self.release or sign != self.pos:
+            self.pos = 0
+        return self.pos
+
+
+def _default_axes():
+    """Uncalibrated axes: a 16-bit stick and a -1..1 hat."""
+    hats = (ecodes.ABS_HAT0X, ecodes.ABS_HAT0Y)
+    return {code: Axis(-1, 1) if code in hats else Axis() for code in AXES}
+
+
+class StickNavigator:
+    """Turns gamepad axis events into discrete moves.
+
+    Calls on_move(dx, dy, repeat) once when a direction is pushed, then
+    again after INITIAL_DELAY and at a rate that ramps up to 1/REPEAT_MIN
+    while it is held. Releasing the stick cancels the pending repeat, so
+    nothing lands after the user lets go. If on_move returns False (the
+    end of the list was reached) repeating stops until the next push.
+    """
+
+    def __init__(self, on_move):
+        self.on_move = on_move
+        self.axes = _default_axes()
+        self.direction = (0, 0)
+        self.interval = REPEAT_START
+        self._timer = None
+
+    def calibrate(self, dev):
+        """Read the ranges and deadzones of a newly attached device."""
+        self.axes = _default_axes()
+        for code, info in dev.capabilities().get(ecodes.EV_ABS, []):
+            if code in AXES:
+                self.axes[code] = Axis(info.min, info.max, info.flat, info.value)
+        self._set_direction((0, 0))
+
+    def feed(self, e):
+        """Handle one evdev event. Returns True if it was a navigation axis."""
+        if e.type != ecodes.EV_ABS or e.code not in AXES:
+            return False
+        self.axes[e.code].update(e.value)
+        self._set_direction(self._held())
+        return True
+
+    def reset(self):
+        self._set_direction((0, 0))
+
+    # ---------- State ----------
+    def _held(self):
+        held = [0, 0]
+        for code, axis in self.axes.items():
+            if axis.pos and not held[AXES[code]]:
+                held[AXES[code]] = axis.pos
+        dx, dy = held
+        if dx and dy:
+            # Diagonal: keep whichever axis was already moving
+            return (0, dy) if self.direction[1] == dy else (dx, 0)
+        return (dx, dy)
+
+    def _set_direction(self, direction):
+        if direction == self.direction:
+            return
+        self._cancel()
+        self.direction = direction
+        if direction == (0, 0):
+            return
+        self.interval = REPEAT_START
+        if self.on_move(direction[0], direction[1], False) is not False:
+            self._timer = GLib.timeout_add(int(INITIAL_DELAY * 1000), self._repeat)
+
+    def _repeat(self):
+        self._timer = None
+        if self.on_move(self.direction[0], self.direction[1], True) is False:
+            return False
+        self.interval = max(REPEAT_MIN, self.interval * ACCEL)
+        self._timer = GLib.timeout_add(int(self.interval * 1000), self._repeat)
+        return False
+
+    def _cancel(self):
+        if self._timer is not None:
+            GLib.source_remove(self._timer)
+            self._timer = None
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# netmanager.py — Wi-Fi networks and connections through NetworkManager's D-Bus API
+#
+# Everything goes over the system bus asynchronously from the GLib main loop.
+# Gio honours DBUS_SYSTEM_BUS_ADDRESS, so pointing it at a python-dbusmock
+# NetworkManager template (dbusmock.templates.networkmanager) exercises the
+# same code paths without a real radio.
+
+from collections import namedtuple
+from gi.repository import Gio, GLib
+
+from tracing import TRACE
+
+NM = "org.freedesktop.NetworkManager"
+NM_PATH = "/org/freedesktop/NetworkManager"
+SETTINGS_PATH = "/org/freedesktop/NetworkManager/Settings"
+SETTINGS_IFACE = NM + ".Settings"
+CONNECTION_IFACE = NM + ".Settings.Connection"
+DEVICE_IFACE = NM + ".Device"
+WIRELESS_IFACE = NM + ".Device.Wireless"
+AP_IFACE = NM + ".AccessPoint"
+PROPERTIES_IFACE = "org.freedesktop.DBus.Properties"
+DEVICE_TYPE_WIFI = 2
+AP_FLAGS_PRIVACY = 0x1
+CALL_TIMEOUT = 5000  # ms; activation itself is reported later, this only covers the request
+
+Network = namedtuple("Network", "ssid strength security saved active device ap")
+
+
+def _security(props):
+    if props.get("RsnFlags"):
+        return "WPA2"
+    if props.get("WpaFlags"):
+        return "WPA"
+    if props.get("Flags", 0) & AP_FLAGS_PRIVACY:
+        return "WEP"
+    return ""
+
+
+class WifiModel:
+    """Access points seen by NetworkManager, kept current from its signals.
+
+    The model is filled once from GetAllAccessPoints and then follows
+    AccessPointAdded/Removed and each access point's PropertiesChanged
+    (signal strength), so reopening the Wi-Fi list shows what is already
+    known straight away while a background RequestScan refreshes it. Saved
+    connection profiles are indexed by SSID, so connecting to a known
+    network just activates its profile instead of asking for the password.
+    Listeners added with connect_changed() are called after every update.
+    """
+
+    def __init__(self, bus=None):
+        self.bus = bus or Gio.bus_get_sync(Gio.BusType.SYSTEM, None)
+        self.devices = {}   # wireless device path -> active access point path
+        self.aps = {}       # access point path -> (device path, properties)
+        self.saved = {}     # ssid -> connection profile path
+        self._listeners = {}
+        self._next_listener = 1
+        self._subs = [
+            self._subscribe(WIRELESS_IFACE, "AccessPointAdded", self._on_ap_added),
+            self._subscribe(WIRELESS_IFACE, "AccessPointRemoved", self._on_ap_removed),
+            self._subscribe(PROPERTIES_IFACE, "PropertiesChanged", self._on_properties_changed),
+            self._subscribe(SETTINGS_IFACE, "NewConnection", self._on_profiles_changed),
+            self._subscribe(SETTINGS_IFACE, "ConnectionRemoved", self._on_profiles_changed),
+        ]
+        self._call(NM_PATH, NM, "GetDevices", None, self._on_devices)
+        self._load_profiles()
+
+    # ---------- Listeners ----------
+    def connect_changed(self, fn):
+        listener_id = self._next_listener
+        self._next_listener += 1
+        self._listeners[listener_id] = fn
+        return listener_id
+
+    def disconnect_changed(self, listener_id):
+        self._listeners.pop(listener_id, None)
+
+    def _changed(self):
+        for fn in list(self._listeners.values()):
+            fn()
+
+    # ---------- Queries ----------
+    def networks(self):
+        """One entry per SSID (its strongest access point), strongest first."""
+        best = {}
+        for path, (device, props) in self.aps.items():
+            ssid = props.get("Ssid")
+            if not ssid:
+                continue  # hidden network
+            strength = props.get("Strength", 0)
+            if ssid in best and best[ssid].strength >= strength:
+                continue
+            best[ssid] = Network(ssid, strength, _security(props), ssid in self.saved,
+                                 self.devices.get(device) == path, device, path)
+        # An active network stays on top whatever its strength
+        return sorted(best.values(), key=lambda n: (not n.active, -n.strength, n.ssid.lower()))
+
+    def needs_password(self, network):
+        return bool(network.security) and not network.saved
+
+    # ---------- Actions ----------
+    def request_scan(self):
+        for device in self.devices:
+            # NetworkManager rate-limits scans and rejects early ones; that is fine
+            self._call(device, WIRELESS_IFACE, "RequestScan", GLib.Variant("(a{sv})", ({},)), None)
+
+    def connect(self, network, password=None, on_done=None):
+        """Activate network; on_done(ok, message) is called from the main loop."""
+        def done(result, error):
+            if error:
+                TRACE.warn("wifi", "connecting to %s failed: %s", network.ssid, error)
+            else:
+                TRACE.info("wifi", "activating %s", network.ssid)
+            if on_done:
+                on_done(error is None, error)
+
+        profile = self.saved.get(network.ssid)
+        if profile:
+            args = GLib.Variant("(ooo)", (profile, network.device, network.ap))
+            self._call(NM_PATH, NM, "ActivateConnection", args, done)
+            return
+        settings = {}
+        if network.security:
+            settings["802-11-wireless-security"] = {
+                "key-mgmt": GLib.Variant("s", "none" if network.security == "WEP" else "wpa-psk"),
+                "wep-key0" if network.security == "WEP" else "psk": GLib.Variant("s", password or ""),
+            }
+        args = GLib.Variant("(a{sa{sv}}oo)", (settings, network.device, network.ap))
+        self._call(NM_PATH, NM, "AddAndActivateConnection", args, done)
+
+    def close(self):
+        for sub in self._subs:
+            self.bus.signal_unsubscribe(sub)
+        self._subs = []
+        self._listeners.clear()
+
+    # ---------- D-Bus plumbing ----------
+    def _subscribe(self, iface, member, fn):
+        def on_signal(bus, sender, path, iface, member, params):
+            fn(path, params.unpack())
+        return self.bus.signal_subscribe(NM, iface, member, None, None, Gio.DBusSignalFlags.NONE, on_signal)
+
+    def _call(self, path, iface, method, args, fn):
+        def on_reply(bus, result):
+            try:
+                reply = bus.call_finish(result).unpack()
+            except GLib.Error as e:
+                if fn:
+                    fn(None, e.message)
+                else:
+                    TRACE.debug("wifi", "%s.%s: %s", iface, method, e.message)
+                return
+            if fn:
+                fn(reply, None)
+        self.bus.call(NM, path, iface, method, args, None, Gio.DBusCallFlags.NONE,
+                      CALL_TIMEOUT, None, on_reply)
+
+    # ---------- Devices and access points ----------
+    def _on_devices(self, reply, error):
+        if error:
+            TRACE.warn("wifi", "NetworkManager unavailable: %s", error)
+            return
+        for device in reply[0]:
+            self._call(device, PROPERTIES_IFACE, "GetAll", GLib.Variant("(s)", (DEVICE_IFACE,)),
+                       lambda reply, error, device=device: self._on_device_props(device, reply, error))
+
+    def _on_device_props(self, device, reply, error):
+        if error or reply[0].get("DeviceType") != DEVICE_TYPE_WIFI:
+            return
+        self.devices[device] = None
+        self._call(device, PROPERTIES_IFACE, "Get", GLib.Variant("(ss)", (WIRELESS_IFACE, "ActiveAccessPoint")),
+                   lambda reply, error: self._set_active(device, None if error else reply[0]))
+        self._call(device, WIRELESS_IFACE, "GetAllAccessPoints", None,
+                   lambda reply, error: self._on_all_aps(device, reply, error))
+
+    def _on_all_aps(self, device, reply, error):
+        if error:
+            return
+        for ap in reply[0]:
+            self._on_ap_added(device, (ap,))
+
+    def _set_active(self, device, ap):
+        self.devices[device] = ap if ap and ap != "/" else None
+        self._changed()
+
+    def _on_ap_added(self, device, params):
+        ap = params[0]
+        if ap in self.aps:
+            return
+        self.aps[ap] = (device, {})
+        self._call(ap, PROPERTIES_IFACE, "GetAll", GLib.Variant("(s)", (AP_IFACE,)),
+                   lambda reply, error: self._update_ap(ap, None if error else reply[0]))
+
+    def _on_ap_removed(self, device, params):
+        if self.aps.pop(params[0], None) is not None:
+            self._changed()
+
+    def _update_ap(self, ap, props):
+        if ap not in self.aps or props is None:
+            return  # removed meanwhile
+        device, known = self.aps[ap]
+        for key, value in props.items():
+            if key == "Ssid":
+                value = bytes(value).decode("utf-8", "replace")
+            known[key] = value
+        self._changed()
+
+    def _on_properties_changed(self, path, params):
+        iface, changed, _invalidated = params
+        if iface == AP_IFACE and path in self.aps:
+            self._update_ap(path, changed)
+        elif iface == WIRELESS_IFACE and path in self.devices and "ActiveAccessPoint" in changed:
+            self._set_active(path, changed["ActiveAccessPoint"])
+
+    # ---------- Saved profiles ----------
+    def _load_profiles(self):
+        self.saved = {}
+        self._call(SETTINGS_PATH, SETTINGS_IFACE, "ListConnections", None, self._on_profiles)
+
+    def _on_profiles(self, reply, error):
+        if error:
+            return
+        for path in reply[0]:
+            self._call(path, CONNECTION_IFACE, "GetSettings", None,
+                       lambda reply, error, path=path: self._on_profile(path, reply, error))
+
+    def _on_profile(self, path, reply, error):
+        if error:
+            return
+        wireless = reply[0].get("802-11-wireless")
+        if wireless and wireless.get("ssid"):
+            self.saved[bytes(wireless["ssid"]).decode("utf-8", "replace")] = path
+            self._changed()
+
+    def _on_profiles_changed(self, path, params):
+        self._load_profiles()
+
+
+_MODEL = None
+
+
+def wifi_model():
+    """The shared WifiModel, created on first use; None without a system bus."""
+    global _MODEL
+    if _MODEL is None:
+        try:
+            _MODEL = WifiModel()
+        except GLib.Error as e:
+            TRACE.warn("wifi", "no system bus: %s", e.message)
+    return _MODEL
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# paths.py — XDG locations shared by the launcher scripts
+
+import os
+import stat
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def asset(name):
+    """Absolute path of a file shipped next to the scripts (icons, sounds)."""
+    return os.path.join(HERE, name)
+
+
+def _xdg_dir(env, fallback, parts):
+    base = os.environ.get(env) or os.path.expanduser(fallback)
+    path = os.path.join(base, "ellixpi", *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def cache_dir(*parts):
+    return _xdg_dir("XDG_CACHE_HOME", "~/.cache", parts)
+
+
+def config_dir(*parts):
+    return _xdg_dir("XDG_CONFIG_HOME", "~/.config", parts)
+
+
+def data_dir(*parts):
+    return _xdg_dir("XDG_DATA_HOME", "~/.local/share", parts)
+
+
+def runtime_dir(*parts):
+    """Per-user directory for sockets: $XDG_RUNTIME_DIR/ellixpi, or a private one in /tmp.
+
+    Anyone who can write there can bind the input router's and the trace
+    sockets, so a directory that is not ours, is not 0700, or is a symlink
+    is refused with PermissionError rather than used.
+    """
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    root = os.path.join(base, "ellixpi") if base else f"/tmp/ellixpi-{os.getuid()}"
+    os.makedirs(root, mode=0o700, exist_ok=True)
+    st = os.lstat(root)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or stat.S_IMODE(st.st_mode) != 0o700:
+        raise PermissionError(f"{root} is not a private directory of this user")
+    path = os.path.join(root, *parts)
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
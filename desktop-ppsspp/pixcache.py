@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# pixcache.py — on-disk cache of decoded, pre-scaled pixbufs
+
+import os
+import struct
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import gi
+gi.require_version("GdkPixbuf", "2.0")
+from gi.repository import GdkPixbuf, GLib
+
+from paths import cache_dir
+
+# magic, width, height, rowstride, has_alpha, length of the source path that follows
+HEADER = struct.Struct("<4sIII?H")
+MAGIC = b"EPX2"
+MEMORY_ENTRIES = 256  # decoded pixbufs kept in memory, least recently used dropped first
+
+
+class PixbufCache:
+    """Decodes and scales images once, then keeps the raw pixels on disk.
+
+    Entries are keyed by source path, mtime and target size, so editing an
+    icon or changing the monitor resolution simply misses the cache. All
+    decoding and disk I/O runs on worker threads; results are handed back
+    on the GLib main loop.
+
+    Only the MEMORY_ENTRIES most recently used pixbufs stay in memory. Each
+    disk entry records its source path, and on first use a worker removes
+    the entries whose source has gone or no longer hashes to their name.
+    """
+
+    def __init__(self, workers=2):
+        self.dir = cache_dir("pixbufs")
+        self._memory = OrderedDict()  # (path, width, height) -> pixbuf, oldest first
+        self._lock = threading.Lock()
+        self._workers = workers
+        self._pool = None
+
+    def _key(self, path, width, height):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        raw = f"{os.path.abspath(path)}|{mtime}|{width}x{height}"
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    # ---------- Public API ----------
+    def load(self, path, width, height, callback):
+        """Call callback(pixbuf) on the main loop once path is ready at width x height.
+
+        Returns the pixbuf directly (and does not call back) if it is already
+        in memory, otherwise None.
+        """
+        pb = self._recall(path, width, height)
+        if pb is not None:
+            return pb
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="pixcache")
+            self._pool.submit(self._prune)
+        self._pool.submit(self._load_worker, path, width, height, callback)
+        return None
+
+    def load_sync(self, path, width, height):
+        """Blocking variant of load(), for callers already off the main thread."""
+        return self._recall(path, width, height) or self._get(path, width, height)
+
+    # ---------- Memory ----------
+    def _recall(self, path, width, height):
+        with self._lock:
+            pb = self._memory.get((path, width, height))
+            if pb is not None:
+                self._memory.move_to_end((path, width, height))
+        return pb
+
+    def _remember(self, path, width, height, pb):
+        with self._lock:
+            self._memory[(path, width, height)] = pb
+            self._memory.move_to_end((path, width, height))
+            while len(self._memory) > MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+
+    # ---------- Workers ----------
+    def _load_worker(self, path, width, height, callback):
+        pb = self._get(path, width, height)
+        if pb is not None:
+            GLib.idle_add(callback, pb)
+
+    def _get(self, path, width, height):
+        key = self._key(path, width, height)
+        if key is None:
+            return None
+        disk_path = os.path.join(self.dir, key + ".pix")
+
+        pb = self._read(disk_path)
+        if pb is None:
+            try:
+                pb = GdkPixbuf.Pixbuf.new_from_file_at_scale(path, width, height, False)
+            except GLib.Error as e:
+                print("image load failed:", path, e)
+                return None
+            self._write(disk_path, path, pb)
+
+        self._remember(path, width, height, pb)
+        return pb
+
+    def _read(self, disk_path):
+        try:
+            with open(disk_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) < HEADER.size:
+            return None
+        magic, width, height, rowstride, has_alpha, path_len = HEADER.unpack_from(data)
+        pixels = data[HEADER.size + path_len:]
+        if magic != MAGIC or len(pixels) < rowstride * (height - 1) + width * (4 if has_alpha else 3):
+            return None
+        return GdkPixbuf.Pixbuf.new_from_bytes(
+            GLib.Bytes.new(pixels), GdkPixbuf.Colorspace.RGB, has_alpha, 8,
+            width, height, rowstride)
+
+    def _write(self, disk_path, source, pb):
+        source = os.path.abspath(source).encode("utf-8", "surrogateescape")
+        header = HEADER.pack(MAGIC, pb.get_width(), pb.get_height(), pb.get_rowstride(), pb.get_has_alpha(),
+                             len(source))
+        tmp = f"{disk_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(header)
+                f.write(source)
+                f.write(pb.read_pixel_bytes().get_data())
+            os.replace(tmp, disk_path)
+        except OSError as e:
+            print("pixbuf cache write failed:", e)
+
+    # ---------- Pruning ----------
+    def _prune(self):
+        """Remove disk entries that can no longer be hit: source gone or changed, or an old format."""
+        try:
+            names = os.listdir(self.dir)
+        except OSError:
+            return
+        removed = 0
+        for name in names:
+            disk_path = os.path.join(self.dir, name)
+            if name.endswith(".tmp"):
+                # Left by a writer that died; this process's own are still being written
+                stale = f".{os.getpid()}." not in name
+            elif name.endswith(".pix"):
+                stale = self._entry_key(disk_path) != name[:-len(".pix")]
+            else:
+                continue
+            if stale:
+                try:
+                    os.unlink(disk_path)
+                    removed += 1
+                except OSError:
+                    pass
+        if removed:
+            print("pixbuf cache: removed", removed, "stale entries")
+
+    def _entry_key(self, disk_path):
+        """The key an entry would have now, from the source path and size it records; None if unusable."""
+        try:
+            with open(disk_path, "rb") as f:
+                head = f.read(HEADER.size)
+                if len(head) < HEADER.size:
+                    return None
+                magic, width, height, _rowstride, _has_alpha, path_len = HEADER.unpack(head)
+                if magic != MAGIC:
+                    return None
+                source = f.read(path_len).decode("utf-8", "surrogateescape")
+        except OSError:
+            return None
+        return self._key(source, width, height)
+
+
+PIXBUF_CACHE = PixbufCache()
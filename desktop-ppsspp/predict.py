@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# predict.py — word and next-letter suggestions from an mmap'd frequency trie
+#
+#   python3 predict.py build words.txt words.trie   # prebuild the trie
+#   python3 predict.py eval corpus.txt               # selections per word on a text
+
+import os
+import sys
+import json
+import heapq
+import mmap
+import re
+import struct
+
+from paths import asset, cache_dir, data_dir
+
+MAGIC = b"ETRI"
+HEADER = struct.Struct("<4sHI")    # magic, version, node count
+NODE = struct.Struct("<IIIHBx")    # first child, weight, best weight below, child count, label byte
+VERSION = 1
+WORDS = asset("words.txt")         # one word per line, most frequent first
+LEARN_WEIGHT = 20000               # per use of a word the user committed; the top word is ~1e6
+WORD_SLOTS = 3
+CHAR_SLOTS = 4
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+# ---------- Building ----------
+def read_wordlist(path):
+    """{word: weight} from a ranked list, weighted by rank (Zipf), or from "word count" lines."""
+    weights = {}
+    rank = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if not parts or parts[0].startswith("#"):
+                continue
+            rank += 1
+            word = parts[0].lower()
+            weight = int(parts[1]) if len(parts) > 1 else 1000000 // rank
+            weights[word] = max(weights.get(word, 0), weight)
+    return weights
+
+
+def build(weights):
+    """Serialize {word: weight} as a trie with each node's children contiguous and sorted."""
+    root = [{}, 0]
+    for word, weight in weights.items():
+        node = root
+        for b in word.encode("utf-8"):
+            node = node[0].setdefault(b, [{}, 0])
+        node[1] = min(weight, 0xFFFFFFFF)
+
+    def best(node):
+        node.append(max([node[1]] + [best(c) for c in node[0].values()]))
+        return node[2]
+    best(root)
+
+    # Breadth first, so a node's children get consecutive indices
+    order = [(root, 0)]
+    first_child = []
+    i = 0
+    while i < len(order):
+        node, _label = order[i]
+        first_child.append(len(order))
+        order.extend((node[0][b], b) for b in sorted(node[0]))
+        i += 1
+
+    out = bytearray(HEADER.pack(MAGIC, VERSION, len(order)))
+    for (node, label), first in zip(order, first_child):
+        out += NODE.pack(first if node[0] else 0, node[1], node[2], len(node[0]), label)
+    return bytes(out)
+
+
+def write_trie(weights, path):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(build(weights))
+    os.replace(tmp, path)
+
+
+# ---------- Reading ----------
+class Trie:
+    """Read-only view of a built trie. Nothing is parsed up front: the
+    file is mmap'd and nodes are unpacked as a lookup walks them."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a version {VERSION} trie")
+
+    def node(self, i):
+        return NODE.unpack_from(self.mm, HEADER.size + i * NODE.size)
+
+    def children(self, i):
+        first, _weight, _best, count, _label = self.node(i)
+        return range(first, first + count)
+
+    def find(self, prefix):
+        """Index of the node for prefix (bytes), or None."""
+        i = 0
+        for b in prefix:
+            kids = self.children(i)
+            lo, hi = 0, len(kids)
+            while lo < hi:  # children are sorted by label
+                mid = (lo + hi) // 2
+                if self.node(kids[mid])[4] < b:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo == len(kids) or self.node(kids[lo])[4] != b:
+                return None
+            i = kids[lo]
+        return i
+
+    def weight(self, word):
+        i = self.find(word.encode("utf-8"))
+        return self.node(i)[1] if i is not None else 0
+
+    def complete(self, prefix, n):
+        """Up to n (word, weight) under prefix, heaviest first, best-first over subtree maxima."""
+        raw = prefix.encode("utf-8")
+        start = self.find(raw)
+        if start is None:
+            return []
+        found = []
+        heap = [(-self.node(start)[2], False, start, raw)]
+        while heap and len(found) < n:
+            neg, is_word, i, word = heapq.heappop(heap)
+            if is_word:
+                found.append((word.decode("utf-8"), -neg))
+                continue
+            _first, weight, _best, _count, _label = self.node(i)
+            if weight:
+                heapq.heappush(heap, (-weight, True, i, word))
+            for k in self.children(i):
+                _f, _w, kbest, _c, label = self.node(k)
+                heapq.heappush(heap, (-kbest, False, k, word + bytes([label])))
+        return found
+
+    def next_chars(self, prefix):
+        """{character: best weight reachable through it} for the letters that can follow prefix."""
+        i = self.find(prefix.encode("utf-8"))
+        if i is None:
+            return {}
+        chars = {}
+        for k in self.children(i):
+            _f, _w, best, _c, label = self.node(k)
+            if label < 0x80:
+                chars[chr(label)] = best
+        return chars
+
+    def close(self):
+        self.mm.close()
+
+
+def open_trie(words=WORDS):
+    """The trie for the shipped word list, built into the cache the first time (or when the list changes)."""
+    path = os.path.join(cache_dir(), "words.trie")
+    try:
+        if os.path.getmtime(path) >= os.path.getmtime(words):
+            return Trie(path)
+    except (OSError, ValueError):
+        pass
+    try:
+        write_trie(read_wordlist(words), path)
+        return Trie(path)
+    except OSError as e:
+        print("predict: no word list:", e)
+        return None
+
+
+# ---------- Predictor ----------
+class Predictor:
+    """Ranks completions from the trie together with words the user has committed.
+
+    The learned words are a small {word: uses} map kept in memory and in
+    learned.json; each use adds LEARN_WEIGHT, so a word typed a couple of
+    times outranks all but the most common words that share its prefix.
+    """
+
+    def __init__(self, trie=None, learned_path=None):
+        self.trie = trie
+        self.learned_path = learned_path
+        self.learned = {}
+        if learned_path:
+            try:
+                with open(learned_path) as f:
+                    self.learned = json.load(f)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                print("learned words ignored:", e)
+
+    def _score(self, word, base):
+        return base + self.learned.get(word, 0) * LEARN_WEIGHT
+
+    def words(self, prefix, n=WORD_SLOTS):
+        """Up to n whole words longer than prefix, best first."""
+        prefix = prefix.lower()
+        scores = {}
+        if self.trie:
+            for word, weight in self.trie.complete(prefix, n + 1):
+                scores[word] = self._score(word, weight)
+        for word in self.learned:
+            if word.startswith(prefix) and word not in scores:
+                scores[word] = self._score(word, self.trie.weight(word) if self.trie else 0)
+        scores.pop(prefix, None)
+        return sorted(scores, key=lambda w: (-scores[w], w))[:n]
+
+    def chars(self, prefix, n=CHAR_SLOTS):
+        """Up to n likely next characters, best first."""
+        prefix = prefix.lower()
+        scores = self.trie.next_chars(prefix) if self.trie else {}
+        for word, uses in self.learned.items():
+            if len(word) > len(prefix) and word.startswith(prefix):
+                c = word[len(prefix)]
+                scores[c] = scores.get(c, 0) + uses * LEARN_WEIGHT
+        return sorted(scores, key=lambda c: (-scores[c], c))[:n]
+
+    def learn(self, word):
+        word = word.lower()
+        if WORD_RE.fullmatch(word):
+            self.learned[word] = self.learned.get(word, 0) + 1
+
+    def save(self):
+        if not self.learned_path:
+            return
+        tmp = self.learned_path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(self.learned, f)
+            os.replace(tmp, self.learned_path)
+        except OSError as e:
+            print("learned words not saved:", e)
+
+
+def open_predictor():
+    return Predictor(open_trie(), os.path.join(data_dir(), "learned.json"))
+
+
+# ---------- Evaluation ----------
+def selections_for(predictor, word):
+    """Selections to enter word (and the space after it): letters until it is offered, then one pick."""
+    prefix = ""
+    selections = 0
+    while True:
+        if word in predictor.words(prefix):
+            return selections + 1
+        if prefix == word:
+            return selections + 1  # the space
+        prefix += word[len(prefix)]
+        selections += 1
+
+
+def evaluate(path, learn=True):
+    predictor = Predictor(open_trie())
+    words = selections = letters = 0
+    with open(path, encoding="utf-8") as f:
+        for word in WORD_RE.findall(f.read().lower()):
+            selections += selections_for(predictor, word)
+            letters += len(word) + 1
+            words += 1
+            if learn:
+                predictor.learn(word)
+    if not words:
+        return {"words": 0}
+    return {
+        "words": words,
+        "selections_per_word": round(selections / words, 2),
+        "letters_per_word": round(letters / words, 2),
+        "saved_percent": round(100 * (1 - selections / letters), 1),
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "build":
+        write_trie(read_wordlist(sys.argv[2]), sys.argv[3])
+    elif len(sys.argv) == 3 and sys.argv[1] == "eval":
+        print(json.dumps(evaluate(sys.argv[2]), indent=2))
+    else:
+        sys.exit("usage: predict.py build words.txt words.trie | eval corpus.txt")
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# prewarm.py — background pre-warming of heavy APP_LIST entries
+
+import os
+import signal
+import threading
+import time
+from gi.repository import GLib
+
+PSI_PATH = "/proc/pressure/memory"
+# Wake us when tasks stall 150 ms on memory within a 2 s window (unprivileged
+# triggers need a window that is a multiple of 2 s)
+PSI_TRIGGER = b"some 150000 2000000"
+PSI_SETTLED_AVG10 = 1.0   # % stalled below which evicted apps may warm again
+REWARM_DELAY = 300        # seconds before retrying after an eviction
+MIN_RESIDENT_LIFETIME = 10  # don't restart apps that die faster than this
+
+
+def readahead(paths):
+    """Ask the kernel to pull files into the page cache without reading them ourselves."""
+    for path in paths:
+        try:
+            fd = os.open(os.path.realpath(path), os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+
+
+def memory_pressure():
+    """The 'some avg10' stall percentage from PSI, or 0.0 if unavailable."""
+    try:
+        with open(PSI_PATH) as f:
+            fields = f.readline().split()
+    except OSError:
+        return 0.0
+    for field in fields:
+        if field.startswith("avg10="):
+            return float(field[len("avg10="):])
+    return 0.0
+
+
+class WarmPool:
+    """Applies the "prewarm" / "resident" policies of APP_LIST entries.
+
+    "prewarm" is either a command started in the background (e.g.
+    ["steam", "-silent"]) or "readahead", which only pages the app's files
+    into memory (cmd[0] plus any "readahead" paths). "resident" restarts
+    a prewarm command after the app exits. Background processes that the
+    user has not touched are evicted when PSI reports memory pressure.
+
+    get_apps() returns the current tile list, so entries added later
+    (catalogue, game library, Steam) are picked up by refresh().
+    """
+
+    def __init__(self, supervisor, get_apps):
+        self.supervisor = supervisor
+        self.get_apps = get_apps
+        self.evicted = set()
+        self.started = False
+        self._warmed = set()  # names already warmed once
+        self._psi_fd = None
+        supervisor.exit_handlers.append(self._on_app_exit)
+
+    @property
+    def apps(self):
+        return [app for app in self.get_apps() if app.get("prewarm")]
+
+    def start(self):
+        """Warm every entry; meant to run once the first frame is on screen."""
+        self.started = True
+        self._watch_pressure()
+        for app in self.apps:
+            self.warm(app)
+        return False
+
+    def refresh(self):
+        """The tile list changed: warm entries that were not there before (once started)."""
+        if not self.started:
+            return
+        for app in self.apps:
+            if app["name"] not in self._warmed:
+                self.warm(app)
+
+    def warm(self, app):
+        self._warmed.add(app["name"])
+        policy = app["prewarm"]
+        if policy == "readahead":
+            paths = [app["cmd"][0]] + app.get("readahead", [])
+            threading.Thread(target=readahead, args=(paths,), daemon=True).start()
+            return
+        if app["name"] in self.evicted or self.supervisor.running(app["name"]):
+            return
+        print(f"Prewarming {app['name']}")
+        entry = self.supervisor.launch(app, policy)
+        entry.warm = True
+
+    def claim(self, app):
+        """The user pressed the tile: its warm processes are now in use."""
+        for entry in self.supervisor.running_entries(app["name"]):
+            entry.warm = False
+
+    # ---------- Residency ----------
+    def _on_app_exit(self, entry):
+        app = entry.app
+        if not app.get("resident") or app.get("prewarm") == "readahead":
+            return
+        if time.time() - entry.started < MIN_RESIDENT_LIFETIME:
+            print(f"{app['name']} exited too quickly, not keeping it resident")
+            return
+        GLib.timeout_add_seconds(2, self._rewarm, app)
+
+    def _rewarm(self, app):
+        self.warm(app)
+        return False
+
+    # ---------- Memory pressure ----------
+    def _watch_pressure(self):
+        try:
+            fd = os.open(PSI_PATH, os.O_RDWR | os.O_NONBLOCK)
+            os.write(fd, PSI_TRIGGER + b"\0")
+        except OSError as e:
+            print("PSI trigger unavailable:", e)
+            return
+        self._psi_fd = fd
+        GLib.io_add_watch(fd, GLib.PRIORITY_DEFAULT, GLib.IO_PRI | GLib.IO_ERR, self._on_pressure)
+
+    def _on_pressure(self, fd, condition):
+        if condition & GLib.IO_ERR:
+            os.close(fd)
+            self._psi_fd = None
+            return False
+        self.evict_one()
+        return True
+
+    def evict_one(self):
+        """Stop the largest warm process tree the user hasn't touched."""
+        idle = [e for entries in self.supervisor.apps.values() for e in entries
+                if e.warm and e.running]
+        if not idle:
+            return False
+        victim = max(idle, key=lambda e: e.rss())
+        print(f"Memory pressure: evicting {victim.name}")
+        self.evicted.add(victim.name)
+        try:
+            # Apps run in their own session, led by the root pid
+            os.killpg(victim.pid, signal.SIGTERM)
+        except OSError:
+            pass
+        GLib.timeout_add_seconds(REWARM_DELAY, self._retry_evicted)
+        return True
+
+    def _retry_evicted(self):
+        if memory_pressure() >= PSI_SETTLED_AVG10:
+            return True  # still tight; check again later
+        names, self.evicted = self.evicted, set()
+        for app in self.apps:
+            if app["name"] in names:
+                self.warm(app)
+        return False
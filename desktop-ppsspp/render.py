@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# render.py — pre-rasterized tile backgrounds for low-power mode, and a frame-time meter
+
+import time
+import gi
+gi.require_version("Gtk", "3.0")
+gi.require_foreign("cairo")
+from gi.repository import Gtk
+import cairo
+
+from tracing import TRACE
+
+GLOW = 24  # room around a tile for the selected glow (18px blur in the CSS)
+
+
+class TileRaster:
+    """Tile backgrounds rendered once per (size, selected, scale) through the theme's CSS.
+
+    The gradients, borders and glow of .app-button are drawn into an image
+    surface the first time a size/state is needed; after that a tile
+    repaint is a single paint of that surface. The cache is dropped when
+    the GTK theme changes.
+    """
+
+    def __init__(self):
+        self._surfaces = {}
+        self._theme_id = None
+
+    def surface(self, widget, width, height, selected):
+        scale = widget.get_scale_factor()
+        key = (width, height, selected, scale)
+        surf = self._surfaces.get(key)
+        if surf is None:
+            self._watch_theme()
+            surf = cairo.ImageSurface(cairo.FORMAT_ARGB32,
+                                      (width + 2 * GLOW) * scale, (height + 2 * GLOW) * scale)
+            surf.set_device_scale(scale, scale)
+            cr = cairo.Context(surf)
+            ctx = self._style(widget.get_screen(), selected)
+            Gtk.render_background(ctx, cr, GLOW, GLOW, width, height)
+            Gtk.render_frame(ctx, cr, GLOW, GLOW, width, height)
+            self._surfaces[key] = surf
+        return surf
+
+    def _style(self, screen, selected):
+        # A bare .app-button: the low-power class (which blanks the CSS) is left off
+        path = Gtk.WidgetPath()
+        path.append_type(Gtk.Button)
+        path.iter_add_class(-1, "app-button")
+        ctx = Gtk.StyleContext()
+        ctx.set_path(path)
+        ctx.set_screen(screen)
+        if selected:
+            ctx.add_class("selected")
+        return ctx
+
+    def invalidate(self, *args):
+        self._surfaces.clear()
+
+    def _watch_theme(self):
+        if self._theme_id is None:
+            self._theme_id = Gtk.Settings.get_default().connect("notify::gtk-theme-name", self.invalidate)
+
+
+TILE_RASTER = TileRaster()
+
+
+def meter_frames(window, name="frame.draw"):
+    """Time every frame the window draws into the trace counter `name`.
+
+    `python3 tracing.py desktop stats` then shows frames per second and
+    the average and worst draw time.
+    """
+    started = [0.0]
+
+    def before(widget, cr):
+        started[0] = time.monotonic()
+        return False
+
+    def after(widget, cr):
+        TRACE.sample(name, time.monotonic() - started[0])
+        return False
+
+    window.connect("draw", before)
+    window.connect_after("draw", after)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# scheduler.py — periodic work and input for a window, suspended while an app is in front
+
+import gi
+gi.require_version("Gtk", "3.0")
+gi.require_version("Gdk", "3.0")
+from gi.repository import Gtk, Gdk, GLib
+
+from tracing import TRACE
+
+# Focus moving from the window to one of its own popups passes through "nothing active"
+SUSPEND_DELAY = 250  # ms
+
+
+def widget_timeout(widget, ms, fn, *args):
+    """GLib.timeout_add that is removed if widget is destroyed before it fires."""
+    state = {}
+
+    def fire():
+        widget.disconnect(state["destroy_id"])
+        fn(*args)
+        return False
+
+    def cancel(w):
+        GLib.source_remove(state["source_id"])
+
+    state["source_id"] = GLib.timeout_add(ms, fire)
+    state["destroy_id"] = widget.connect("destroy", cancel)
+    return state["source_id"]
+
+
+class Scheduler:
+    """Runs a window's periodic jobs from one timer and pauses them while it is not in front.
+
+    Jobs registered with every() share a single once-a-second GLib timer
+    (timeout_add_seconds, which GLib also batches with other processes'
+    timers). When neither the window nor any other window of this process
+    is active, or the window is iconified, the timer is removed and
+    on_suspend() runs, so the launcher costs nothing while a game is
+    fullscreen. When the window comes back, on_resume() and every job run
+    straight away, and the timer starts again.
+    """
+
+    def __init__(self, window, on_suspend=None, on_resume=None):
+        self.window = window
+        self.on_suspend = on_suspend
+        self.on_resume = on_resume
+        self.jobs = []  # (period in seconds, fn)
+        self.active = True
+        self._ticks = 0
+        self._tick_id = None
+        self._check_id = None
+        self._iconified = False
+
+        window.connect("notify::is-active", self._on_focus_changed)
+        window.connect("window-state-event", self._on_window_state)
+
+    # ---------- Jobs ----------
+    def every(self, seconds, fn):
+        """Call fn() every `seconds` whole seconds while the window is in front."""
+        self.jobs.append((max(1, int(seconds)), fn))
+        if self.active:
+            self._start()
+
+    def _start(self):
+        if self._tick_id is None and self.jobs:
+            self._tick_id = GLib.timeout_add_seconds(1, self._tick)
+
+    def _stop(self):
+        if self._tick_id is not None:
+            GLib.source_remove(self._tick_id)
+            self._tick_id = None
+
+    def _tick(self):
+        self._ticks += 1
+        for period, fn in self.jobs:
+            if self._ticks % period == 0:
+                fn()
+        return True
+
+    # ---------- Front / back ----------
+    def _in_front(self):
+        if self._iconified:
+            return False
+        return any(w.is_active() for w in Gtk.Window.list_toplevels())
+
+    def _on_focus_changed(self, *args):
+        if self._in_front():
+            self._cancel_check()
+            self._set_active(True)
+        elif self._check_id is None:
+            self._check_id = GLib.timeout_add(SUSPEND_DELAY, self._check)
+
+    def _on_window_state(self, window, event):
+        hidden = Gdk.WindowState.ICONIFIED | Gdk.WindowState.WITHDRAWN
+        self._iconified = bool(event.new_window_state & hidden)
+        self._on_focus_changed()
+        return False
+
+    def _check(self):
+        self._check_id = None
+        self._set_active(self._in_front())
+        return False
+
+    def _cancel_check(self):
+        if self._check_id is not None:
+            GLib.source_remove(self._check_id)
+            self._check_id = None
+
+    def _set_active(self, active):
+        if active == self.active:
+            return
+        self.active = active
+        if active:
+            TRACE.info("scheduler", "resumed")
+            if self.on_resume:
+                self.on_resume()
+            for _period, fn in self.jobs:
+                fn()
+            self._start()
+        else:
+            TRACE.info("scheduler", "suspended")
+            self._stop()
+            if self.on_suspend:
+                self.on_suspend()
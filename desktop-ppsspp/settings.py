@@ -1,69 +1,27 @@
 #!/usr/bin/env python3
-# desktop.py — Launcher with WiFi selection, password prompt, focused window
+# settings.py — Settings page (WiFi selection, password prompt), hosted by desktop.py or standalone
 
 import gi
 gi.require_version("Gtk", "3.0")
-gi.require_version("GdkPixbuf", "2.0")
-from gi.repository import Gtk, Gdk, GdkPixbuf, GLib
-import psutil
+from gi.repository import Gtk, Gdk, GLib
 import os
-import time
-import subprocess
-import fcntl
-import threading
-from evdev import InputDevice, list_devices, ecodes
-import shutil
+from evdev import ecodes
 import sys
 
-# ---------- Styling (GTK CSS) ----------
-CSS = b"""
-window { background-color: #121212; }
-#bg { }
-.popup-dialog {
-    background: linear-gradient(145deg, rgba(155,155,155,0.85) 0%, rgba(120,120,120,0.70) 100%);
-    border-radius: 20px;
-    border: 1px solid rgba(255,255,255,0.12);
-    color: white;
-    font-size: 20px;
-    font-weight: bold;
-    padding: 25px;
-    min-width: 400px;
-    min-height: 100px;
-    box-shadow:
-        0 0 25px rgba(255,255,255,0.5),
-        inset 0 1px 10px rgba(255,255,255,0.45);
-}
-.app-button {
-  background: linear-gradient(145deg, rgba(255,255,255,0.55) 0%, rgba(220,220,220,0.40) 100%);
-  border-radius: 14px;
-  border: 1px solid rgba(255,255,255,0.12);
-  color: white;
-  font-weight: 600;
-  font-size: 20px;
-  min-width: 220px;
-  min-height: 220px;
-  padding: 12px;
-}
-.app-button:hover {
-  background-color: rgba(255,255,255,0.12);
-}
-.app-button.selected {
-  background: linear-gradient(145deg, rgba(255,255,255,0.75) 0%, rgba(220,220,220,0.50) 100%);
-  box-shadow:
-    inset 0 1px 8px rgba(255,255,255,0.45),
-    0 0 18px rgba(255,255,255,0.45);
-  color: white;
-}
-.app-label { color: white; margin-top: 8px; }
-#clock {
-  color: white;
-  background: linear-gradient(145deg, rgba(255,255,255,0.55) 0%, rgba(220,220,220,0.40) 100%);
-  padding: 6px 10px;
-  border-radius: 8px;
-  font-family: monospace;
-  font-size: 20px;
-}
-"""
+from boottrace import STARTUP
+from tracing import TRACE
+from theme import install_css
+from render import meter_frames
+from scheduler import Scheduler
+from gamepad import open_gamepad
+from navigation import StickNavigator
+from netmanager import wifi_model
+from updater import FINAL_STATES, spawn_updates
+from taskmanager import TaskManagerPage
+from catalogue import load_manifest
+from pixcache import PIXBUF_CACHE
+from carousel import TileCarousel, columns_for_width
+from sound import SOUND_ENGINE, play_sound
 
 # ---------- App definitions ----------
 APP_LIST = [
@@ -75,204 +33,120 @@ APP_LIST = [
     {"name": "Close", "cmd": [""], "icon": "prism.png"},
 ]
 
-# ---------- Launcher Window ----------
-class LauncherWindow(Gtk.Window):
-    def __init__(self):
-        super().__init__(title="Launcher")
-        self.set_decorated(False)
-        self.set_skip_taskbar_hint(True)
-        self.set_keep_above(True)
-        self.set_focus_on_map(True)
-
-        screen = self.get_screen()
-        monitor_num = screen.get_primary_monitor()
-        monitor = screen.get_monitor_geometry(monitor_num)
-        self.set_default_size(monitor.width, monitor.height)
-        self.move(monitor.x, monitor.y)
-
-        style = Gtk.CssProvider()
-        style.load_from_data(CSS)
-        Gtk.StyleContext.add_provider_for_screen(screen, style, Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION)
-
-        overlay = Gtk.Overlay()
-        self.add(overlay)
-        
-        self.connect("delete-event", Gtk.main_quit)
-
-        # Background
+# Progress text per updater state
+UPDATE_STATES = {
+    "checking": "Checking...",
+    "scanning": "Comparing",
+    "downloading": "Downloading",
+    "verifying": "Verifying...",
+    "updated": "Updated",
+    "current": "Up to date",
+    "unsupported": "No update info",
+    "failed": "Failed",
+}
+UPDATE_DONE = FINAL_STATES
+
+# ---------- Settings page ----------
+class SettingsPage(Gtk.Overlay):
+    """The settings screen as a widget.
+
+    desktop.py puts it in its Gtk.Stack and routes keys and gamepad events
+    to it, so CSS, pixbuf cache and input reader are shared with the
+    launcher. on_close is called for the "Close" tile. get_apps and
+    get_sessions tell the task manager which processes belong to which
+    tile (see TaskManagerPage); without them it uses the user manifest.
+    """
+
+    def __init__(self, width, height, on_close, get_apps=None, get_sessions=None):
+        super().__init__()
+        self.on_close = on_close
+        self.get_apps = get_apps or (lambda: load_manifest().get("apps") or [])
+        self.get_sessions = get_sessions
+        self.task_popup = None
+        self.task_page = None
+        self.suspended = False
+
+        # Background (decoded off the main thread; the dark window shows until then)
+        self.bg = Gtk.Image()
+        self.bg.set_name("bg")
+        self.add(self.bg)
         bg_path = os.path.join(os.path.dirname(__file__), "blue.png")
         if os.path.exists(bg_path):
-            try:
-                pb = GdkPixbuf.Pixbuf.new_from_file(bg_path)
-                scaled = pb.scale_simple(monitor.width, monitor.height, GdkPixbuf.InterpType.BILINEAR)
-                self.bg = Gtk.Image.new_from_pixbuf(scaled)
-                self.bg.set_name("bg")
-                overlay.add(self.bg)
-            except:
-                self.bg = None
-        else:
-            self.bg = None
+            self._set_image(self.bg, bg_path, width, height)
 
-        # Buttons container
-        self.button_box = Gtk.Box(spacing=30)
-        self.button_box.set_halign(Gtk.Align.CENTER)
-        self.button_box.set_valign(Gtk.Align.CENTER)
-        overlay.add_overlay(self.button_box)
+        # Tiles
+        self.carousel = TileCarousel(columns_for_width(width), on_activate=self.launch_app)
+        self.carousel.set_halign(Gtk.Align.CENTER)
+        self.carousel.set_valign(Gtk.Align.CENTER)
+        self.add_overlay(self.carousel)
+        self.carousel.set_apps(APP_LIST)
 
-        # Topbar
-        self.topbar_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
-        self.topbar_box.set_halign(Gtk.Align.FILL)
-        self.topbar_box.set_valign(Gtk.Align.START)
-        self.topbar_box.set_margin_top(16)
-        self.topbar_box.set_margin_start(16)
-        self.topbar_box.set_margin_end(16)
-        overlay.add_overlay(self.topbar_box)
+        # AppImage updates: name -> (state, fraction, detail); survives the popup
+        self.updates = {}
+        self.update_rows = None
 
-        self.topbar_box.pack_start(Gtk.Label(), True, True, 0)
-        self.clock = Gtk.Label(label="")
-        self.clock.set_name("clock")
-        self.topbar_box.pack_end(self.clock, False, False, 0)
-        GLib.timeout_add_seconds(1, self._tick_clock)
-        self._tick_clock()
-
-        # Create buttons
-        self.app_buttons = []
-        for app in APP_LIST:
-            btn = self._make_app_button(app)
-            self.app_buttons.append(btn)
-            self.button_box.pack_start(btn, False, False, 0)
-
-        # Selection
-        self.selected = None
-        self.selection_enabled = False
-        GLib.timeout_add(500, self._enable_selection_delay)
-
-        # Events
-        self.connect("key-press-event", self._on_key)
-
-        # Show and force focus
-        self.show_all()
-        self.present()
-        self.grab_focus()
-        GLib.timeout_add(200, self.force_focus)
-        
-        self.joystick = None
-        self._find_joystick()
-        self.joystick_last = 0
-        self.joystick_move_delay = 0.25
-        GLib.timeout_add(30, self._poll_joystick)
-
-    def force_focus(self):
-        self.present()
-        self.grab_focus()
-        return False
-
-    # ---------- Clock ----------
-    def _tick_clock(self):
-        import datetime
-        self.clock.set_text(datetime.datetime.now().strftime("%H:%M:%S"))
-        return True
+    def _set_image(self, img, path, width, height):
+        pb = PIXBUF_CACHE.load(path, width, height, img.set_from_pixbuf)
+        if pb is not None:
+            img.set_from_pixbuf(pb)
 
     # ---------- Selection ----------
-    def _apply_selection_styles(self):
-        for i, btn in enumerate(self.app_buttons):
-            ctx = btn.get_style_context()
-            if i == self.selected:
-                ctx.add_class("selected")
-            else:
-                ctx.remove_class("selected")
-
-    def _enable_selection_delay(self):
-        self.selection_enabled = True
-        if self.selected is None and self.app_buttons:
-            self._set_selection(0)
-        return False
-
-    def _set_selection(self, idx):
-        if not self.app_buttons:
-            self.selected = None
-            return
-        idx = idx % len(self.app_buttons)
-        self.selected = idx
-        self._apply_selection_styles()
+    def reset_selection(self):
+        self.carousel.select(0)
 
     def _move_selection(self, delta):
-        if self.selected is None:
-            if self.app_buttons:
-                self._set_selection(0)
-            return
-        self._set_selection(self.selected + delta)
+        self.carousel.move(delta)
 
     # ---------- Buttons ----------
-    def _make_app_button(self, app):
-        btn = Gtk.Button()
-        btn.get_style_context().add_class("app-button")
-        btn.set_can_focus(False)
-        btn.set_size_request(220, 220)
-
-        v = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
-        v.set_halign(Gtk.Align.CENTER)
-        v.set_valign(Gtk.Align.CENTER)
-
-        icon_path = os.path.join(os.path.dirname(__file__), app["icon"])
-        if os.path.exists(icon_path):
-            try:
-                pb = GdkPixbuf.Pixbuf.new_from_file(icon_path)
-                pb = pb.scale_simple(128, 128, GdkPixbuf.InterpType.BILINEAR)
-                img = Gtk.Image.new_from_pixbuf(pb)
-                v.pack_start(img, False, False, 0)
-            except:
-                pass
-
-        lbl = Gtk.Label(label=app["name"])
-        lbl.set_name("app-label")
-        v.pack_start(lbl, False, False, 0)
-
-        btn.add(v)
-        btn.connect("clicked", lambda w: self.launch_app(app))
-        return btn
-
     def launch_app(self, app):
         if app["name"] == "Internet Settings":
             self.show_internet_popup()
             return
+        if app["name"] == "Check for Update":
+            self.show_update_popup()
+            return
+        if app["name"] == "Launch Task Manager":
+            self.show_task_manager()
+            return
         if app["name"] == "Close":
-            Gtk.main_quit()
-            sys.exit()
+            self.on_close()
 
     # ---------- Key navigation ----------
-    def _on_key(self, widget, event):
-        if not self.selection_enabled:
-            return False
+    def on_key(self, event):
+        """Handle a key-press for the page. Returns True if it was used."""
         if event.keyval in (Gdk.KEY_Left, Gdk.KEY_h):
             self._move_selection(-1)
         elif event.keyval in (Gdk.KEY_Right, Gdk.KEY_l):
             self._move_selection(1)
         elif event.keyval in (Gdk.KEY_Return, Gdk.KEY_KP_Enter):
-            if self.selected is not None:
-                self.app_buttons[self.selected].emit("clicked")
+            self.carousel.activate()
+        elif event.keyval in (Gdk.KEY_Escape, Gdk.KEY_BackSpace):
+            self.on_close()
+        else:
+            return False
         return True
 
-    # ---------- Internet popup ----------
-    def show_internet_popup(self):
-        self.internet_popup = Gtk.Window(type=Gtk.WindowType.TOPLEVEL)
-        self.internet_popup.set_transient_for(self)
-        self.internet_popup.set_modal(True)
-        self.internet_popup.set_decorated(False)
-        self.internet_popup.set_keep_above(True)
-        self.internet_popup.set_app_paintable(True)
-
-        screen = self.internet_popup.get_screen()
+    # ---------- Popups ----------
+    def _build_popup(self, title_text):
+        """A modal, undecorated popup over the page; returns (window, content box)."""
+        popup = Gtk.Window(type=Gtk.WindowType.TOPLEVEL)
+        popup.set_transient_for(self.get_toplevel())
+        popup.set_modal(True)
+        popup.set_decorated(False)
+        popup.set_keep_above(True)
+        popup.set_app_paintable(True)
+
+        screen = popup.get_screen()
         visual = screen.get_rgba_visual()
         if visual and screen.is_composited():
-            self.internet_popup.set_visual(visual)
+            popup.set_visual(visual)
 
         # Block input to underlying window
-        self.internet_popup.set_type_hint(Gdk.WindowTypeHint.DIALOG)
+        popup.set_type_hint(Gdk.WindowTypeHint.DIALOG)
 
         box = Gtk.EventBox()
         box.get_style_context().add_class("popup-dialog")
-        self.internet_popup.add(box)
+        popup.add(box)
 
         vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=12)
         vbox.set_margin_top(16)
@@ -281,49 +155,211 @@ class LauncherWindow(Gtk.Window):
         vbox.set_margin_end(24)
         box.add(vbox)
 
-        title = Gtk.Label(label="Select WiFi Network")
+        title = Gtk.Label(label=title_text)
         title.set_name("app-label")
         vbox.pack_start(title, False, False, 0)
+        return popup, vbox
+
+    def _add_hint(self, vbox, text):
+        hint = Gtk.Label(label=text)
+        hint.set_name("app-label")
+        vbox.pack_end(hint, False, False, 0)
+
+    # ---------- Internet popup ----------
+    def show_internet_popup(self):
+        self.internet_popup, vbox = self._build_popup("Select WiFi Network")
 
         self.wifi_listbox = Gtk.ListBox()
         vbox.pack_start(self.wifi_listbox, True, True, 0)
-
-        hint = Gtk.Label(label="Use arrows + Enter. Esc to close.")
-        hint.set_name("app-label")
-        vbox.pack_start(hint, False, False, 0)
+        self._add_hint(vbox, "Use arrows + Enter. Esc to close.")
 
         self.internet_popup.show_all()
         self._center_popup(self.internet_popup)
 
-        threading.Thread(target=self._scan_wifi_networks, daemon=True).start()
         self.internet_popup.connect("key-press-event", self._on_internet_key)
+        self.internet_popup.connect("destroy", self._on_internet_popup_destroyed)
 
         self.internet_selected = 0
-        GLib.timeout_add(100, self._poll_internet_selection)
-
-    def _scan_wifi_networks(self):
-        try:
-            output = subprocess.check_output(["nmcli", "-t", "-f", "SSID", "device", "wifi", "list"], universal_newlines=True)
-            networks = [line.strip() for line in output.splitlines() if line.strip()]
-        except Exception as e:
-            networks = ["No networks"]
-        GLib.idle_add(self._populate_wifi_list, networks)
-
-    def _populate_wifi_list(self, networks):
+        # Whatever NetworkManager already reported shows at once; the scan updates it in place
+        self.wifi = wifi_model()
+        self._wifi_listener = None
+        if self.wifi:
+            self._wifi_listener = self.wifi.connect_changed(self._populate_wifi_list)
+            self.wifi.request_scan()
+        self._populate_wifi_list()
+
+    def _on_internet_popup_destroyed(self, popup):
+        if self._wifi_listener is not None:
+            self.wifi.disconnect_changed(self._wifi_listener)
+            self._wifi_listener = None
+        self.wifi_listbox = None
+
+    def _populate_wifi_list(self):
+        if self.wifi_listbox is None:
+            return
+        networks = self.wifi.networks() if self.wifi else []
+        children = self.wifi_listbox.get_children()
+        # Keep the same network selected as rows are added, removed and re-sorted
+        selected = children[self.internet_selected].network if self.internet_selected < len(children) else None
         self.wifi_listbox.foreach(lambda w: self.wifi_listbox.remove(w))
-        for ssid in networks:
-            lbl = Gtk.Label(label=ssid)
+        for net in networks:
+            text = f"{net.ssid}   {net.strength}%"
+            if net.security:
+                text += f"  {net.security}"
+            if net.active:
+                text += "  (connected)"
+            elif net.saved:
+                text += "  (saved)"
+            row = Gtk.ListBoxRow()
+            row.network = net
+            row.add(Gtk.Label(label=text))
+            self.wifi_listbox.add(row)
+        if not networks:
             row = Gtk.ListBoxRow()
-            row.add(lbl)
+            row.network = None
+            row.add(Gtk.Label(label="Searching..." if self.wifi else "No networks"))
             self.wifi_listbox.add(row)
+        ssids = [net.ssid for net in networks]
+        if selected is not None and selected.ssid in ssids:
+            self.internet_selected = ssids.index(selected.ssid)
+        else:
+            self.internet_selected = min(self.internet_selected, max(0, len(networks) - 1))
         self.wifi_listbox.show_all()
+        self._update_internet_selection()
+
+    # ---------- Update popup ----------
+    def show_update_popup(self):
+        self.update_popup, vbox = self._build_popup("Updates")
+        self.update_rows = {}
+        self._update_box = vbox
+        self._add_hint(vbox, "Updates continue in the background. Esc to close.")
+        self.update_popup.connect("key-press-event", self._on_update_key)
+        self.update_popup.connect("destroy", self._on_update_popup_destroyed)
+
+        running = any(state not in UPDATE_DONE for state, _f, _d in self.updates.values())
+        if not running:
+            self.updates = {}
+            # In a child process, so checksumming never holds this process's GIL
+            started = spawn_updates(self._on_update_progress)
+            if not started:
+                vbox.pack_start(Gtk.Label(label="No AppImages to update"), False, False, 0)
+        for name, (state, fraction, detail) in sorted(self.updates.items()):
+            self._show_update(name, state, fraction, detail)
+
+        self.update_popup.show_all()
+        self._center_popup(self.update_popup)
+
+    def _on_update_key(self, widget, event):
+        if event.keyval in (Gdk.KEY_Escape, Gdk.KEY_Return, Gdk.KEY_KP_Enter, Gdk.KEY_BackSpace):
+            self.update_popup.destroy()
+        return True
 
-    def _center_popup(self, popup):
+    def _on_update_popup_destroyed(self, popup):
+        self.update_rows = None
+
+    def _on_update_progress(self, name, state, fraction, detail):
+        self.updates[name] = (state, fraction, detail)
+        if state in ("updated", "failed"):
+            TRACE.info("update", "%s: %s %s", name, state, detail)
+        if state in UPDATE_DONE and all(s in UPDATE_DONE for s, _f, _d in self.updates.values()):
+            failed = any(s == "failed" for s, _f, _d in self.updates.values())
+            play_sound("error.mp3" if failed else "open.mp3")
+        if self.update_rows is not None:
+            self._show_update(name, state, fraction, detail)
+
+    def _show_update(self, name, state, fraction, detail):
+        row = self.update_rows.get(name)
+        if row is None:
+            label = Gtk.Label(label=name, xalign=0)
+            label.set_name("app-label")
+            bar = Gtk.ProgressBar(show_text=True)
+            row = self.update_rows[name] = (label, bar)
+            self._update_box.pack_start(label, False, False, 0)
+            self._update_box.pack_start(bar, False, False, 0)
+            label.show()
+            bar.show()
+        label, bar = row
+        text = UPDATE_STATES.get(state, state)
+        if detail:
+            text += f" ({detail})"
+        bar.set_text(text)
+        if fraction is None:
+            bar.pulse()
+        else:
+            bar.set_fraction(fraction)
+
+    # ---------- Task manager popup ----------
+    def show_task_manager(self):
+        self.task_popup, vbox = self._build_popup("Task Manager")
+        self.task_page = TaskManagerPage(self.get_apps, self.get_sessions)
+        if self.suspended:
+            self.task_page.suspend()
+        vbox.pack_start(self.task_page, True, True, 0)
+        self._add_hint(vbox, "Arrows to select. Delete / A: end app, K / Y: force quit. Esc / B: close.")
+        self.task_popup.connect("key-press-event", self._on_task_key)
+        self.task_popup.connect("destroy", self._on_task_popup_destroyed)
+        self.task_popup.show_all()
+        self._center_popup(self.task_popup, 720, 520)
+
+    def _on_task_key(self, widget, event):
+        if event.keyval in (Gdk.KEY_Up, Gdk.KEY_k):
+            self.task_page.move(-1)
+        elif event.keyval in (Gdk.KEY_Down, Gdk.KEY_j):
+            self.task_page.move(1)
+        elif event.keyval in (Gdk.KEY_Delete, Gdk.KEY_Return, Gdk.KEY_KP_Enter):
+            self._end_task(kill=False)
+        elif event.keyval == Gdk.KEY_K:
+            self._end_task(kill=True)
+        elif event.keyval in (Gdk.KEY_Escape, Gdk.KEY_BackSpace):
+            self.task_popup.destroy()
+        return True
+
+    def _on_task_popup_destroyed(self, popup):
+        # Destroying unmaps the page, which stops its sampling
+        self.task_popup = None
+        self.task_page = None
+
+    def _end_task(self, kill):
+        play_sound("quit.mp3" if self.task_page.end_selected(kill) else "error.mp3")
+
+    # ---------- Suspension ----------
+    def suspend(self):
+        """The launcher was suspended (a game is in front): stop background sampling."""
+        self.suspended = True
+        if self.task_page is not None:
+            self.task_page.suspend()
+
+    def resume(self):
+        self.suspended = False
+        if self.task_page is not None:
+            self.task_page.resume()
+
+    # ---------- Controller routing for popups ----------
+    def popup_move(self, dx, dy):
+        """Stick motion for an open popup that takes the controller; False if none does."""
+        if self.task_page is None:
+            return False
+        self.task_page.move(dy or dx)
+        return True
+
+    def popup_button(self, code):
+        """A button press for an open popup that takes the controller; False if none does."""
+        if self.task_page is None:
+            return False
+        if code == ecodes.BTN_SOUTH:
+            self._end_task(kill=False)
+        elif code in (ecodes.BTN_WEST, ecodes.BTN_NORTH):
+            self._end_task(kill=True)
+        elif code == ecodes.BTN_EAST:
+            self.task_popup.destroy()
+        return True
+
+    def _center_popup(self, popup, width=400, height=300):
         screen = self.get_screen()
         monitor = screen.get_monitor_geometry(screen.get_primary_monitor())
-        popup.set_size_request(400, 300)
-        x = monitor.x + (monitor.width - 400)//2
-        y = monitor.y + (monitor.height - 300)//2
+        popup.set_size_request(width, height)
+        x = monitor.x + (monitor.width - width)//2
+        y = monitor.y + (monitor.height - height)//2
         popup.move(x, y)
 
     def _on_internet_key(self, widget, event):
@@ -335,11 +371,14 @@ class LauncherWindow(Gtk.Window):
                 self.internet_selected = len(self.wifi_listbox.get_children()) -1
         elif event.keyval in (Gdk.KEY_Return, Gdk.KEY_KP_Enter):
             self._prompt_password()
+            return True
         elif event.keyval == Gdk.KEY_Escape:
             self.internet_popup.destroy()
+            return True
+        self._update_internet_selection()
         return True
 
-    def _poll_internet_selection(self):
+    def _update_internet_selection(self):
         children = self.wifi_listbox.get_children()
         for i, row in enumerate(children):
             ctx = row.get_style_context()
@@ -347,14 +386,20 @@ class LauncherWindow(Gtk.Window):
                 ctx.add_class("selected")
             else:
                 ctx.remove_class("selected")
-        return True
 
     def _prompt_password(self):
         children = self.wifi_listbox.get_children()
         if not children:
             return
-        row = children[self.internet_selected]
-        ssid = row.get_child().get_text()
+        network = children[self.internet_selected].network
+        if network is None:
+            return
+        if not self.wifi.needs_password(network):
+            # Open network, or a saved profile that already has the secret
+            self.wifi.connect(network, on_done=self._on_wifi_connected)
+            self.internet_popup.destroy()
+            return
+        ssid = network.ssid
 
         password_dialog = Gtk.Dialog(title=f"Password for {ssid}", parent=self.internet_popup, flags=Gtk.DialogFlags.MODAL)
         password_dialog.set_default_size(400, 100)
@@ -369,110 +414,154 @@ class LauncherWindow(Gtk.Window):
 
         response = password_dialog.run()
         if response == Gtk.ResponseType.OK:
-            pwd = entry.get_text()
-            threading.Thread(target=self._connect_wifi, args=(ssid, pwd), daemon=True).start()
+            self.wifi.connect(network, entry.get_text(), on_done=self._on_wifi_connected)
         password_dialog.destroy()
         self.internet_popup.destroy()
 
-    def _connect_wifi(self, ssid, password):
-        try:
-            subprocess.run(["nmcli", "device", "wifi", "connect", ssid, "password", password])
-            play_sound("open.mp3")
-        except Exception as e:
-            print("Failed to connect:", e)
-            play_sound("error.mp3")
-            
-            
-    def _find_joystick(self):
-        from evdev import ecodes
+    def _on_wifi_connected(self, ok, error):
+        play_sound("open.mp3" if ok else "error.mp3")
+
+
+# ---------- Standalone window ----------
+class SettingsWindow(Gtk.Window):
+    def __init__(self):
+        super().__init__(title="Launcher")
+        self.set_decorated(False)
+        self.set_skip_taskbar_hint(True)
+        self.set_keep_above(True)
+        self.set_focus_on_map(True)
 
-        for dev_path in list_devices():
-            dev = InputDevice(dev_path)
-            caps = dev.capabilities()
-            
-            # Debug: print capabilities for each device
-            print(f"Checking device: {dev.name} ({dev.path})")
-            print(f"Capabilities: {caps.keys()}")
+        screen = self.get_screen()
+        monitor_num = screen.get_primary_monitor()
+        monitor = screen.get_monitor_geometry(monitor_num)
+        self.set_default_size(monitor.width, monitor.height)
+        self.move(monitor.x, monitor.y)
 
-            # Look for ABS axes (analog stick) and BTN keys (buttons)
-            has_axes = any(code in [ecodes.ABS_X, ecodes.ABS_Y] for code, _ in caps.get(ecodes.EV_ABS, []))
-            has_buttons = ecodes.EV_KEY in caps
+        install_css(screen)
 
-            if has_axes or has_buttons:
-                self.joystick = dev
-                fcntl.fcntl(dev.fd, fcntl.F_SETFL, os.O_NONBLOCK)
-                print("Joystick/gamepad found:", dev.name, dev.path)
-                break
+        overlay = Gtk.Overlay()
+        self.add(overlay)
+        
+        self.connect("delete-event", Gtk.main_quit)
 
-        if not self.joystick:
-            print("No joystick/gamepad detected")
+        self.page = SettingsPage(monitor.width, monitor.height, on_close=self._quit)
+        overlay.add(self.page)
 
+        # Topbar
+        self.topbar_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
+        self.topbar_box.set_halign(Gtk.Align.FILL)
+        self.topbar_box.set_valign(Gtk.Align.START)
+        self.topbar_box.set_margin_top(16)
+        self.topbar_box.set_margin_start(16)
+        self.topbar_box.set_margin_end(16)
+        overlay.add_overlay(self.topbar_box)
 
-    def _poll_joystick(self):
-        if not self.joystick or not self.selection_enabled:
-            return True
+        self.topbar_box.pack_start(Gtk.Label(), True, True, 0)
+        self.clock = Gtk.Label(label="")
+        self.clock.set_name("clock")
+        self.topbar_box.pack_end(self.clock, False, False, 0)
+        self.scheduler = Scheduler(self, on_suspend=self._on_suspend, on_resume=self._on_resume)
+        self.scheduler.every(1, self._tick_clock)
+        self._tick_clock()
+
+        # Selection
+        self.selection_enabled = False
+        GLib.timeout_add(500, self._enable_selection_delay)
+
+        # Events
+        self.connect("key-press-event", self._on_key)
+        meter_frames(self)
+        self._first_draw_id = self.connect_after("draw", self._on_first_draw)
+
+        # Show and force focus
+        self.show_all()
+        self.present()
+        self.grab_focus()
+        GLib.timeout_add(200, self.force_focus)
+        
+        self.nav = StickNavigator(self._move_selection)
+        self.gamepad = open_gamepad(self._on_joystick_event, on_attach=self.nav.calibrate)
+        self._find_joystick()
+
+    def _on_first_draw(self, widget, cr):
+        self.disconnect(self._first_draw_id)
+        STARTUP.frame()
+        GLib.idle_add(self._dump_startup, priority=GLib.PRIORITY_LOW)
+        return False
+
+    def _dump_startup(self):
+        STARTUP.dump()
+        return False
+
+    def force_focus(self):
+        self.present()
+        self.grab_focus()
+        return False
+
+    def _quit(self):
+        Gtk.main_quit()
+        sys.exit()
+
+    # ---------- Suspension ----------
+    def _on_suspend(self):
+        self.nav.reset()
+        self.gamepad.pause()
+        self.page.suspend()
 
-        try:
-            while True:
-                e = self.joystick.read_one()
-                if e is None:
-                    break
-
-                # Debug: print all events
-                print(f"Joystick event: type={e.type}, code={e.code}, value={e.value}")
-
-                if e.type == ecodes.EV_ABS:
-                    now = time.time()
-                    if now - self.joystick_last < self.joystick_move_delay:
-                        continue
-
-                    if e.code == ecodes.ABS_X:
-                        if e.value < -1000:
-                            print("Move left detected")
-                            self._move_selection(-1)
-                            self.joystick_last = now
-                        elif e.value > 1000:
-                            print("Move right detected")
-                            self._move_selection(1)
-                            self.joystick_last = now
-
-                    elif e.code == ecodes.ABS_Y:
-                        if e.value < -1000:
-                            print("Move up detected")
-                            self._move_selection(-1)
-                            self.joystick_last = now
-                        elif e.value > 1000:
-                            print("Move down detected")
-                            self._move_selection(1)
-                            self.joystick_last = now
-
-                elif e.type == ecodes.EV_KEY and e.value == 1:  # button press
-                    if e.code == ecodes.BTN_SOUTH:
-                        print("Button A pressed")
-                        if self.selected is not None:
-                            self.app_buttons[self.selected].clicked()
-                            self.joystick_last = now
-                    elif e.code == ecodes.BTN_EAST:
-                        print("Button X pressed")
-                        if self.selected is not None:
-                            self.app_buttons[self.selected].clicked()
-                            self.joystick_last = now
-
-        except BlockingIOError:
-            pass
-        except Exception as exc:
-            print("Joystick error:", exc)
+    def _on_resume(self):
+        self.gamepad.resume()
+        self.page.resume()
 
+    # ---------- Clock ----------
+    def _tick_clock(self):
+        import datetime
+        self.clock.set_text(datetime.datetime.now().strftime("%H:%M:%S"))
         return True
-def play_sound(file_path):
-    """Play a WAV or MP3 file asynchronously."""
-    if shutil.which("mpg123") and file_path.endswith(".mp3"):
-        subprocess.Popen(["mpg123", file_path])
-    elif shutil.which("aplay") and file_path.endswith(".wav"):
-        subprocess.Popen(["aplay", file_path])
-    else:
-        print("No suitable audio player found")
+
+    # ---------- Selection ----------
+    def _enable_selection_delay(self):
+        self.selection_enabled = True
+        if self.page.carousel.selected is None:
+            self.page.reset_selection()
+        return False
+
+    def _move_selection(self, dx, dy=0, repeat=False):
+        if self.page.popup_move(dx, dy):
+            return True
+        return self.page.carousel.move(dx, dy, wrap=not repeat)
+
+    # ---------- Key navigation ----------
+    def _on_key(self, widget, event):
+        if not self.selection_enabled:
+            return False
+        self.page.on_key(event)
+        return True
+
+    # ---------- Joystick ----------
+    def _find_joystick(self):
+        return self.gamepad.find()
+
+    @TRACE.timed("input.joystick")
+    def _on_joystick_event(self, e):
+        TRACE.debug("input", "joystick type=%d code=%d value=%d", e.type, e.code, e.value)
+        if not self.selection_enabled:
+            return
+
+        if self.nav.feed(e):
+            return
+        if e.type == ecodes.EV_KEY and e.value == 1:  # button press
+            if self.page.popup_button(e.code):
+                return
+            if e.code == ecodes.BTN_SOUTH:
+                TRACE.debug("input", "button A")
+                self.page.carousel.activate()
+            elif e.code == ecodes.BTN_EAST:
+                TRACE.debug("input", "button X")
+                self.page.carousel.activate()
+
 # ---------- Run ----------
 if __name__ == "__main__":
-    win = LauncherWindow()
+    TRACE.serve("settings")
+    SOUND_ENGINE.preload()
+    win = SettingsWindow()
     Gtk.main()
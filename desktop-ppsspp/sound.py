@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# sound.py — in-process sound engine: decode once, mix into one output stream
+
+import os
+import threading
+
+from paths import asset
+
+SOUNDS = ["start.mp3", "open.mp3", "error.mp3", "quit.mp3", "start.wav"]
+
+
+class NullSink:
+    """Used when there is no audio device (or no audio libraries); drops everything."""
+
+    rate = 48000
+
+    def __init__(self):
+        self.played = []
+
+    def play(self, name, pcm):
+        self.played.append(name)
+
+    def close(self):
+        pass
+
+
+class StreamSink:
+    """One PortAudio output stream that mixes every sound currently playing.
+
+    The stream object lives for the whole session but is only running
+    while something is audible, so an idle launcher keeps the device (and
+    the CPU) asleep.
+    """
+
+    def __init__(self):
+        import numpy as np
+        import sounddevice as sd
+
+        self._np = np
+        self.rate = int(sd.query_devices(kind="output")["default_samplerate"])
+        self._voices = []  # [pcm, position]
+        self._draining = False
+        self._lock = threading.Lock()
+        self.stream = sd.OutputStream(
+            samplerate=self.rate, channels=2, dtype="float32",
+            latency="low", callback=self._callback)
+        self._stop_exc = sd.CallbackStop
+
+    def play(self, name, pcm):
+        with self._lock:
+            self._voices.append([pcm, 0])
+            restart = self._draining or not self.stream.active
+            self._draining = False
+        if restart:
+            self.stream.stop()
+            self.stream.start()
+
+    def _callback(self, outdata, frames, time_info, status):
+        outdata.fill(0)
+        with self._lock:
+            if not self._voices:
+                self._draining = True
+                raise self._stop_exc
+            for voice in self._voices:
+                pcm, pos = voice
+                chunk = pcm[pos:pos + frames]
+                outdata[:len(chunk)] += chunk
+                voice[1] = pos + frames
+            self._voices = [v for v in self._voices if v[1] < len(v[0])]
+        self._np.clip(outdata, -1.0, 1.0, out=outdata)
+
+    def close(self):
+        self.stream.close()
+
+
+class SoundEngine:
+    """Decodes the launcher's sounds into PCM once and plays them without forking."""
+
+    def __init__(self, names=SOUNDS):
+        self.names = names
+        self._pcm = {}
+        self._lock = threading.Lock()
+        self._sink = None
+        self._sink_lock = threading.Lock()
+
+    @property
+    def sink(self):
+        # Opened on first use, so importing this module (before the launcher's
+        # first frame) does not query PortAudio or open a stream
+        with self._sink_lock:
+            if self._sink is None:
+                try:
+                    self._sink = StreamSink()
+                except Exception as e:  # missing numpy/sounddevice, or no output device
+                    print("No audio output, sounds disabled:", e)
+                    self._sink = NullSink()
+            return self._sink
+
+    def preload(self):
+        """Decode every known sound on a background thread."""
+        threading.Thread(target=self._preload, daemon=True).start()
+
+    def _preload(self):
+        for name in self.names:
+            self._get(name)
+
+    def _get(self, name):
+        with self._lock:
+            if name in self._pcm:
+                return self._pcm[name]
+        # Decoded unlocked, so play() never waits on preload() decoding another
+        # sound; a sound both ask for at once is decoded twice and one copy kept
+        pcm = self._decode(asset(name))
+        with self._lock:
+            return self._pcm.setdefault(name, pcm)
+
+    def _decode(self, path):
+        if not os.path.exists(path):
+            return None
+        try:
+            import numpy as np
+            import soundfile
+            data, rate = soundfile.read(path, dtype="float32", always_2d=True)
+        except Exception as e:
+            print("sound decode failed:", path, e)
+            return None
+
+        # Always stereo at the stream's rate, so mixing is a plain add
+        if data.shape[1] == 1:
+            data = np.repeat(data, 2, axis=1)
+        data = data[:, :2]
+        if rate != self.sink.rate:
+            n = int(len(data) * self.sink.rate / rate)
+            src = np.linspace(0, len(data) - 1, n)
+            idx = np.arange(len(data))
+            data = np.stack([np.interp(src, idx, data[:, c]) for c in range(2)], axis=1)
+        return np.ascontiguousarray(data, dtype=np.float32)
+
+    def play(self, name):
+        pcm = self._get(name)
+        if pcm is None and not isinstance(self.sink, NullSink):
+            print("sound not available:", name)
+            return
+        self.sink.play(name, pcm)
+
+
+SOUND_ENGINE = SoundEngine()
+
+
+def play_sound(file_path):
+    """Play one of the launcher sounds (by file name) without blocking."""
+    SOUND_ENGINE.play(os.path.basename(file_path))
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# steamlib.py — installed Steam games from libraryfolders.vdf / appmanifest_*.acf
+
+import os
+import re
+import json
+
+from paths import cache_dir
+
+STEAM_ROOTS = [
+    "~/.local/share/Steam",
+    "~/.steam/steam",
+    "~/.steam/debian-installation",
+]
+INDEX_VERSION = 1
+STATE_FULLY_INSTALLED = 4
+# Runtimes and tools Steam installs as "apps"
+TOOL_APPIDS = {"228980", "1070560", "1391110", "1628350", "1493710"}
+TOOL_PREFIXES = ("Proton", "Steam Linux Runtime", "Steamworks Common")
+
+_TOKEN = re.compile(r'"((?:[^"\\]|\\.)*)"|([{}])|//[^\n]*|(\S+)')
+_ESCAPES = {"n": "\n", "t": "\t", "\\": "\\", '"': '"'}
+
+
+def parse_vdf(text):
+    """Parse Valve's text KeyValues format into nested dicts (keys as written)."""
+    root = {}
+    stack = [root]
+    key = None
+    for m in _TOKEN.finditer(text):
+        quoted, brace, bare = m.groups()
+        if brace == "{":
+            child = {}
+            stack[-1][key] = child
+            stack.append(child)
+            key = None
+        elif brace == "}":
+            if len(stack) > 1:
+                stack.pop()
+            key = None
+        elif quoted is not None or bare is not None:
+            if bare is not None and bare.startswith("["):
+                continue  # conditional like [$WIN32]
+            value = re.sub(r"\\(.)", lambda e: _ESCAPES.get(e.group(1), e.group(1)), quoted) \
+                if quoted is not None else bare
+            if key is None:
+                key = value
+            else:
+                stack[-1][key] = value
+                key = None
+    return root
+
+
+def _lower_keys(d):
+    return {k.lower(): v for k, v in d.items()}
+
+
+def find_steam_root():
+    for root in STEAM_ROOTS:
+        root = os.path.expanduser(root)
+        if os.path.isfile(os.path.join(root, "steamapps", "libraryfolders.vdf")):
+            return os.path.realpath(root)
+    return None
+
+
+def library_folders(root):
+    """steamapps directories of every library folder, main one first."""
+    main = os.path.join(root, "steamapps")
+    folders = [main]
+    try:
+        with open(os.path.join(main, "libraryfolders.vdf"), encoding="utf-8", errors="replace") as f:
+            data = _lower_keys(parse_vdf(f.read()))
+    except OSError:
+        return folders
+    for key, value in _lower_keys(data.get("libraryfolders", {})).items():
+        if not key.isdigit():
+            continue
+        # New format: "0" { "path" "..." }; old format: "1" "/path"
+        path = _lower_keys(value).get("path") if isinstance(value, dict) else value
+        if path:
+            steamapps = os.path.realpath(os.path.join(path, "steamapps"))
+            if steamapps not in folders and os.path.isdir(steamapps):
+                folders.append(steamapps)
+    return folders
+
+
+def parse_manifest(path):
+    """{"appid", "name", "installed"} from one appmanifest_*.acf, or None."""
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            state = _lower_keys(_lower_keys(parse_vdf(f.read())).get("appstate", {}))
+    except OSError:
+        return None
+    appid = state.get("appid")
+    if not appid:
+        return None
+    try:
+        flags = int(state.get("stateflags", "0"))
+    except ValueError:
+        flags = 0
+    return {
+        "appid": appid,
+        "name": state.get("name") or f"App {appid}",
+        "installed": bool(flags & STATE_FULLY_INSTALLED),
+    }
+
+
+def find_icon(root, appid):
+    cache = os.path.join(root, "appcache", "librarycache")
+    for name in (f"{appid}_icon.jpg", f"{appid}_library_600x900.jpg", f"{appid}_header.jpg"):
+        path = os.path.join(cache, name)
+        if os.path.isfile(path):
+            return path
+    # Newer clients keep per-app folders of hashed file names
+    folder = os.path.join(cache, appid)
+    if os.path.isdir(folder):
+        for name in ("library_600x900.jpg", "header.jpg"):
+            if os.path.isfile(os.path.join(folder, name)):
+                return os.path.join(folder, name)
+        jpgs = sorted(n for n in os.listdir(folder) if n.endswith(".jpg"))
+        if jpgs:
+            return os.path.join(folder, jpgs[0])
+    return ""
+
+
+class SteamLibrary:
+    """Persisted index of installed Steam apps, kept current through inotify.
+
+    Each appmanifest is re-parsed only when its mtime changes, and
+    libraryfolders.vdf is re-read only when it changes, at which point
+    added or removed library folders are (un)watched.
+    """
+
+    def __init__(self, on_change=None):
+        self.on_change = on_change
+        self.root = find_steam_root()
+        self.index_path = os.path.join(cache_dir(), "steam-index.json")
+        self.entries = {}  # appmanifest path -> record (with "mtime")
+        self.folders = []
+        self._monitors = {}
+        self._save_id = None
+
+        self._load_index()
+        if self.root:
+            self.folders = library_folders(self.root)
+            if self._refresh():
+                self._save()
+
+    # ---------- Index persistence ----------
+    def _load_index(self):
+        try:
+            with open(self.index_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == INDEX_VERSION:
+            self.entries = data.get("entries", {})
+
+    def _save(self):
+        self._save_id = None
+        tmp = self.index_path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump({"version": INDEX_VERSION, "entries": self.entries}, f)
+            os.replace(tmp, self.index_path)
+        except OSError as e:
+            print("steam index write failed:", e)
+        return False
+
+    # ---------- Scanning ----------
+    def _refresh(self):
+        """Re-parse changed manifests in every folder. Returns True if the index changed."""
+        changed = False
+        seen = set()
+        for folder in self.folders:
+            try:
+                names = os.listdir(folder)
+            except OSError:
+                continue
+            for name in names:
+                if name.startswith("appmanifest_") and name.endswith(".acf"):
+                    path = os.path.join(folder, name)
+                    seen.add(path)
+                    changed |= self._update_manifest(path)
+        for path in [p for p in self.entries if p not in seen]:
+            del self.entries[path]
+            changed = True
+        return changed
+
+    def _update_manifest(self, path):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return self.entries.pop(path, None) is not None
+        old = self.entries.get(path)
+        if old and old.get("mtime") == mtime:
+            return False
+        record = parse_manifest(path) or {"appid": None}
+        record["mtime"] = mtime
+        self.entries[path] = record
+        return True
+
+    # ---------- inotify ----------
+    def watch(self):
+        from gi.repository import Gio
+
+        for folder in self.folders:
+            if folder in self._monitors:
+                continue
+            mon = Gio.File.new_for_path(folder).monitor_directory(Gio.FileMonitorFlags.WATCH_MOVES, None)
+            mon.connect("changed", self._on_folder_changed)
+            self._monitors[folder] = mon
+        for folder in [f for f in self._monitors if f not in self.folders]:
+            self._monitors.pop(folder).cancel()
+
+    def _on_folder_changed(self, monitor, file, other, event):
+        from gi.repository import GLib
+
+        changed = False
+        for f in (file, other):
+            if f is None:
+                continue
+            name = os.path.basename(f.get_path())
+            if name == "libraryfolders.vdf":
+                folders = library_folders(self.root)
+                if folders != self.folders:
+                    self.folders = folders
+                    self.watch()
+                    changed |= self._refresh()
+            elif name.startswith("appmanifest_") and name.endswith(".acf"):
+                changed |= self._update_manifest(f.get_path())
+        if not changed:
+            return
+        if self._save_id is None:
+            self._save_id = GLib.timeout_add_seconds(2, self._save)
+        if self.on_change:
+            self.on_change()
+
+    # ---------- Tiles ----------
+    def games(self):
+        games = {}
+        for rec in self.entries.values():
+            appid = rec.get("appid")
+            if not appid or not rec.get("installed") or appid in TOOL_APPIDS:
+                continue
+            if rec["name"].startswith(TOOL_PREFIXES):
+                continue
+            games[appid] = rec
+        return sorted(games.values(), key=lambda r: r["name"].lower())
+
+    def tiles(self):
+        """APP_LIST-style entries that start each game through the Steam client."""
+        return [{"name": g["name"], "cmd": ["steam", "-applaunch", g["appid"]],
+                 "icon": find_icon(self.root, g["appid"]) or "steam.png", "focus_class": False}
+                for g in self.games()]
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# supervisor.py — tracks, reaps and reports on apps started by the launcher
+
+import os
+import time
+import ctypes
+import subprocess
+import psutil
+from gi.repository import GLib
+
+PR_SET_CHILD_SUBREAPER = 36
+
+
+def _become_subreaper():
+    """Have orphaned app processes re-parented to us instead of init.
+
+    Launch wrappers such as the steam script fork the real client and exit;
+    as a subreaper we still see (and reap) what they leave behind.
+    """
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.prctl(PR_SET_CHILD_SUBREAPER, 1, 0, 0, 0)
+    except (OSError, AttributeError) as e:
+        print("subreaper unavailable:", e)
+
+
+class AppProcess:
+    """One launch of an APP_LIST entry and everything it spawned.
+
+    Apps are started in their own session, so the session id (the pid of
+    the first process) identifies the tree even after intermediate
+    processes have exited.
+    """
+
+    def __init__(self, app, proc):
+        self.app = app
+        self.name = app["name"]
+        self.proc = proc
+        self.pid = proc.pid
+        self.started = time.time()
+        self.exit_code = None
+        self.ended = False  # set once the whole tree is gone
+        self.warm = False   # started in the background, not yet used
+        self._root = psutil.Process(proc.pid)
+
+    @property
+    def exited(self):
+        return self.exit_code is not None
+
+    @property
+    def running(self):
+        """True while any process of the tree is alive."""
+        return bool(self.pids())
+
+    def pids(self):
+        """Live pids of the app, root first."""
+        procs = self.processes()
+        return [p.pid for p in procs]
+
+    def processes(self):
+        procs = []
+        if not self.exited:
+            try:
+                procs.append(self._root)
+                procs.extend(self._root.children(recursive=True))
+            except psutil.NoSuchProcess:
+                procs = []
+        # Orphans adopted by the launcher keep our session id
+        for child in psutil.Process().children():
+            if child.pid == self.pid or any(p.pid == child.pid for p in procs):
+                continue
+            try:
+                if os.getsid(child.pid) == self.pid:
+                    procs.append(child)
+                    procs.extend(child.children(recursive=True))
+            except (OSError, psutil.NoSuchProcess):
+                pass
+        return procs
+
+    def rss(self):
+        """Resident memory of the whole tree, in bytes."""
+        total = 0
+        for p in self.processes():
+            try:
+                total += p.memory_info().rss
+            except psutil.NoSuchProcess:
+                pass
+        return total
+
+    def state(self):
+        return {
+            "name": self.name,
+            "pid": self.pid,
+            "running": self.running,
+            "exited": self.exited,
+            "exit_code": self.exit_code,
+            "rss": self.rss(),
+        }
+
+
+class Supervisor:
+    """Starts APP_LIST commands and reaps them from GLib child watches."""
+
+    def __init__(self):
+        self.apps = {}           # app name -> [AppProcess, ...], oldest first
+        self.exit_handlers = []  # called with the AppProcess once its whole tree is gone
+        self._watched = set()
+        _become_subreaper()
+
+    def launch(self, app, cmd=None):
+        proc = subprocess.Popen(cmd or app["cmd"], start_new_session=True)
+        entry = AppProcess(app, proc)
+        entries = [e for e in self.apps.get(entry.name, []) if not e.ended]
+        entries.append(entry)
+        self.apps[entry.name] = entries
+        self._watch(proc.pid, entry)
+        self.sweep()
+        return entry
+
+    def get(self, name):
+        """Most recent launch of an app that is still running, else the most recent one."""
+        entries = self.apps.get(name, [])
+        for entry in reversed(entries):
+            if entry.running:
+                return entry
+        return entries[-1] if entries else None
+
+    def running_entries(self, name):
+        return [e for e in self.apps.get(name, []) if e.running]
+
+    def running(self, name):
+        return bool(self.running_entries(name))
+
+    def states(self):
+        return [e.state() for entries in self.apps.values() for e in entries]
+
+    def sweep(self):
+        """Put a child watch on adopted orphans so they are reaped too.
+
+        Only processes in another session are touched; anything sharing our
+        session was started by our own code, which waits for it itself.
+        """
+        own_sid = os.getsid(0)
+        for child in psutil.Process().children():
+            if child.pid in self._watched:
+                continue
+            try:
+                sid = os.getsid(child.pid)
+            except OSError:
+                continue
+            if sid != own_sid:
+                self._watch(child.pid, self._entry_for_session(sid))
+
+    def _entry_for_session(self, sid):
+        for entries in self.apps.values():
+            for entry in entries:
+                if entry.pid == sid:
+                    return entry
+        return None
+
+    def _watch(self, pid, entry):
+        self._watched.add(pid)
+        GLib.child_watch_add(GLib.PRIORITY_DEFAULT, pid, self._on_child_exit, entry)
+
+    def _on_child_exit(self, pid, status, entry):
+        self._watched.discard(pid)
+        self.sweep()
+        if entry is None:
+            return
+
+        if pid == entry.pid:
+            code = os.waitstatus_to_exitcode(status)
+            entry.exit_code = code
+            entry.proc.returncode = code
+            print(f"{entry.name} exited with {code}")
+
+        # The last process of a tree is always one of our direct children
+        if not entry.ended and not entry.running:
+            entry.ended = True
+            for handler in self.exit_handlers:
+                handler(entry)
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# taskmanager.py — per-app CPU, memory and I/O, with terminate/kill, for the settings page
+
+import os
+from collections import namedtuple
+
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk, GLib
+import psutil
+
+from tracing import TRACE
+
+INTERVAL = 2       # seconds between samples while the page is visible and the launcher awake
+MAX_ROWS = 12
+KTHREADD = 2       # parent of every kernel thread; those are left out
+
+Group = namedtuple("Group", "key name pids cpu rss io is_app killable")
+
+
+class ProcessSampler:
+    """CPU, RSS and I/O rate of every process, sampled from long-lived psutil.Process objects.
+
+    A Process is created once per pid and kept between samples, so
+    cpu_percent() measures since the previous tick without sleeping and
+    the name and command line are read only once. Each tick reads every
+    process's /proc files once, inside oneshot().
+    """
+
+    def __init__(self):
+        self.procs = {}  # pid -> Process
+        self.info = {}   # pid -> {"cmd0", "name", "ppid", "sid", "cpu", "rss", "io", "io_rate"}
+        self.last = None
+
+    def sample(self, now):
+        dt = now - self.last if self.last else None
+        self.last = now
+        pids = set(psutil.pids())
+        for pid in set(self.procs) - pids:
+            del self.procs[pid]
+            self.info.pop(pid, None)
+        for pid in pids - set(self.procs):
+            try:
+                p = psutil.Process(pid)
+                cmdline = p.cmdline()
+                self.info[pid] = {"cmd0": cmdline[0] if cmdline else "", "name": p.name(), "io": None}
+                self.procs[pid] = p
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                pass
+
+        for pid, p in list(self.procs.items()):
+            info = self.info[pid]
+            try:
+                with p.oneshot():
+                    info["ppid"] = p.ppid()
+                    info["cpu"] = p.cpu_percent(None)
+                    info["rss"] = p.memory_info().rss
+                    try:
+                        c = p.io_counters()
+                        io = c.read_bytes + c.write_bytes
+                    except (psutil.AccessDenied, AttributeError):
+                        io = None
+                info["sid"] = os.getsid(pid)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess, ProcessLookupError):
+                del self.procs[pid]
+                del self.info[pid]
+                continue
+            info["io_rate"] = (io - info["io"]) / dt if dt and io is not None and info["io"] is not None else 0
+            info["io"] = io
+
+    # ---------- Grouping ----------
+    def groups(self, apps, sessions=None):
+        """Processes summed per process tree: one group per APP_LIST entry, one per other tree.
+
+        A process belongs to an app when it or an ancestor was started from
+        the app's command, or when it is in the session of a launch the
+        supervisor made (sessions maps a session id to an app name).
+        Anything else is grouped under its topmost ancestor below init and
+        is never killable.
+        """
+        roots = {}
+        for app in apps:
+            cmd = app.get("cmd") or [""]
+            if cmd[0]:
+                roots.setdefault(cmd[0], app["name"])
+                roots.setdefault(os.path.basename(cmd[0]), app["name"])
+        sessions = sessions or {}
+        owners = {}
+
+        def owner(pid):
+            if pid in owners:
+                return owners[pid]
+            owners[pid] = None  # guards against a ppid loop while the tree changes
+            info = self.info.get(pid)
+            if info is None or "ppid" not in info:
+                return None
+            cmd0 = info["cmd0"]
+            if cmd0 in roots or os.path.basename(cmd0) in roots:
+                key = ("app", roots.get(cmd0) or roots[os.path.basename(cmd0)])
+            elif info.get("sid") in sessions:
+                key = ("app", sessions[info["sid"]])
+            elif info["ppid"] in self.info and info["ppid"] > 1:
+                key = owner(info["ppid"])
+            else:
+                key = ("tree", pid)
+            owners[pid] = key
+            return key
+
+        # Only launcher tiles and supervised launches may be ended; everything else
+        # (session bus, audio, X, the input router) is listed read-only
+        me = os.getpid()
+        mine = {me} | {p.pid for p in self.procs[me].parents()} if me in self.procs else {me}
+        totals = {}
+        for pid, info in self.info.items():
+            if pid == KTHREADD or info.get("ppid") == KTHREADD or "ppid" not in info:
+                continue
+            key = owner(pid)
+            if key is None:
+                continue
+            g = totals.setdefault(key, {"pids": [], "cpu": 0.0, "rss": 0, "io": 0.0})
+            g["pids"].append(pid)
+            g["cpu"] += info["cpu"]
+            g["rss"] += info["rss"]
+            g["io"] += info["io_rate"]
+
+        groups = []
+        for key, g in totals.items():
+            kind, ident = key
+            name = ident if kind == "app" else self.info[ident]["name"]
+            killable = kind == "app" and not (set(g["pids"]) & mine) and 1 not in g["pids"]
+            groups.append(Group(key, name, sorted(g["pids"]), g["cpu"], g["rss"], g["io"], kind == "app", killable))
+        groups.sort(key=lambda g: (not g.is_app, -g.cpu, -g.rss))
+        return groups
+
+    # ---------- Actions ----------
+    def signal(self, group, kill=False):
+        """SIGTERM (or SIGKILL) every process of a group; returns how many were signalled."""
+        sent = 0
+        for pid in group.pids:
+            p = self.procs.get(pid)
+            if p is None:
+                continue
+            try:
+                if kill:
+                    p.kill()
+                else:
+                    p.terminate()
+                sent += 1
+            except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
+                TRACE.warn("taskmanager", "signal %d failed: %s", pid, e)
+        return sent
+
+
+def _size(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+class TaskManagerPage(Gtk.Box):
+    """The busiest apps and process trees, refreshed every INTERVAL seconds while mapped.
+
+    get_apps() returns the current APP_LIST-style entries; get_sessions()
+    maps session ids of supervised launches to app names. Sampling runs
+    only while the page is mapped and the launcher is not suspended
+    (suspend()/resume(), from the Scheduler's hooks), so neither a hidden
+    task manager nor one left open behind a fullscreen game costs anything.
+    """
+
+    def __init__(self, get_apps, get_sessions=None):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        self.get_apps = get_apps
+        self.get_sessions = get_sessions or dict
+        self.sampler = ProcessSampler()
+        self.groups = []
+        self.selected = 0
+        self._timer = None
+        self.suspended = False
+
+        header = self._row_widgets("App", "CPU", "Memory", "I/O")
+        self.pack_start(header, False, False, 0)
+        self.listbox = Gtk.ListBox()
+        self.pack_start(self.listbox, True, True, 0)
+
+        self.connect("map", self._on_map)
+        self.connect("unmap", self._on_unmap)
+
+    def _row_widgets(self, *texts):
+        box = Gtk.Box(spacing=12)
+        for i, text in enumerate(texts):
+            label = Gtk.Label(label=text, xalign=0 if i == 0 else 1)
+            label.set_width_chars(18 if i == 0 else 9)
+            box.pack_start(label, i == 0, True, 0)
+        return box
+
+    # ---------- Sampling ----------
+    def _on_map(self, *args):
+        if not self.suspended:
+            self._start()
+
+    def _on_unmap(self, *args):
+        self._stop()
+
+    def suspend(self):
+        self.suspended = True
+        self._stop()
+
+    def resume(self):
+        self.suspended = False
+        if self.get_mapped():
+            self._start()
+
+    def _start(self):
+        if self._timer is None:
+            self._tick()
+            self._timer = GLib.timeout_add_seconds(INTERVAL, self._tick)
+
+    def _stop(self):
+        if self._timer is not None:
+            GLib.source_remove(self._timer)
+            self._timer = None
+
+    @TRACE.timed("taskmanager.sample")
+    def _tick(self):
+        self.sampler.sample(GLib.get_monotonic_time() / 1e6)
+        current = self.groups[self.selected].key if self.selected < len(self.groups) else None
+        self.groups = self.sampler.groups(self.get_apps(), self.get_sessions())[:MAX_ROWS]
+        keys = [g.key for g in self.groups]
+        # The selection follows its group as the list re-sorts
+        self.selected = keys.index(current) if current in keys else min(self.selected, max(0, len(keys) - 1))
+        self._render()
+        return True
+
+    def _render(self):
+        self.listbox.foreach(lambda w: self.listbox.remove(w))
+        for i, g in enumerate(self.groups):
+            row = Gtk.ListBoxRow()
+            row.add(self._row_widgets(g.name, f"{g.cpu:.0f}%", _size(g.rss), f"{_size(g.io)}/s"))
+            if i == self.selected:
+                row.get_style_context().add_class("selected")
+            if not g.killable:
+                row.get_style_context().add_class("readonly")
+            self.listbox.add(row)
+        self.listbox.show_all()
+
+    # ---------- Navigation ----------
+    def move(self, delta):
+        if not self.groups:
+            return False
+        selected = max(0, min(len(self.groups) - 1, self.selected + delta))
+        if selected == self.selected:
+            return False
+        self.selected = selected
+        for i, row in enumerate(self.listbox.get_children()):
+            ctx = row.get_style_context()
+            if i == self.selected:
+                ctx.add_class("selected")
+            else:
+                ctx.remove_class("selected")
+        return True
+
+    def end_selected(self, kill=False):
+        """Terminate (or kill) the selected group. Returns False if there is nothing it may end."""
+        if self.selected >= len(self.groups):
+            return False
+        group = self.groups[self.selected]
+        if not group.killable:
+            return False
+        TRACE.info("taskmanager", "%s %s (%d processes)", "killing" if kill else "terminating",
+                   group.name, len(group.pids))
+        ok = self.sampler.signal(group, kill) > 0
+        GLib.timeout_add(500, self._refresh)
+        return ok
+
+    def _refresh(self):
+        # One early sample so an ended app drops off the list without waiting a full interval
+        if self._timer is not None:
+            self._tick()
+        return False
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# theme.py — launcher CSS, shared by every window and page in the process
+
+import os
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk
+
+# ---------- Styling (GTK CSS) ----------
+CSS = b"""
+window { background-color: #121212; }
+
+#bg { }
+
+.popup-dialog {
+    background: linear-gradient(145deg, rgba(155,155,155,0.85) 0%, rgba(120,120,120,0.70) 100%);
+    border-radius: 20px;
+    border: 1px solid rgba(255,255,255,0.12);
+    color: white;
+    font-size: 20px;
+    font-weight: bold;
+    padding: 25px;
+    min-width: 400px;
+    min-height: 100px;
+    box-shadow:
+        0 0 25px rgba(255,255,255,0.5),
+        inset 0 1px 10px rgba(255,255,255,0.45);
+}
+
+.popup-dialog row.selected {
+    background-color: rgba(255,255,255,0.25);
+    border-radius: 8px;
+}
+
+.popup-dialog row.readonly label {
+    color: rgba(255,255,255,0.55);
+}
+
+.app-button {
+  background: linear-gradient(145deg, rgba(255,255,255,0.55) 0%, rgba(220,220,220,0.40) 100%);
+  border-radius: 14px;
+  border: 1px solid rgba(255,255,255,0.12);
+  color: white;
+  font-weight: 600;
+  font-size: 20px;
+  min-width: 220px;
+  min-height: 220px;
+  padding: 12px;
+}
+
+.app-button:hover {
+  background-color: rgba(255,255,255,0.12);
+}
+
+.app-button.selected {
+  background: linear-gradient(145deg, rgba(255,255,255,0.75) 0%, rgba(220,220,220,0.50) 100%);
+  box-shadow:
+    inset 0 1px 8px rgba(255,255,255,0.45),
+    0 0 18px rgba(255,255,255,0.45);
+  color: white;
+}
+
+.app-label { color: white; margin-top: 8px; }
+
+#settings-btn {
+  background: linear-gradient(145deg, rgba(255,255,255,0.55) 0%, rgba(220,220,220,0.40) 100%);
+  border-radius: 12px;
+  border: 1px solid rgba(255,255,255,0.12);
+  color: white;
+  font-size: 18px;
+  padding: 10px 14px;
+}
+
+#settings-btn.selected {
+  background: linear-gradient(145deg, rgba(255,255,255,0.75) 0%, rgba(220,220,220,0.50) 100%);
+  box-shadow:
+    inset 0 1px 8px rgba(255,255,255,0.45),
+    0 0 15px rgba(255,255,255,0.45);
+  color: white;
+}
+
+#clock {
+  color: white;
+  background: linear-gradient(145deg, rgba(255,255,255,0.55) 0%, rgba(220,220,220,0.40) 100%);
+  padding: 6px 10px;
+  border-radius: 8px;
+  font-family: monospace;
+  font-size: 20px;
+}
+"""
+
+# Low-power mode: tiles paint pre-rasterized backgrounds (see render.py), so
+# their CSS background and glow are switched off; the clock and popups,
+# which have no raster, get flat fills instead of gradients and shadows.
+LOW_POWER_CSS = b"""
+.app-button.low-power,
+.app-button.low-power.selected,
+.app-button.low-power:hover {
+  background: none;
+  box-shadow: none;
+  border-color: transparent;
+}
+
+.popup-dialog {
+  background: rgba(140,140,140,0.85);
+  box-shadow: none;
+}
+
+#clock { background: rgba(240,240,240,0.45); }
+"""
+
+_installed = set()
+_low_power = None
+
+
+def low_power():
+    """True if $ELLIXPI_LOW_POWER is set (and not 0) or apps.json has "low_power": true."""
+    global _low_power
+    if _low_power is None:
+        env = os.environ.get("ELLIXPI_LOW_POWER")
+        if env is not None:
+            _low_power = env not in ("", "0")
+        else:
+            from catalogue import load_manifest
+            _low_power = bool(load_manifest().get("low_power"))
+    return _low_power
+
+
+def install_css(screen):
+    """Load CSS for screen once; later calls (e.g. from hosted pages) are free."""
+    if screen in _installed:
+        return
+    style = Gtk.CssProvider()
+    style.load_from_data(CSS)
+    Gtk.StyleContext.add_provider_for_screen(screen, style, Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION)
+    if low_power():
+        flat = Gtk.CssProvider()
+        flat.load_from_data(LOW_POWER_CSS)
+        Gtk.StyleContext.add_provider_for_screen(screen, flat, Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION + 1)
+    _installed.add(screen)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# tracing.py — levelled tracing into an in-memory ring buffer, with counters and a dump socket
+#
+#   python3 tracing.py desktop            # dump the launcher's ring buffer
+#   python3 tracing.py desktop stats      # counters: events/s, handler durations
+#   python3 tracing.py desktop level debug
+
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import functools
+import collections
+
+from paths import cache_dir, runtime_dir
+
+ERROR, WARN, INFO, DEBUG = 40, 30, 20, 10
+LEVELS = {"error": ERROR, "warn": WARN, "info": INFO, "debug": DEBUG}
+NAMES = {v: k.upper() for k, v in LEVELS.items()}
+RING_SIZE = 4096
+
+
+def socket_path(name):
+    return os.path.join(runtime_dir(), f"{name}.trace.sock")
+
+
+class Counter:
+    """Occurrences of one event, its rate over the last second and, if timed, its duration."""
+
+    __slots__ = ("count", "total", "max", "rate", "_window", "_window_count")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rate = 0.0
+        self._window = time.monotonic()
+        self._window_count = 0
+
+    def add(self, now, duration=None):
+        self.count += 1
+        if duration is not None:
+            self.total += duration
+            if duration > self.max:
+                self.max = duration
+        self._window_count += 1
+        if now - self._window >= 1.0:
+            self.rate = self._window_count / (now - self._window)
+            self._window = now
+            self._window_count = 0
+
+    def per_second(self, now):
+        elapsed = now - self._window
+        if elapsed >= 1.0:
+            # The current window has outlived a second: traffic slowed or stopped
+            return self._window_count / elapsed
+        return self.rate or self._window_count / max(elapsed, 1e-3)
+
+    def as_dict(self):
+        d = {"count": self.count, "per_s": round(self.per_second(time.monotonic()), 1)}
+        if self.total:
+            d["avg_ms"] = round(self.total / self.count * 1000, 3)
+            d["max_ms"] = round(self.max * 1000, 3)
+        return d
+
+
+class Tracer:
+    """Records trace events into a fixed-size ring buffer instead of printing them.
+
+    A call below the current level returns after one comparison; one at
+    or above it appends a tuple to the ring, and formatting only happens
+    when the ring is dumped. Records at or above the echo level (WARN by
+    default) are also written to stderr, so the journal only sees
+    problems. The level starts from $ELLIXPI_TRACE and can be changed at
+    runtime through the socket or SIGUSR2.
+    """
+
+    def __init__(self, size=RING_SIZE):
+        self.level = LEVELS.get(os.environ.get("ELLIXPI_TRACE", "").lower(), INFO)
+        self.echo = WARN
+        self.ring = collections.deque(maxlen=size)
+        self.counters = {}
+        self.started = time.monotonic()
+        self.name = None
+        self._sock = None
+
+    # ---------- Recording ----------
+    def log(self, level, cat, fmt, *args):
+        if level < self.level:
+            return
+        self.ring.append((time.monotonic(), level, cat, fmt, args))
+        if level >= self.echo:
+            print(f"{cat}: {fmt % args if args else fmt}", file=sys.stderr)
+
+    def debug(self, cat, fmt, *args):
+        if DEBUG >= self.level:
+            self.log(DEBUG, cat, fmt, *args)
+
+    def info(self, cat, fmt, *args):
+        if INFO >= self.level:
+            self.log(INFO, cat, fmt, *args)
+
+    def warn(self, cat, fmt, *args):
+        self.log(WARN, cat, fmt, *args)
+
+    def error(self, cat, fmt, *args):
+        self.log(ERROR, cat, fmt, *args)
+
+    def count(self, name):
+        counter = self.counters.get(name) or self.counters.setdefault(name, Counter())
+        counter.add(time.monotonic())
+
+    def sample(self, name, seconds):
+        """Count one occurrence that took the given time (e.g. one frame)."""
+        counter = self.counters.get(name) or self.counters.setdefault(name, Counter())
+        counter.add(time.monotonic(), seconds)
+
+    def timed(self, name):
+        """Decorator that counts calls of a handler and how long they take."""
+        counter = self.counters.setdefault(name, Counter())
+
+        def wrap(fn):
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                start = time.monotonic()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    now = time.monotonic()
+                    counter.add(now, now - start)
+            return inner
+        return wrap
+
+    # ---------- Reporting ----------
+    def lines(self):
+        for ts, level, cat, fmt, args in list(self.ring):
+            try:
+                msg = fmt % args if args else fmt
+            except (TypeError, ValueError):
+                msg = f"{fmt} {args}"
+            yield f"{ts - self.started:10.3f} {NAMES[level]:5} {cat}: {msg}"
+
+    def stats(self):
+        return {
+            "level": NAMES[self.level].lower(),
+            "uptime_s": round(time.monotonic() - self.started, 1),
+            "buffered": len(self.ring),
+            "counters": {k: c.as_dict() for k, c in sorted(self.counters.items())},
+        }
+
+    def dump(self, path=None):
+        """Write the ring buffer and counters to a file; returns its path."""
+        path = path or os.path.join(cache_dir(), f"{self.name or 'trace'}.trace")
+        with open(path, "w") as f:
+            for line in self.lines():
+                f.write(line + "\n")
+            f.write(json.dumps(self.stats(), indent=2) + "\n")
+        return path
+
+    def set_level(self, name):
+        if name.lower() not in LEVELS:
+            return False
+        self.level = LEVELS[name.lower()]
+        return True
+
+    # ---------- Control ----------
+    def serve(self, name):
+        """Answer dump/stats/level commands on a Unix socket and SIGUSR1/SIGUSR2, from the GLib main loop."""
+        from gi.repository import GLib
+
+        self.name = name
+        try:
+            self._sock = self._bind(socket_path(name))
+        except OSError as e:
+            # Tracing still works through the signals; only the socket is missing
+            print("trace socket unavailable:", e, file=sys.stderr)
+        else:
+            GLib.io_add_watch(self._sock.fileno(), GLib.PRIORITY_LOW, GLib.IO_IN, self._on_client)
+        GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGUSR1, self._on_dump_signal)
+        GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGUSR2, self._on_level_signal)
+
+    @staticmethod
+    def _bind(path):
+        # A socket left by a dead instance refuses connections and is replaced;
+        # one that still answers belongs to a live instance and is left alone
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except FileNotFoundError:
+            pass
+        except ConnectionRefusedError:
+            os.unlink(path)
+        else:
+            raise OSError(f"{path} is in use by a running instance")
+        finally:
+            probe.close()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(path)
+        sock.listen(2)
+        return sock
+
+    def handle_signals(self, name):
+        """SIGUSR1/SIGUSR2 handling for programs without a GLib main loop."""
+        self.name = name
+        signal.signal(signal.SIGUSR1, lambda *a: self._on_dump_signal())
+        signal.signal(signal.SIGUSR2, lambda *a: self._on_level_signal())
+
+    def _on_dump_signal(self):
+        print("trace written to", self.dump(), file=sys.stderr)
+        return True
+
+    def _on_level_signal(self):
+        # Toggle between the quiet default and everything
+        self.level = INFO if self.level == DEBUG else DEBUG
+        print("trace level", NAMES[self.level].lower(), file=sys.stderr)
+        return True
+
+    def _on_client(self, fd, condition):
+        conn, _ = self._sock.accept()
+        try:
+            conn.settimeout(0.5)
+            cmd = conn.recv(256).decode(errors="replace").split()
+            conn.sendall(self._command(cmd).encode())
+        except OSError:
+            pass
+        finally:
+            conn.close()
+        return True
+
+    def _command(self, cmd):
+        if not cmd or cmd[0] == "dump":
+            return "\n".join(self.lines()) + "\n"
+        if cmd[0] == "stats":
+            return json.dumps(self.stats(), indent=2) + "\n"
+        if cmd[0] == "level" and len(cmd) == 2:
+            return "ok\n" if self.set_level(cmd[1]) else f"unknown level {cmd[1]}\n"
+        return "commands: dump | stats | level error|warn|info|debug\n"
+
+
+TRACE = Tracer()
+
+
+# ---------- Client ----------
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: tracing.py NAME [dump|stats|level LEVEL]")
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path(sys.argv[1]))
+    except OSError as e:
+        sys.exit(f"{sys.argv[1]}: {e}")
+    client.sendall(" ".join(sys.argv[2:]).encode() or b"dump")
+    client.shutdown(socket.SHUT_WR)
+    while True:
+        data = client.recv(65536)
+        if not data:
+            break
+        sys.stdout.write(data.decode(errors="replace"))
@@ -0,0 +1,597 @@
+#!/usr/bin/env python3
+# updater.py — zsync delta updates for the AppImages in /usr/local/bin
+#
+#   python3 updater.py [directory]          # update every AppImage in it, printing progress
+#   python3 updater.py --json [directory]   # the same as one JSON object per line, for the launcher
+#
+# Each AppImage carries its update information in an ELF section, .upd_info
+# ("zsync|<url>" or "gh-releases-zsync|owner|repo|tag|pattern"). The .zsync
+# control file lists a weak rolling checksum and a truncated MD4 for every
+# block of the new release; blocks already present anywhere in the installed
+# image are copied locally and only the rest is fetched with HTTP range
+# requests. The result is checked against the control file's SHA-1 and then
+# swapped in with a rename, so a running copy keeps working.
+#
+# The launcher runs this as a child process (spawn_updates()), so the
+# checksumming never holds the GTK process's GIL. With numpy the weak sums
+# of every offset are computed a chunk at a time and MD4 runs lane-wise over
+# all the candidates of a chunk; without it the scan rolls byte by byte.
+
+import os
+import sys
+import glob
+import json
+import mmap
+import struct
+import fnmatch
+import hashlib
+import threading
+import subprocess
+import http.client
+from itertools import accumulate
+from urllib.parse import urljoin, urlsplit
+from urllib.request import Request, urlopen
+
+try:
+    import numpy as np
+except ImportError:  # the byte-by-byte scan below still works, only slower
+    np = None
+
+UPDATE_DIR = "/usr/local/bin"
+USER_AGENT = "ellixpi-updater/1"
+TIMEOUT = 30
+MAX_REDIRECTS = 5
+MERGE_GAP = 8  # missing blocks this close together are fetched in one range request
+CHUNK = 1 << 20
+WEAK_TABLE = (1 << 20) - 1  # mask of the weak-sum bits the prefilter bitmap covers
+FINAL_STATES = ("updated", "current", "unsupported", "failed")
+
+
+class UpdateError(Exception):
+    pass
+
+
+# ---------- Update information ----------
+def find_appimages(directory=UPDATE_DIR):
+    return sorted(glob.glob(os.path.join(directory, "*.AppImage")))
+
+
+def read_update_info(path):
+    """The .upd_info string embedded in an AppImage, or None."""
+    with open(path, "rb") as f:
+        ident = f.read(16)
+        if ident[:4] != b"\x7fELF":
+            return None
+        end = "<" if ident[5] == 1 else ">"
+        if ident[4] == 2:  # 64-bit
+            f.seek(0x28)
+            shoff, = struct.unpack(end + "Q", f.read(8))
+            f.seek(0x3A)
+            entry, fmt = 40, end + "IIQQQQ"
+        else:
+            f.seek(0x20)
+            shoff, = struct.unpack(end + "I", f.read(4))
+            f.seek(0x2E)
+            entry, fmt = 24, end + "IIIIII"
+        shentsize, shnum, shstrndx = struct.unpack(end + "HHH", f.read(6))
+
+        sections = []
+        for i in range(shnum):
+            f.seek(shoff + i * shentsize)
+            name, _type, _flags, _addr, offset, size = struct.unpack(fmt, f.read(entry))
+            sections.append((name, offset, size))
+        if shstrndx >= len(sections):
+            return None
+        names = sections[shstrndx][1]
+        for name, offset, size in sections:
+            f.seek(names + name)
+            if f.read(10) == b".upd_info\0":
+                f.seek(offset)
+                info = f.read(size).split(b"\0")[0].decode("utf-8", "replace").strip()
+                return info or None
+    return None
+
+
+def _get(url):
+    with urlopen(Request(url, headers={"User-Agent": USER_AGENT}), timeout=TIMEOUT) as resp:
+        return resp.read(), resp.geturl()
+
+
+def zsync_url(info):
+    kind, _, rest = info.partition("|")
+    if kind == "zsync":
+        return rest
+    if kind == "gh-releases-zsync":
+        owner, repo, tag, pattern = rest.split("|")
+        api = f"https://api.github.com/repos/{owner}/{repo}/releases/"
+        data, _url = _get(api + ("latest" if tag == "latest" else f"tags/{tag}"))
+        for asset in json.loads(data).get("assets", []):
+            if fnmatch.fnmatch(asset["name"], pattern):
+                return asset["browser_download_url"]
+        raise UpdateError(f"no release asset matches {pattern}")
+    raise UpdateError(f"unsupported update information: {kind}")
+
+
+# ---------- Control file ----------
+class ControlFile:
+    """A parsed .zsync file: target size and hash, and the checksums of every block."""
+
+    def __init__(self, data, url):
+        head, sep, body = data.partition(b"\n\n")
+        if not sep:
+            raise UpdateError("not a zsync file")
+        headers = {}
+        for line in head.decode("utf-8", "replace").splitlines():
+            key, _, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+        if "z-map2" in headers:
+            raise UpdateError("compressed zsync targets are not supported")
+        try:
+            self.blocksize = int(headers["blocksize"])
+            self.length = int(headers["length"])
+            self.seq_matches, rsum_bytes, check_bytes = (int(x) for x in headers["hash-lengths"].split(","))
+            self.sha1 = headers["sha-1"].lower()
+            self.url = urljoin(url, headers["url"])
+        except (KeyError, ValueError) as e:
+            raise UpdateError(f"bad zsync header: {e}")
+        self.filename = headers.get("filename", "")
+        self.check_bytes = check_bytes
+        # Only the low rsum_bytes of (a << 16 | b) are stored; with fewer than 3, none of a
+        self.a_mask = 0 if rsum_bytes < 3 else 0xFF if rsum_bytes == 3 else 0xFFFF
+
+        count = (self.length + self.blocksize - 1) // self.blocksize
+        step = rsum_bytes + check_bytes
+        if len(body) < count * step:
+            raise UpdateError("truncated zsync file")
+        self.blocks = []  # (weak, strong) per block
+        for i in range(count):
+            entry = body[i * step:(i + 1) * step]
+            self.blocks.append((int.from_bytes(entry[:rsum_bytes], "big"), entry[rsum_bytes:]))
+
+
+MD4_INIT = (0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476)
+
+
+def _md4_padding(length):
+    return b"\x80" + b"\0" * ((55 - length) % 64) + struct.pack("<Q", length * 8)
+
+
+def _md4_block(h, x, rol):
+    """The three MD4 rounds over one block of 16 words. rol() masks to 32 bits as
+    the number type needs, so this runs on ints and lane-wise on numpy uint32 arrays."""
+    a, b, c, d = h
+    for i in (0, 4, 8, 12):
+        a = rol(a + ((b & c) | (~b & d)) + x[i], 3)
+        d = rol(d + ((a & b) | (~a & c)) + x[i + 1], 7)
+        c = rol(c + ((d & a) | (~d & b)) + x[i + 2], 11)
+        b = rol(b + ((c & d) | (~c & a)) + x[i + 3], 19)
+    for i in (0, 1, 2, 3):
+        a = rol(a + ((b & c) | (b & d) | (c & d)) + x[i] + 0x5A827999, 3)
+        d = rol(d + ((a & b) | (a & c) | (b & c)) + x[i + 4] + 0x5A827999, 5)
+        c = rol(c + ((d & a) | (d & b) | (a & b)) + x[i + 8] + 0x5A827999, 9)
+        b = rol(b + ((c & d) | (c & a) | (d & a)) + x[i + 12] + 0x5A827999, 13)
+    for i in (0, 2, 1, 3):
+        a = rol(a + (b ^ c ^ d) + x[i] + 0x6ED9EBA1, 3)
+        d = rol(d + (a ^ b ^ c) + x[i + 8] + 0x6ED9EBA1, 9)
+        c = rol(c + (d ^ a ^ b) + x[i + 4] + 0x6ED9EBA1, 11)
+        b = rol(b + (c ^ d ^ a) + x[i + 12] + 0x6ED9EBA1, 15)
+    return a, b, c, d
+
+
+def _md4_pure(data):
+    def rol(x, n):
+        x &= 0xFFFFFFFF
+        return ((x << n) | (x >> (32 - n))) & 0xFFFFFFFF
+
+    msg = bytes(data) + _md4_padding(len(data))
+    h = MD4_INIT
+    for off in range(0, len(msg), 64):
+        x = struct.unpack("<16I", msg[off:off + 64])
+        h = [(v + w) & 0xFFFFFFFF for v, w in zip(h, _md4_block(h, x, rol))]
+    return struct.pack("<4I", *h)
+
+
+def _md4_lanes(rows):
+    """MD4 of every row of an (n, length) uint8 array, as n 16-byte digests."""
+    def rol(x, n):
+        return (x << np.uint32(n)) | (x >> np.uint32(32 - n))
+
+    n, length = rows.shape
+    tail = np.frombuffer(_md4_padding(length), np.uint8)
+    # Word j of every lane in one contiguous row, so each step is a handful of vector ops
+    words = np.hstack([rows, np.broadcast_to(tail, (n, len(tail)))]).view("<u4").T.copy()
+    h = [np.full(n, v, np.uint32) for v in MD4_INIT]
+    for off in range(0, len(words), 16):
+        h = [v + w for v, w in zip(h, _md4_block(h, words[off:off + 16], rol))]
+    digests = np.stack(h, axis=1).astype("<u4").tobytes()
+    return [digests[i * 16:(i + 1) * 16] for i in range(n)]
+
+
+def _has_md4():
+    try:
+        hashlib.new("md4")
+        return True
+    except ValueError:  # OpenSSL 3 without the legacy provider
+        return False
+
+
+HAVE_MD4 = _has_md4()
+
+
+def md4(data):
+    return hashlib.new("md4", data).digest() if HAVE_MD4 else _md4_pure(data)
+
+
+def md4_many(seed, offsets, bs):
+    """MD4 of the bs bytes at each offset of seed."""
+    if HAVE_MD4 or np is None or not offsets:
+        return [md4(seed[i:i + bs]) for i in offsets]
+    buf = np.frombuffer(seed, np.uint8)
+    return _md4_lanes(buf[np.add.outer(np.array(offsets), np.arange(bs))])
+
+
+# ---------- Block matching ----------
+def _rsum(block):
+    # a = sum of the bytes, b = sum of (len - k) * byte_k, i.e. the sum of the prefix sums
+    return sum(block) & 0xFFFF, sum(accumulate(block)) & 0xFFFF
+
+
+def _weak_sums(seed, start, count, bs, a_mask):
+    """The weak checksums of the count windows starting at start, start + 1, ...
+
+    Everything is uint64 and wraps, which is harmless as only the low 16
+    bits of a and b are kept. With p the prefix sums of the bytes and r
+    those of index * byte, a window at i has a = p[i+bs] - p[i] and
+    b = sum of (i + bs - j) * byte_j = (i + bs) * a - (r[i+bs] - r[i]).
+    """
+    s = np.frombuffer(seed, np.uint8, count=count + bs - 1, offset=start).astype(np.uint64)
+    p = np.zeros(len(s) + 1, np.uint64)
+    np.cumsum(s, out=p[1:])
+    r = np.zeros(len(s) + 1, np.uint64)
+    np.cumsum(s * np.arange(len(s), dtype=np.uint64), out=r[1:])
+    a = p[bs:] - p[:-bs]
+    b = (np.arange(count, dtype=np.uint64) + np.uint64(bs)) * a - (r[bs:] - r[:-bs])
+    return ((a & np.uint64(a_mask)) << np.uint64(16)) | (b & np.uint64(0xFFFF))
+
+
+def match_blocks(ctrl, seed, on_progress=None):
+    """{block index: offset in seed} for every target block found in the seed bytes."""
+    if np is None:
+        return _match_blocks_rolling(ctrl, seed, on_progress)
+    return _match_blocks_vectorized(ctrl, seed, on_progress)
+
+
+def _match_blocks_vectorized(ctrl, seed, on_progress=None):
+    """match_blocks() a chunk at a time: weak sums of every offset at once, then MD4 of the hits.
+
+    Offsets whose weak sum is a block's are taken in order, skipping those
+    inside a block already taken. With two sequential matches the window
+    after a hit must also carry the following block's weak sum, unless the
+    hit continues a run of taken blocks. Their MD4s are
+    then computed together and only confirmed blocks are kept. A rare
+    false weak hit can hide a real match behind it; that block is
+    downloaded instead.
+    """
+    bs = ctrl.blocksize
+    weak = {}
+    for i, (w, _strong) in enumerate(ctrl.blocks):
+        weak.setdefault(w, []).append(i)
+    # A bitmap over the low bits of the weak sums picks out the few offsets worth a dict lookup
+    table = np.zeros(WEAK_TABLE + 1, bool)
+    table[np.array(list(weak), np.uint64) & np.uint64(WEAK_TABLE)] = True
+    found = {}
+    n = len(seed)
+    if n < bs:
+        return found
+    windows = n - bs + 1
+    pos = 0  # windows before this lie inside a block already taken
+    taken = set()  # (offset, block) pairs taken so far
+    for start in range(0, windows, CHUNK):
+        count = min(CHUNK, windows - start)
+        # Followed one block further, for the weak sum after each hit
+        sums = _weak_sums(seed, start, count + min(bs, windows - start - count), bs, ctrl.a_mask)
+        tentative = []
+        claimed = set()
+        for h in np.flatnonzero(table[sums[:count] & np.uint64(WEAK_TABLE)]).tolist():
+            i = start + h
+            hits = weak.get(int(sums[h]))
+            if i < pos or not hits:
+                continue
+            after = int(sums[h + bs]) if h + bs < len(sums) else None
+            for k in hits:
+                if k in found or k in claimed:
+                    continue
+                if (ctrl.seq_matches > 1 and after is not None and k + 1 < len(ctrl.blocks)
+                        and ctrl.blocks[k + 1][0] != after and (i - bs, k - 1) not in taken):
+                    continue
+                tentative.append((i, k))
+                claimed.add(k)
+                taken.add((i, k))
+                pos = i + bs
+        offsets = sorted({i for i, _k in tentative})
+        strong = dict(zip(offsets, md4_many(seed, offsets, bs)))
+        for i, k in tentative:
+            if k not in found and strong[i][:ctrl.check_bytes] == ctrl.blocks[k][1]:
+                found[k] = i
+        if on_progress:
+            on_progress((start + count) / windows)
+    return found
+
+
+def _match_blocks_rolling(ctrl, seed, on_progress=None):
+    """match_blocks() without numpy.
+
+    The weak checksum rolls one byte at a time through unmatched data;
+    after a confirmed match the scan jumps a whole block, so long runs of
+    unchanged data (shifted or not) cost one weak and one strong sum per block.
+    """
+    bs = ctrl.blocksize
+    weak = {}
+    for i, (w, _strong) in enumerate(ctrl.blocks):
+        weak.setdefault(w, []).append(i)
+    found = {}
+    n = len(seed)
+    if n < bs:
+        return found
+    i = 0
+    a, b = _rsum(seed[0:bs])
+    next_report = 0
+    while True:
+        hits = weak.get(((a & ctrl.a_mask) << 16) | b)
+        if hits:
+            strong = None
+            matched = False
+            for k in hits:
+                if k in found:
+                    continue
+                if strong is None:
+                    strong = md4(seed[i:i + bs])[:ctrl.check_bytes]
+                if ctrl.blocks[k][1] == strong:
+                    found[k] = i
+                    matched = True
+            if matched:
+                i += bs
+                if i + bs > n:
+                    break
+                a, b = _rsum(seed[i:i + bs])
+                continue
+        if i + bs >= n:
+            break
+        old, new = seed[i], seed[i + bs]
+        a = (a + new - old) & 0xFFFF
+        b = (b + a - old * bs) & 0xFFFF
+        i += 1
+        if on_progress and i >= next_report:
+            on_progress(i / n)
+            next_report = i + CHUNK
+    return found
+
+
+def missing_ranges(ctrl, found):
+    """Byte ranges (start, end inclusive) covering the blocks not found locally."""
+    ranges = []
+    for k in range(len(ctrl.blocks)):
+        if k in found:
+            continue
+        start = k * ctrl.blocksize
+        end = min(ctrl.length, start + ctrl.blocksize) - 1
+        if ranges and start - ranges[-1][1] - 1 <= MERGE_GAP * ctrl.blocksize:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    return ranges
+
+
+# ---------- Downloading ----------
+class RangeFetcher:
+    """HTTP range requests over one kept-alive connection, following redirects once."""
+
+    def __init__(self, url):
+        self.url = url
+        self.conn = None
+        self.key = None
+
+    def _connect(self, parts):
+        key = (parts.scheme, parts.netloc)
+        if self.conn is None or self.key != key:
+            self.close()
+            cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+            self.conn = cls(parts.netloc, timeout=TIMEOUT)
+            self.key = key
+
+    def get(self, start, end):
+        try:
+            return self._get(start, end)
+        except (http.client.HTTPException, ConnectionError):
+            self.close()  # the server dropped the kept-alive connection; once more on a new one
+            return self._get(start, end)
+
+    def _get(self, start, end):
+        url = self.url
+        for _ in range(MAX_REDIRECTS):
+            parts = urlsplit(url)
+            self._connect(parts)
+            path = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+            self.conn.request("GET", path, headers={"Range": f"bytes={start}-{end}", "User-Agent": USER_AGENT})
+            resp = self.conn.getresponse()
+            body = resp.read()
+            if resp.status in (301, 302, 303, 307, 308):
+                url = urljoin(url, resp.getheader("Location"))
+                continue
+            if resp.status != 206:
+                raise UpdateError(f"range request failed: HTTP {resp.status}")
+            if len(body) != end - start + 1:
+                raise UpdateError("range request returned the wrong length")
+            self.url = url  # GitHub redirects every request; remember where it lands
+            return body
+        raise UpdateError("too many redirects")
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def sha1_file(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# ---------- One image ----------
+def update_appimage(path, report=lambda state, fraction=None, detail="": None):
+    """Bring path up to date. report(state, fraction, detail) is called from this thread.
+
+    States: checking, scanning, downloading, verifying, then one of
+    updated, current, unsupported or failed.
+    """
+    part = None
+    try:
+        report("checking")
+        info = read_update_info(path)
+        if not info:
+            report("unsupported", detail="no update information")
+            return
+        url = zsync_url(info)
+        data, url = _get(url)
+        ctrl = ControlFile(data, url)
+        if os.path.getsize(path) == ctrl.length and sha1_file(path) == ctrl.sha1:
+            report("current")
+            return
+
+        report("scanning", 0.0)
+        with open(path, "rb") as f:
+            seed = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path) else b""
+        try:
+            found = match_blocks(ctrl, seed, lambda fraction: report("scanning", fraction))
+            ranges = missing_ranges(ctrl, found)
+            total = sum(end - start + 1 for start, end in ranges)
+            detail = f"{total // 1024} KiB of {ctrl.length // 1024} KiB"
+
+            part = os.path.join(os.path.dirname(path), "." + os.path.basename(path) + ".part")
+            with open(part, "wb") as out:
+                out.truncate(ctrl.length)
+                bs = ctrl.blocksize
+                for k, offset in found.items():
+                    out.seek(k * bs)
+                    out.write(seed[offset:offset + min(bs, ctrl.length - k * bs)])
+                fetcher = RangeFetcher(ctrl.url)
+                done = 0
+                try:
+                    report("downloading", 0.0, detail)
+                    for start, end in ranges:
+                        out.seek(start)
+                        out.write(fetcher.get(start, end))
+                        done += end - start + 1
+                        report("downloading", done / total if total else 1.0, detail)
+                finally:
+                    fetcher.close()
+                out.flush()
+                os.fsync(out.fileno())
+        finally:
+            if isinstance(seed, mmap.mmap):
+                seed.close()
+
+        report("verifying")
+        if sha1_file(part) != ctrl.sha1:
+            report("failed", detail="checksum mismatch")
+            return
+        os.chmod(part, os.stat(path).st_mode & 0o7777)
+        os.replace(part, path)
+        report("updated", 1.0, detail)
+    except (OSError, UpdateError, ValueError) as e:
+        report("failed", detail=str(e))
+    finally:
+        # Gone after a successful rename; after any failure it is removed, not left
+        # next to the real image (it can be as large as the whole AppImage)
+        if part is not None:
+            try:
+                os.unlink(part)
+            except OSError:
+                pass
+
+
+# ---------- All images ----------
+def update_all(on_report, directory=UPDATE_DIR):
+    """Update every AppImage in directory, each in its own thread.
+
+    on_report(name, state, fraction, detail) is called from those threads.
+    Returns the started threads. The launcher uses spawn_updates() instead,
+    which runs this in a child process.
+    """
+    threads = []
+    for path in find_appimages(directory):
+        name = os.path.basename(path)
+        report = lambda state, fraction=None, detail="", name=name: on_report(name, state, fraction, detail)
+        t = threading.Thread(target=update_appimage, args=(path, report), name=f"update {name}", daemon=True)
+        t.start()
+        threads.append(t)
+    return threads
+
+
+# ---------- From the launcher ----------
+def spawn_updates(on_report, directory=UPDATE_DIR):
+    """Run `updater.py --json` as a child process, reporting from the GLib main loop.
+
+    on_report(name, state, fraction, detail) is called for every progress
+    line the child prints. Images the child never finished (it crashed or
+    was killed) are reported as failed. Returns the Popen, or None when
+    there is nothing to update.
+    """
+    # Deferred so the command line works without gi
+    from gi.repository import GLib
+
+    names = [os.path.basename(path) for path in find_appimages(directory)]
+    if not names:
+        return None
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--json", directory],
+                            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE)
+    pending = bytearray()
+    last = {}
+
+    def on_output(fd, condition):
+        data = os.read(fd, 65536) if condition & GLib.IO_IN else b""
+        if data:
+            pending.extend(data)
+            *lines, rest = pending.split(b"\n")
+            pending[:] = rest
+            for line in lines:
+                try:
+                    msg = json.loads(line)
+                except ValueError:
+                    continue
+                last[msg["name"]] = msg["state"]
+                on_report(msg["name"], msg["state"], msg.get("fraction"), msg.get("detail", ""))
+            return True
+        proc.stdout.close()
+        proc.wait()
+        for name in names:
+            if last.get(name) not in FINAL_STATES:
+                on_report(name, "failed", None, f"updater exited with status {proc.returncode}")
+        return False
+
+    GLib.io_add_watch(proc.stdout.fileno(), GLib.PRIORITY_DEFAULT, GLib.IO_IN | GLib.IO_HUP | GLib.IO_ERR,
+                      on_output)
+    return proc
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    as_json = args[:1] == ["--json"]
+    if as_json:
+        args = args[1:]
+    lock = threading.Lock()
+
+    def show(name, state, fraction, detail):
+        with lock:
+            if as_json:
+                line = json.dumps({"name": name, "state": state, "fraction": fraction, "detail": detail})
+            else:
+                pct = f" {fraction * 100:5.1f}%" if fraction is not None else ""
+                line = f"{name}: {state}{pct} {detail}".rstrip()
+            print(line, flush=True)
+
+    for t in update_all(show, args[0] if args else UPDATE_DIR):
+        t.join()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# winindex.py — live index of X11 top-level clients by WM_CLASS and PID, and the active one
+
+import os
+from gi.repository import GLib
+from Xlib import X, display, error, protocol
+
+
+def wm_class_for(app):
+    """WM_CLASS key used to find an APP_LIST entry's window.
+
+    Entries may set "wm_class" explicitly; otherwise the command's basename
+    is used, e.g. "/usr/local/bin/PPSSPP.AppImage" -> "ppsspp".
+    """
+    if app.get("wm_class"):
+        return app["wm_class"].lower()
+    name = os.path.basename(app["cmd"][0]).lower()
+    if name.endswith(".appimage"):
+        name = name[:-len(".appimage")]
+    return name
+
+
+class WindowIndex:
+    """Top-level clients of the window manager, kept current from X events.
+
+    The root window's _NET_CLIENT_LIST is re-read only when a PropertyNotify
+    says it changed, and only added windows are queried, so lookups by class
+    or PID are plain dict hits with no round trip to the X server.
+
+    With on_active, _NET_ACTIVE_WINDOW is followed the same way, along with
+    the title of whichever window is active: on_active(wid, instance, class,
+    pid, title) is called when either changes, and never otherwise.
+    """
+
+    def __init__(self, display_name=None, on_active=None):
+        self.dpy = display.Display(display_name)
+        self.root = self.dpy.screen().root
+        self.NET_CLIENT_LIST = self.dpy.intern_atom("_NET_CLIENT_LIST")
+        self.NET_ACTIVE_WINDOW = self.dpy.intern_atom("_NET_ACTIVE_WINDOW")
+        self.NET_WM_PID = self.dpy.intern_atom("_NET_WM_PID")
+        self.NET_WM_NAME = self.dpy.intern_atom("_NET_WM_NAME")
+        self.UTF8_STRING = self.dpy.intern_atom("UTF8_STRING")
+
+        self.clients = {}   # window id -> (instance, class, pid)
+        self.by_class = {}  # lowercased instance or class -> [window id, ...]
+        self.by_pid = {}    # pid -> [window id, ...]
+        self.on_active = on_active
+        self.active = None  # window id, when on_active is set
+        self.active_title = None
+
+        self.root.change_attributes(event_mask=X.PropertyChangeMask)
+        self._sync()
+        if on_active:
+            self._sync_active()
+        self._watch_id = GLib.io_add_watch(
+            self.dpy.fileno(), GLib.PRIORITY_DEFAULT, GLib.IO_IN, self._on_x_events)
+
+    # ---------- Lookups ----------
+    def find_class(self, wm_class):
+        wids = self.by_class.get(wm_class.lower())
+        return wids[-1] if wids else None
+
+    def find_pid(self, pid):
+        wids = self.by_pid.get(pid)
+        return wids[-1] if wids else None
+
+    # ---------- Focusing ----------
+    def activate(self, wid):
+        """Map and raise a client through EWMH, like `xdotool windowmap` + `windowactivate`."""
+        win = self.dpy.create_resource_object("window", wid)
+        try:
+            win.map()
+            ev = protocol.event.ClientMessage(
+                window=win,
+                client_type=self.NET_ACTIVE_WINDOW,
+                data=(32, [2, X.CurrentTime, 0, 0, 0]),  # 2 = request from a pager
+            )
+            self.root.send_event(ev, event_mask=X.SubstructureRedirectMask | X.SubstructureNotifyMask)
+            self.dpy.flush()
+        except error.XError as e:
+            print("activate failed:", e)
+            return False
+        return True
+
+    def close(self):
+        if self._watch_id is not None:
+            GLib.source_remove(self._watch_id)
+            self._watch_id = None
+        self.dpy.close()
+
+    # ---------- Index maintenance ----------
+    def _on_x_events(self, fd, condition):
+        # The round trips below can leave new events in Xlib's queue rather than
+        # the socket, where the IO watch would not see them; go again until it is empty
+        while self.dpy.pending_events():
+            changed = active_changed = title_changed = False
+            while self.dpy.pending_events():
+                ev = self.dpy.next_event()
+                if ev.type != X.PropertyNotify:
+                    continue
+                if ev.window == self.root and ev.atom == self.NET_CLIENT_LIST:
+                    changed = True
+                elif ev.window == self.root and ev.atom == self.NET_ACTIVE_WINDOW:
+                    active_changed = True
+                elif ev.window.id == self.active and ev.atom in (self.NET_WM_NAME, X.WM_NAME):
+                    title_changed = True
+            # A burst of map/unmap only costs one re-read
+            if changed:
+                self._sync()
+            if self.on_active and active_changed:
+                self._sync_active()
+            elif self.on_active and title_changed:
+                self._retitle()
+        return True
+
+    def _sync(self):
+        prop = self.root.get_full_property(self.NET_CLIENT_LIST, X.AnyPropertyType)
+        current = set(prop.value) if prop else set()
+
+        for wid in set(self.clients) - current:
+            self._remove(wid)
+        for wid in current - set(self.clients):
+            self._add(wid)
+
+    def _sync_active(self):
+        prop = self.root.get_full_property(self.NET_ACTIVE_WINDOW, X.AnyPropertyType)
+        wid = prop.value[0] if prop and len(prop.value) else None
+        if wid == self.active:
+            return
+        # Title changes are only wanted from the active window
+        self._select_properties(self.active, 0)
+        self.active = wid or None
+        self._select_properties(self.active, X.PropertyChangeMask)
+        self.active_title = None
+        self._retitle(force=True)
+
+    def _select_properties(self, wid, mask):
+        if wid is None:
+            return
+        try:
+            self.dpy.create_resource_object("window", wid).change_attributes(event_mask=mask)
+        except error.XError:
+            pass  # already gone
+
+    def _retitle(self, force=False):
+        title = self._title(self.active) if self.active else ""
+        if title == self.active_title and not force:
+            return
+        self.active_title = title
+        if self.active and self.active not in self.clients:
+            # Activated before _NET_CLIENT_LIST caught up with it
+            self._add(self.active)
+        instance, cls, pid = self.clients.get(self.active, ("", "", None))
+        self.on_active(self.active, instance, cls, pid, title)
+
+    def _title(self, wid):
+        win = self.dpy.create_resource_object("window", wid)
+        try:
+            prop = win.get_full_property(self.NET_WM_NAME, self.UTF8_STRING)
+            if prop:
+                return prop.value.decode("utf-8", "replace") if isinstance(prop.value, bytes) else prop.value
+            return win.get_wm_name() or ""
+        except error.XError:
+            return ""
+
+    def _add(self, wid):
+        win = self.dpy.create_resource_object("window", wid)
+        try:
+            wm_class = win.get_wm_class() or ("", "")
+            pid_prop = win.get_full_property(self.NET_WM_PID, X.AnyPropertyType)
+        except error.BadWindow:
+            return
+        pid = pid_prop.value[0] if pid_prop else None
+
+        self.clients[wid] = (wm_class[0], wm_class[1], pid)
+        for name in {wm_class[0].lower(), wm_class[1].lower()}:
+            if name:
+                self.by_class.setdefault(name, []).append(wid)
+        if pid:
+            self.by_pid.setdefault(pid, []).append(wid)
+
+    def _remove(self, wid):
+        instance, cls, pid = self.clients.pop(wid)
+        for name in {instance.lower(), cls.lower()}:
+            self._drop(self.by_class, name, wid)
+        self._drop(self.by_pid, pid, wid)
+
+    @staticmethod
+    def _drop(index, key, wid):
+        wids = index.get(key)
+        if not wids:
+            return
+        wids.remove(wid)
+        if not wids:
+            del index[key]